@@ -0,0 +1,418 @@
+# bench_database.py
+"""
+Database load-test and benchmark for Shiksha Mitra
+Seeds realistic student data using the existing schema and runs mixed
+workloads (login, stats read, doubt write, test submit) from many threads
+and processes. Results are written as JSON so runs can be compared.
+
+Usage:
+    python bench_database.py --students 500 --tests 10 --doubts 10 \
+        --threads 8 --processes 2 --duration 20 --output bench_db.json
+    python bench_database.py --wal --label wal --compare bench_db.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import ShikshaMitraDB
+
+# Default operation mix (weights are normalised)
+DEFAULT_MIX = {
+    "login": 0.2,
+    "stats": 0.4,
+    "doubt": 0.2,
+    "test": 0.2,
+}
+
+SUBJECTS = ["Mathematics", "Science", "English", "Social Science", "Hindi"]
+LEVELS = ["Level 1", "Level 2", "Level 3"]
+LANGUAGES = ["English", "Hindi", "Kannada", "Telugu", "Marathi"]
+QUESTIONS = [
+    "What is photosynthesis?",
+    "How do I add two fractions with different denominators?",
+    "Why is the sky blue?",
+    "What is the difference between weather and climate?",
+    "Explain Newton's third law with an example",
+    "What is a noun?",
+]
+
+
+def username_for(index: int) -> str:
+    """Username of the seeded student with the given index"""
+    return f"bench_student_{index}"
+
+
+def password_for(index: int) -> str:
+    """Password of the seeded student with the given index"""
+    return f"bench_pass_{index}"
+
+
+def seed_database(db: ShikshaMitraDB, students: int, tests: int, doubts: int, seed: int = 42) -> Dict:
+    """
+    Seed N students with M tests and M doubts each.
+    Uses one connection and executemany so seeding is not what we measure.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    users = [
+        (username_for(i), db.hash_password(password_for(i)), f"{username_for(i)}@example.com")
+        for i in range(students)
+    ]
+    cursor.executemany(
+        "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
+        users
+    )
+
+    cursor.execute(
+        "SELECT user_id FROM users WHERE username LIKE 'bench_student_%' ORDER BY user_id"
+    )
+    user_ids = [row[0] for row in cursor.fetchall()]
+
+    today = datetime.now().date()
+    profiles = []
+    stats = []
+    doubt_rows = []
+    test_rows = []
+
+    for user_id in user_ids:
+        class_number = rng.randint(1, 12)
+        language = rng.choice(LANGUAGES)
+        subjects = rng.sample(SUBJECTS, 3)
+        profiles.append((user_id, f"Student {user_id}", class_number, language, json.dumps(subjects)))
+
+        streak = rng.randint(0, 30)
+        xp = rng.randint(0, 5000)
+        last_active = today - timedelta(days=rng.randint(0, 5))
+        stats.append((user_id, streak, streak + rng.randint(0, 10), xp, xp // 1000 + 1,
+                      json.dumps([]), last_active.isoformat()))
+
+        for _ in range(doubts):
+            subject = rng.choice(subjects)
+            doubt_rows.append((user_id, subject, rng.choice(QUESTIONS),
+                               "A short explanation " * rng.randint(10, 40), language))
+
+        for _ in range(tests):
+            total_questions = rng.randint(3, 10)
+            correct = rng.randint(0, total_questions)
+            total_marks = total_questions * 5
+            obtained = correct * 5
+            completed_at = datetime.now() - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            test_rows.append((user_id, rng.choice(subjects), rng.choice(LEVELS), total_marks,
+                              obtained, obtained / total_marks * 100, correct, total_questions,
+                              json.dumps({f"q{i}": rng.randint(0, 3) for i in range(total_questions)}),
+                              completed_at.strftime('%Y-%m-%d %H:%M:%S')))
+
+    cursor.executemany("""
+    INSERT INTO user_profiles (user_id, full_name, class_number, language, subjects)
+    VALUES (?, ?, ?, ?, ?)
+    """, profiles)
+    cursor.executemany("""
+    INSERT INTO user_stats (user_id, current_streak, longest_streak, total_xp, level, badges, last_activity_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, stats)
+    cursor.executemany("""
+    INSERT INTO doubts_history (user_id, subject, question, answer, language)
+    VALUES (?, ?, ?, ?, ?)
+    """, doubt_rows)
+    cursor.executemany("""
+    INSERT INTO enhanced_test_results
+    (user_id, subject, level, total_marks, obtained_marks, percentage,
+     correct_answers, total_questions, answers, completed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, test_rows)
+
+    conn.commit()
+    conn.close()
+
+    return {
+        "students": len(user_ids),
+        "tests": len(test_rows),
+        "doubts": len(doubt_rows),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _run_operation(db: ShikshaMitraDB, op: str, index: int, user_id: int, rng: random.Random) -> bool:
+    """Run one workload operation, returning whether it succeeded"""
+    if op == "login":
+        success, _ = db.authenticate_user(username_for(index), password_for(index))
+        return success
+    if op == "stats":
+        stats = db.get_user_stats(user_id)
+        return stats is not None
+    if op == "doubt":
+        return db.save_doubt(user_id, rng.choice(SUBJECTS), rng.choice(QUESTIONS),
+                             "Benchmark answer " * 20, rng.choice(LANGUAGES))
+    if op == "test":
+        total_questions = 5
+        correct = rng.randint(0, total_questions)
+        return db.save_test_result(
+            user_id=user_id,
+            subject=rng.choice(SUBJECTS),
+            level=rng.choice(LEVELS),
+            total_marks=total_questions * 5,
+            obtained_marks=correct * 5,
+            percentage=correct / total_questions * 100,
+            correct_answers=correct,
+            total_questions=total_questions,
+            answers=json.dumps({f"q{i}": rng.randint(0, 3) for i in range(total_questions)})
+        )
+    raise ValueError(f"Unknown operation: {op}")
+
+
+def run_worker_process(db_path: str, threads: int, duration: float, mix: Dict[str, float],
+                       seed: int) -> Dict[str, Dict]:
+    """
+    Run `threads` workload threads for `duration` seconds in this process.
+    Top-level so it can be used with ProcessPoolExecutor.
+    Returns {op: {"latencies": [...seconds], "errors": n}}.
+    """
+    db = ShikshaMitraDB(db_path)
+
+    conn = db.get_connection()
+    user_rows = conn.execute(
+        "SELECT user_id, username FROM users WHERE username LIKE 'bench_student_%'"
+    ).fetchall()
+    conn.close()
+    students = [(user_id, int(username.rsplit('_', 1)[1])) for user_id, username in user_rows]
+    if not students:
+        raise RuntimeError("No seeded students found - run with seeding enabled first")
+
+    ops = list(mix.keys())
+    weights = list(mix.values())
+    results = {op: {"latencies": [], "errors": 0} for op in ops}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed: int):
+        rng = random.Random(worker_seed)
+        local = {op: {"latencies": [], "errors": 0} for op in ops}
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, weights)[0]
+            user_id, index = rng.choice(students)
+            start = time.perf_counter()
+            try:
+                ok = _run_operation(db, op, index, user_id, rng)
+            except Exception:
+                ok = False
+            local[op]["latencies"].append(time.perf_counter() - start)
+            if not ok:
+                local[op]["errors"] += 1
+        with lock:
+            for op in ops:
+                results[op]["latencies"].extend(local[op]["latencies"])
+                results[op]["errors"] += local[op]["errors"]
+
+    workers = [threading.Thread(target=worker, args=(seed * 1000 + i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    return results
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(raw: Dict[str, Dict], elapsed: float) -> Dict[str, Dict]:
+    """Turn raw latencies into throughput and p50/p95/p99 (milliseconds)"""
+    summary = {}
+    all_latencies = []
+    total_errors = 0
+
+    for op, data in raw.items():
+        latencies = sorted(data["latencies"])
+        all_latencies.extend(latencies)
+        total_errors += data["errors"]
+        summary[op] = _latency_stats(latencies, data["errors"], elapsed)
+
+    summary["all"] = _latency_stats(sorted(all_latencies), total_errors, elapsed)
+    return summary
+
+
+def _latency_stats(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput_ops": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def compare_results(current: Dict, baseline_path: str, max_regression: float) -> bool:
+    """
+    Print a comparison with a previous JSON result.
+    Returns False if any operation's p95 or throughput regressed by more than
+    `max_regression` percent.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    ok = True
+    print(f"\nComparison with {baseline_path} ({baseline.get('label', 'baseline')}):")
+    for op, stats in current["results"].items():
+        base = baseline.get("results", {}).get(op)
+        if not base:
+            continue
+
+        p95_change = _pct_change(base["p95_ms"], stats["p95_ms"])
+        tput_change = _pct_change(base["throughput_ops"], stats["throughput_ops"])
+        regressed = p95_change > max_regression or -tput_change > max_regression
+        ok = ok and not regressed
+
+        flag = "❌ REGRESSION" if regressed else "✓"
+        print(f"  {op:<6} p95 {base['p95_ms']:>8.2f} -> {stats['p95_ms']:>8.2f} ms ({p95_change:+.1f}%)  "
+              f"throughput {base['throughput_ops']:>9.1f} -> {stats['throughput_ops']:>9.1f} ops/s "
+              f"({tput_change:+.1f}%)  {flag}")
+    return ok
+
+
+def _pct_change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def parse_mix(mix_arg: Optional[str]) -> Dict[str, float]:
+    """Parse 'login=0.2,stats=0.4,...' into normalised weights"""
+    if not mix_arg:
+        mix = dict(DEFAULT_MIX)
+    else:
+        mix = {}
+        for part in mix_arg.split(','):
+            op, weight = part.split('=')
+            op = op.strip()
+            if op not in DEFAULT_MIX:
+                raise ValueError(f"Unknown operation in mix: {op}")
+            mix[op] = float(weight)
+
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Operation mix weights must sum to a positive number")
+    return {op: weight / total for op, weight in mix.items() if weight > 0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Shiksha Mitra database operations")
+    parser.add_argument("--db", default="bench_shiksha_mitra.db", help="Benchmark database file")
+    parser.add_argument("--students", type=int, default=200, help="Number of students to seed")
+    parser.add_argument("--tests", type=int, default=10, help="Tests seeded per student")
+    parser.add_argument("--doubts", type=int, default=10, help="Doubts seeded per student")
+    parser.add_argument("--threads", type=int, default=4, help="Workload threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run the workload")
+    parser.add_argument("--mix", help="Operation weights, e.g. login=0.2,stats=0.4,doubt=0.2,test=0.2")
+    parser.add_argument("--wal", action="store_true", help="Switch the database to WAL journal mode")
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing seeded database")
+    parser.add_argument("--label", default="default", help="Name of the configuration being measured")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", default="bench_db_results.json", help="JSON output path")
+    parser.add_argument("--compare", help="Previous JSON result to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed p95/throughput regression in percent when comparing")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+
+    if not args.reuse and os.path.exists(args.db):
+        os.remove(args.db)
+
+    db = ShikshaMitraDB(args.db)
+
+    if args.wal:
+        conn = sqlite3.connect(args.db)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+
+    seeded = None
+    if not args.reuse:
+        print(f"🌱 Seeding {args.students} students ({args.tests} tests, {args.doubts} doubts each)...")
+        seeded = seed_database(db, args.students, args.tests, args.doubts, args.seed)
+        print(f"   Seeded in {seeded['seconds']}s")
+
+    print(f"🏃 Running {args.processes} process(es) x {args.threads} thread(s) for {args.duration}s...")
+    start = time.perf_counter()
+    if args.processes <= 1:
+        raw_parts = [run_worker_process(args.db, args.threads, args.duration, mix, args.seed)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = [
+                executor.submit(run_worker_process, args.db, args.threads, args.duration, mix, args.seed + p)
+                for p in range(args.processes)
+            ]
+            raw_parts = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    raw = {op: {"latencies": [], "errors": 0} for op in mix}
+    for part in raw_parts:
+        for op, data in part.items():
+            raw[op]["latencies"].extend(data["latencies"])
+            raw[op]["errors"] += data["errors"]
+
+    report = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "db": args.db,
+            "students": args.students,
+            "tests_per_student": args.tests,
+            "doubts_per_student": args.doubts,
+            "threads": args.threads,
+            "processes": args.processes,
+            "duration_seconds": args.duration,
+            "mix": mix,
+            "wal": args.wal,
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "seeding": seeded,
+        "elapsed_seconds": round(elapsed, 3),
+        "results": summarize(raw, elapsed),
+    }
+
+    print(f"\n{'op':<6} {'count':>8} {'err':>5} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for op, stats in report["results"].items():
+        print(f"{op:<6} {stats['count']:>8} {stats['errors']:>5} {stats['throughput_ops']:>10.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.compare:
+        if not compare_results(report, args.compare, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# bench_pdf_extractors.py
+"""
+PDF extraction benchmark for Shiksha Mitra
+Runs every installed extraction backend over the same PDFs and reports
+pages/sec, characters extracted and text fidelity. Fidelity is the word-level
+F1 score against a reference: a `<pdf stem>.txt` file next to the PDF when
+one exists, otherwise the text of the reference backend.
+
+Usage:
+    python bench_pdf_extractors.py TextBooks --output bench_pdf_results.json
+    python bench_pdf_extractors.py "TextBooks/Class 6 Science" --reference pypdf2 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pdf_extractors import EXTRACTORS, available_extractors, get_extractor
+
+
+def find_pdfs(paths: List[str], limit: Optional[int] = None) -> List[Path]:
+    """PDF files given directly or found under the given folders"""
+    pdfs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(sorted(path.rglob("*.pdf")))
+        elif path.suffix.lower() == ".pdf":
+            pdfs.append(path)
+    return pdfs[:limit] if limit else pdfs
+
+
+def extract_text(extractor_name: str, pdf_path: Path) -> Dict:
+    """Extract a whole PDF with one backend, timing it"""
+    extractor = get_extractor(extractor_name)
+    start = time.perf_counter()
+    pages = list(extractor.iter_pages(pdf_path))
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "pages": len(pages),
+        "text": "\n".join(text for _, text in pages),
+    }
+
+
+def word_f1(candidate: str, reference: str) -> float:
+    """Bag-of-words F1 between two texts (1.0 means the same words)"""
+    candidate_words = Counter(candidate.lower().split())
+    reference_words = Counter(reference.lower().split())
+    if not candidate_words and not reference_words:
+        return 1.0
+    overlap = sum((candidate_words & reference_words).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / sum(candidate_words.values())
+    recall = overlap / sum(reference_words.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_benchmark(pdfs: List[Path], extractors: List[str], reference: str, repeat: int) -> Dict:
+    """Time each extractor on each PDF and score it against the reference"""
+    results = {name: {"seconds": 0.0, "pages": 0, "chars": 0, "errors": 0, "f1": []} for name in extractors}
+    per_file = []
+
+    for pdf_path in pdfs:
+        ground_truth = pdf_path.with_suffix(".txt")
+        if ground_truth.exists():
+            reference_text = ground_truth.read_text(encoding="utf-8")
+            reference_source = "ground_truth"
+        else:
+            try:
+                reference_text = extract_text(reference, pdf_path)["text"]
+            except Exception as e:
+                print(f"⚠️ Reference {reference} failed on {pdf_path.name}: {e}")
+                reference_text = None
+            reference_source = reference
+
+        file_result = {"pdf": str(pdf_path), "reference": reference_source, "extractors": {}}
+
+        for name in extractors:
+            try:
+                # Best of `repeat` runs to reduce noise from the page cache
+                runs = [extract_text(name, pdf_path) for _ in range(repeat)]
+            except Exception as e:
+                print(f"❌ {name} failed on {pdf_path.name}: {e}")
+                results[name]["errors"] += 1
+                file_result["extractors"][name] = {"error": str(e)}
+                continue
+
+            best = min(runs, key=lambda run: run["seconds"])
+            f1 = word_f1(best["text"], reference_text) if reference_text is not None else None
+
+            results[name]["seconds"] += best["seconds"]
+            results[name]["pages"] += best["pages"]
+            results[name]["chars"] += len(best["text"])
+            if f1 is not None:
+                results[name]["f1"].append(f1)
+
+            file_result["extractors"][name] = {
+                "seconds": round(best["seconds"], 4),
+                "pages": best["pages"],
+                "chars": len(best["text"]),
+                "f1": round(f1, 4) if f1 is not None else None,
+            }
+
+        per_file.append(file_result)
+        print(f"  {pdf_path.name}: " + ", ".join(
+            f"{name} {data['seconds']:.2f}s" for name, data in file_result["extractors"].items()
+            if "seconds" in data
+        ))
+
+    summary = {}
+    for name, data in results.items():
+        summary[name] = {
+            "seconds": round(data["seconds"], 3),
+            "pages": data["pages"],
+            "pages_per_second": round(data["pages"] / data["seconds"], 1) if data["seconds"] > 0 else 0.0,
+            "chars": data["chars"],
+            "errors": data["errors"],
+            "mean_f1": round(sum(data["f1"]) / len(data["f1"]), 4) if data["f1"] else None,
+            "min_f1": round(min(data["f1"]), 4) if data["f1"] else None,
+        }
+
+    return {"summary": summary, "files": per_file}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Shiksha Mitra PDF extraction backends")
+    parser.add_argument("paths", nargs="+", help="PDF files or folders to search for PDFs")
+    parser.add_argument("--extractors", nargs="*", choices=sorted(EXTRACTORS),
+                        help="Backends to measure (default: all installed)")
+    parser.add_argument("--reference", default="pypdf2", choices=sorted(EXTRACTORS),
+                        help="Backend used as reference when there is no .txt ground truth")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per PDF (best is kept)")
+    parser.add_argument("--limit", type=int, help="Only the first N PDFs")
+    parser.add_argument("--output", default="bench_pdf_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    installed = available_extractors()
+    extractors = [name for name in (args.extractors or installed) if name in installed]
+    missing = sorted(set(args.extractors or []) - set(installed))
+    if missing:
+        print(f"⚠️ Not installed, skipping: {', '.join(missing)}")
+    if not extractors:
+        print("❌ No PDF extraction backend is installed")
+        return 1
+
+    pdfs = find_pdfs(args.paths, args.limit)
+    if not pdfs:
+        print("❌ No PDFs found")
+        return 1
+
+    print(f"📄 {len(pdfs)} PDFs, extractors: {', '.join(extractors)}")
+    benchmark = run_benchmark(pdfs, extractors, args.reference, max(args.repeat, 1))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "pdfs": len(pdfs),
+            "extractors": extractors,
+            "reference": args.reference,
+            "repeat": args.repeat,
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "extractor_versions": {name: EXTRACTORS[name].version for name in extractors},
+        },
+        **benchmark,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'extractor':<12} {'pages/s':>9} {'pages':>7} {'chars':>10} {'mean F1':>8} {'errors':>7}")
+    for name, data in report["summary"].items():
+        mean_f1 = f"{data['mean_f1']:.3f}" if data["mean_f1"] is not None else "-"
+        print(f"{name:<12} {data['pages_per_second']:>9.1f} {data['pages']:>7} "
+              f"{data['chars']:>10} {mean_f1:>8} {data['errors']:>7}")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# bench_retrieval.py
+"""
+Retrieval quality vs latency benchmark for Shiksha Mitra
+Builds a throwaway index of a sample textbook corpus for every combination
+of chunk size and ChromaDB HNSW parameters (M, search ef) or NumPy vector
+storage type (float32, float16, int8), then runs a fixed
+set of topic queries through the agent's retrieval path for every retrieval
+mode and n_results. Reports recall@k, MRR, p50/p95 query latency, index size
+(and, for the NumPy store, the bytes scanned per query) and build time per
+configuration as JSON, so runs can be compared across commits.
+
+Queries are JSONL lines with `query`, `class`, `subject`, `language` and the
+expected `chapter` (PDF file stem), optionally `pages` ([first, last]); a hit
+is a returned chunk of that chapter overlapping those pages. The default
+queries target the NCERT Class 6 Science PDFs (fesc101.pdf ... fesc116.pdf)
+in `TextBooks/Class 6 Science`.
+
+Usage:
+    python bench_retrieval.py --textbooks TextBooks --output bench_retrieval_results.json
+    python bench_retrieval.py --chunk-tokens 96 128 256 --hnsw-m 16 32 --hnsw-ef 10 50 100
+    python bench_retrieval.py --vector-backend numpy --vector-dtypes float32 float16 int8 --modes vector
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from text_cache import DEFAULT_TEXT_CACHE_PATH
+from text_chunker import TextChunker
+from embeddings import DEFAULT_EMBEDDING_MODEL, get_embedding_backend
+from retrieval_cache import RetrievalCache
+from numpy_vector_store import DEFAULT_VECTOR_RESCORE
+from teaching_agent import TeachingAgent, DEFAULT_TEXTBOOK_LANGUAGE
+
+
+def load_queries(path: str) -> List[Dict]:
+    """Benchmark queries with their expected chapter (and pages)"""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                queries.append(json.loads(line))
+    return queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def directory_size(path: Path) -> int:
+    """Total bytes of the files under a folder"""
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def is_relevant(metadata: Optional[Dict], query: Dict) -> bool:
+    """Whether a returned chunk is from the expected chapter (and pages)"""
+    if not metadata or metadata.get("chapter") != query["chapter"]:
+        return False
+    pages = query.get("pages")
+    if not pages:
+        return True
+    return metadata.get("page_start", 0) <= pages[-1] and metadata.get("page_end", 0) >= pages[0]
+
+
+def build_index(store_path: Path, args, chunk_tokens: int, hnsw_params: Dict, vector_dtype: Optional[str],
+                embedding_backend, partitions: List[tuple]) -> Dict:
+    """Ingest the corpus into a fresh store, timing it"""
+    if store_path.exists():
+        shutil.rmtree(store_path)
+
+    agent = TeachingAgent(
+        groq_api_key="",
+        textbook_path=args.textbooks,
+        vector_store_path=str(store_path),
+        pdf_extractor=args.extractor,
+        text_cache_path=args.text_cache or None,
+        chunker=TextChunker(chunk_tokens=chunk_tokens, overlap_tokens=args.overlap_tokens),
+        embedding_backend=embedding_backend,
+        vector_backend=args.vector_backend,
+        hnsw_params=hnsw_params,
+        vector_dtype=vector_dtype or "float32",
+        vector_rescore=args.rescore
+    )
+    agent.textbook_language = args.language
+    # Every query must reach the index
+    agent.retrieval_cache = RetrievalCache(max_entries=0)
+
+    start = time.perf_counter()
+    messages = []
+    for class_num, subject in partitions:
+        success, message = agent.ingest_textbook(class_num, subject, args.language)
+        messages.append(f"Class {class_num} {subject}: {message}")
+        if not success:
+            raise RuntimeError(message)
+    seconds = time.perf_counter() - start
+
+    chunks = sum(len(entry['chunk_ids']) for entry in agent.manifest.all_entries().values())
+    search_bytes = vector_bytes = None
+    if args.vector_backend == "numpy":
+        collections = [agent.get_collection(class_num, subject, args.language) for class_num, subject in partitions]
+        search_bytes = sum(c.search_bytes() for c in collections if c is not None)
+        # Includes the float32 re-scoring copy of compact dtypes
+        vector_bytes = sum(c.disk_bytes() for c in collections if c is not None)
+    return {
+        "agent": agent,
+        "build_seconds": round(seconds, 3),
+        "chunks": chunks,
+        "index_bytes": directory_size(store_path),
+        "search_bytes": search_bytes,
+        "vector_bytes": vector_bytes,
+        "messages": messages,
+    }
+
+
+def chunk_metadata(agent: TeachingAgent, query: Dict, ids: List[str]) -> Dict[str, Dict]:
+    """Metadata of returned chunk IDs, from whichever partition served the query"""
+    for language in (query.get("language", agent.textbook_language), agent.textbook_language):
+        collection = agent.get_collection(query["class"], query["subject"], language)
+        if collection is not None:
+            result = collection.get(ids=ids, include=["metadatas"])
+            return dict(zip(result["ids"], result["metadatas"]))
+    return {}
+
+
+def evaluate(agent: TeachingAgent, queries: List[Dict], n_results: int, repeat: int) -> Dict:
+    """Recall@n, MRR and latency of one agent configuration"""
+    latencies = []
+    hits = 0
+    reciprocal_ranks = []
+    misses = []
+
+    for query in queries:
+        args = (query["query"], query["class"], query["subject"],
+                query.get("language", agent.textbook_language), n_results)
+        # Same call path as _retrieve_content, without joining the passages
+        for _ in range(repeat):
+            start = time.perf_counter()
+            passages = agent.search_passages(*args) or []
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        metadata = chunk_metadata(agent, query, [p["id"] for p in passages]) if passages else {}
+        rank = next((i for i, p in enumerate(passages, 1) if is_relevant(metadata.get(p["id"]), query)), None)
+        if rank is not None:
+            hits += 1
+            reciprocal_ranks.append(1.0 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+            misses.append(query["query"])
+
+    return {
+        "n_results": n_results,
+        f"recall@{n_results}": round(hits / len(queries), 4) if queries else 0.0,
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4) if reciprocal_ranks else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "misses": misses,
+    }
+
+
+def run_benchmark(args, queries: List[Dict]) -> List[Dict]:
+    """Every configuration of the sweep"""
+    embedding_backend = get_embedding_backend(model_name=args.embedding_model,
+                                              cache_path=args.embedding_cache or None)
+    partitions = sorted({(q["class"], q["subject"]) for q in queries})
+    work_dir = Path(args.work_dir)
+
+    if args.vector_backend == "chroma":
+        store_grid = [(m, ef, None) for m, ef in itertools.product(args.hnsw_m, args.hnsw_ef)]
+    else:
+        # Brute force, no ANN parameters; vectors stored in each dtype
+        store_grid = [(None, None, dtype) for dtype in args.vector_dtypes]
+
+    results = []
+    for chunk_tokens, (hnsw_m, hnsw_ef, vector_dtype) in itertools.product(args.chunk_tokens, store_grid):
+        hnsw_params = {}
+        label = f"chunk{chunk_tokens}"
+        if hnsw_m is not None:
+            hnsw_params = {"hnsw:M": hnsw_m, "hnsw:search_ef": hnsw_ef}
+            label += f"_M{hnsw_m}_ef{hnsw_ef}"
+        if vector_dtype is not None:
+            label += f"_{vector_dtype}"
+            if vector_dtype != "float32" and not args.rescore:
+                label += "_norescore"
+        print(f"🔨 Building {label}...", flush=True)
+
+        build = build_index(work_dir / label, args, chunk_tokens, hnsw_params, vector_dtype,
+                            embedding_backend, partitions)
+        agent = build.pop("agent")
+        print(f"   {build['chunks']} chunks in {build['build_seconds']:.1f}s, "
+              f"{build['index_bytes'] / 1e6:.1f} MB on disk"
+              + (f", {build['vector_bytes'] / 1e6:.2f} MB of vectors, "
+                 f"{build['search_bytes'] / 1e6:.2f} MB scanned per query" if build["search_bytes"] else ""))
+
+        for mode in args.modes:
+            agent.retrieval_mode = mode
+            # Warm-up: model load and first index read are not query latency
+            agent.search_passages(queries[0]["query"], queries[0]["class"], queries[0]["subject"],
+                                  queries[0].get("language", args.language))
+            for n_results in args.n_results:
+                evaluation = evaluate(agent, queries, n_results, args.repeat)
+                results.append({
+                    "label": label,
+                    "vector_backend": args.vector_backend,
+                    "chunk_tokens": chunk_tokens,
+                    "hnsw_m": hnsw_m,
+                    "hnsw_search_ef": hnsw_ef,
+                    "vector_dtype": vector_dtype,
+                    "vector_rescore": args.rescore if vector_dtype not in (None, "float32") else None,
+                    "mode": mode,
+                    **build,
+                    **evaluation,
+                })
+                print(f"   {mode:<8} n={n_results}: recall {evaluation[f'recall@{n_results}']:.2f}, "
+                      f"MRR {evaluation['mrr']:.2f}, p50 {evaluation['p50_ms']:.1f}ms, "
+                      f"p95 {evaluation['p95_ms']:.1f}ms")
+
+        if not args.keep_indexes:
+            shutil.rmtree(work_dir / label, ignore_errors=True)
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Shiksha Mitra retrieval quality and latency")
+    parser.add_argument("--textbooks", default="TextBooks", help="Folder containing 'Class N Subject' folders")
+    parser.add_argument("--queries", default="bench_retrieval_queries.jsonl", help="Benchmark queries (JSONL)")
+    parser.add_argument("--language", default=DEFAULT_TEXTBOOK_LANGUAGE, help="Language of the PDFs")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma",
+                        help="Vector store implementation")
+    parser.add_argument("--modes", nargs="+", choices=["hybrid", "vector", "lexical"], default=["hybrid", "vector"],
+                        help="Retrieval modes to measure")
+    parser.add_argument("--n-results", type=int, nargs="+", default=[1, 2, 5], help="Passages per query (k)")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[128], help="Chunk sizes to build")
+    parser.add_argument("--overlap-tokens", type=int, default=24, help="Tokens repeated between chunks")
+    parser.add_argument("--hnsw-m", type=int, nargs="+", default=[16], help="HNSW M values (ChromaDB)")
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[10, 100], help="HNSW search ef values (ChromaDB)")
+    parser.add_argument("--vector-dtypes", nargs="+", choices=["float32", "float16", "int8"], default=["float32"],
+                        help="Vector storage types (NumPy store); float16/int8 keep a float32 re-scoring copy "
+                             "on disk too unless --no-rescore")
+    parser.add_argument("--no-rescore", dest="rescore", action="store_false", default=DEFAULT_VECTOR_RESCORE,
+                        help="Build float16/int8 stores without the float32 re-scoring copy")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--extractor", help="PDF text extraction backend")
+    parser.add_argument("--text-cache", default=DEFAULT_TEXT_CACHE_PATH, help="Extracted page text cache ('' disables)")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL, help="Sentence-transformers model")
+    parser.add_argument("--embedding-cache", default="",
+                        help="Embedding cache database (default: none, so build time includes embedding)")
+    parser.add_argument("--work-dir", default="bench_retrieval_store", help="Where throwaway indexes are built")
+    parser.add_argument("--keep-indexes", action="store_true", help="Keep the built indexes")
+    parser.add_argument("--label", help="Name of this run (e.g. a commit)")
+    parser.add_argument("--output", default="bench_retrieval_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries)
+    if not queries:
+        print("❌ No benchmark queries")
+        return 1
+    if not Path(args.textbooks).exists():
+        print(f"❌ Textbook folder not found: {args.textbooks}")
+        return 1
+
+    print(f"🔎 {len(queries)} queries, chunk sizes {args.chunk_tokens}, modes {args.modes}")
+    results = run_benchmark(args, queries)
+    if not args.keep_indexes:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "label": args.label,
+        "config": {
+            "queries": args.queries,
+            "query_count": len(queries),
+            "textbooks": args.textbooks,
+            "vector_backend": args.vector_backend,
+            "embedding_model": args.embedding_model,
+            "repeat": args.repeat,
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'configuration':<24} {'mode':<8} {'k':>3} {'recall':>7} {'MRR':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'MB':>7} {'build s':>8}")
+    for row in results:
+        print(f"{row['label']:<24} {row['mode']:<8} {row['n_results']:>3} "
+              f"{row['recall@' + str(row['n_results'])]:>7.2f} {row['mrr']:>6.2f} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['index_bytes'] / 1e6:>7.1f} "
+              f"{row['build_seconds']:>8.1f}")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,12 @@ Handles user authentication, profile storage, and learning progress
 import sqlite3
 import hashlib
 import json
-from datetime import datetime
+import secrets
+import threading
+import time
+import atexit
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import os
 
@@ -17,7 +22,24 @@ class ShikshaMitraDB:
     def __init__(self, db_path: str = "shiksha_mitra.db"):
         """Initialize database connection"""
         self.db_path = db_path
+        
+        # Session tokens: hot LRU in front of the sessions table
+        self.session_ttl = timedelta(days=7)
+        self.session_cache_size = 1000
+        self._session_cache = OrderedDict()
+        self._session_lock = threading.Lock()
+        
+        # Write-behind buffers for last_login and in-progress test answers,
+        # flushed in batches
+        self.write_flush_interval = 30
+        self._pending_logins = {}
+        self._pending_answers = {}
+        self._pending_lock = threading.Lock()
+        self._last_session_purge = 0.0
+        
         self.init_database()
+        self._start_write_flusher()
+        atexit.register(self.flush_pending_writes)
     
     def get_connection(self):
         """Get database connection"""
@@ -130,11 +152,59 @@ class ShikshaMitraDB:
             total_questions INTEGER NOT NULL,
             answers TEXT,
             completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            attempt_id TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        """)
+        
+        # Databases created before attempt IDs need the column added
+        cursor.execute("PRAGMA table_info(enhanced_test_results)")
+        if 'attempt_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE enhanced_test_results ADD COLUMN attempt_id TEXT")
+        
+        # Login sessions (only the token hash is stored)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        """)
+        
+        # In-progress test attempts (deleted once submitted or cancelled)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS test_attempts (
+            attempt_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            level TEXT NOT NULL,
+            language TEXT,
+            question_ids TEXT NOT NULL,  -- JSON array
+            answers TEXT,  -- JSON object
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
         )
         """)
         
         # Create indexes for better query performance
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_test_attempts_user 
+        ON test_attempts(user_id, updated_at)
+        """)
+        
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_user 
+        ON sessions(user_id)
+        """)
+        
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_expiry 
+        ON sessions(expires_at)
+        """)
+        
         cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_enhanced_test_user 
         ON enhanced_test_results(user_id)
@@ -150,6 +220,11 @@ class ShikshaMitraDB:
         ON enhanced_test_results(completed_at)
         """)
         
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_enhanced_test_attempt 
+        ON enhanced_test_results(attempt_id)
+        """)
+        
         conn.commit()
         conn.close()
         print("✅ Database initialized successfully!")
@@ -214,25 +289,227 @@ class ShikshaMitraDB:
             )
             
             result = cursor.fetchone()
+            conn.close()
             
             if result:
                 user_id = result[0]
-                # Update last login
-                cursor.execute(
-                    "UPDATE users SET last_login = ? WHERE user_id = ?",
-                    (datetime.now(), user_id)
-                )
-                conn.commit()
-                conn.close()
+                # last_login is written in batches by the flusher
+                self._queue_last_login(user_id)
                 return True, user_id
             else:
-                conn.close()
                 return False, None
                 
         except Exception as e:
             print(f"Authentication error: {e}")
             return False, None
     
+    # ==================== SESSION TOKENS ====================
+    
+    def _hash_token(self, token: str) -> str:
+        """Hash a session token for storage"""
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def _cache_session(self, token_hash: str, entry: Dict) -> None:
+        """Store a session in the LRU with auto-eviction"""
+        with self._session_lock:
+            self._session_cache[token_hash] = entry
+            self._session_cache.move_to_end(token_hash)
+            while len(self._session_cache) > self.session_cache_size:
+                self._session_cache.popitem(last=False)
+    
+    def create_session(self, user_id: int, profile: Optional[Dict] = None) -> Optional[str]:
+        """
+        Create a login session for an authenticated user
+        Returns: the session token (None on error)
+        """
+        try:
+            token = secrets.token_urlsafe(32)
+            token_hash = self._hash_token(token)
+            expires_at = datetime.now() + self.session_ttl
+            
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, ?)",
+                (token_hash, user_id, expires_at.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.commit()
+            conn.close()
+            
+            self._cache_session(token_hash, {
+                'user_id': user_id,
+                'expires_at': expires_at,
+                'profile': profile,
+                'last_seen': datetime.now().date()
+            })
+            return token
+            
+        except Exception as e:
+            print(f"Error creating session: {e}")
+            return None
+    
+    def resume_session(self, token: str) -> Optional[Dict]:
+        """
+        Resume a session from its token without re-authenticating
+        Returns: {'user_id', 'profile', 'first_visit_today'} or None if invalid/expired
+        """
+        if not token:
+            return None
+        
+        token_hash = self._hash_token(token)
+        now = datetime.now()
+        
+        with self._session_lock:
+            entry = self._session_cache.get(token_hash)
+            if entry:
+                self._session_cache.move_to_end(token_hash)
+        
+        if entry is None:
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT user_id, expires_at FROM sessions WHERE token_hash = ?",
+                    (token_hash,)
+                )
+                result = cursor.fetchone()
+                conn.close()
+            except Exception as e:
+                print(f"Error resuming session: {e}")
+                return None
+            
+            if not result:
+                return None
+            
+            entry = {
+                'user_id': result[0],
+                'expires_at': datetime.strptime(result[1], '%Y-%m-%d %H:%M:%S'),
+                'profile': None,
+                'last_seen': None
+            }
+            self._cache_session(token_hash, entry)
+        
+        if entry['expires_at'] <= now:
+            self.revoke_session(token)
+            return None
+        
+        if entry['profile'] is None:
+            entry['profile'] = self.get_user_profile(entry['user_id'])
+        
+        first_visit_today = entry['last_seen'] != now.date()
+        entry['last_seen'] = now.date()
+        self._queue_last_login(entry['user_id'])
+        
+        return {
+            'user_id': entry['user_id'],
+            'profile': entry['profile'],
+            'first_visit_today': first_visit_today
+        }
+    
+    def revoke_session(self, token: str) -> bool:
+        """Revoke a session (logout)"""
+        token_hash = self._hash_token(token)
+        with self._session_lock:
+            self._session_cache.pop(token_hash, None)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error revoking session: {e}")
+            return False
+    
+    def _invalidate_cached_profile(self, user_id: int) -> None:
+        """Drop cached profiles for a user so the next resume reloads them"""
+        with self._session_lock:
+            for entry in self._session_cache.values():
+                if entry['user_id'] == user_id:
+                    entry['profile'] = None
+    
+    def purge_expired_sessions(self) -> int:
+        """Delete expired sessions, returns number removed"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?",
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),)
+            )
+            removed = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return removed
+        except Exception as e:
+            print(f"Error purging sessions: {e}")
+            return 0
+    
+    # ==================== BATCHED WRITES ====================
+    
+    def _queue_last_login(self, user_id: int) -> None:
+        """Record a login; the latest time per user is written on the next flush"""
+        with self._pending_lock:
+            self._pending_logins[user_id] = datetime.now()
+    
+    def flush_pending_writes(self) -> None:
+        """Write all buffered updates in one transaction"""
+        with self._pending_lock:
+            logins = self._pending_logins
+            self._pending_logins = {}
+            answers = self._pending_answers
+            self._pending_answers = {}
+        
+        if answers:
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE test_attempts SET answers = ?, updated_at = ? WHERE attempt_id = ?",
+                    [(json.dumps(attempt_answers), updated_at, attempt_id)
+                     for attempt_id, (attempt_answers, updated_at) in answers.items()]
+                )
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"Error flushing test answers: {e}")
+                with self._pending_lock:
+                    for attempt_id, pending in answers.items():
+                        self._pending_answers.setdefault(attempt_id, pending)
+        
+        if logins:
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE users SET last_login = ? WHERE user_id = ?",
+                    [(login_time, user_id) for user_id, login_time in logins.items()]
+                )
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"Error flushing last_login updates: {e}")
+                # Put them back unless a newer login was queued meanwhile
+                with self._pending_lock:
+                    for user_id, login_time in logins.items():
+                        self._pending_logins.setdefault(user_id, login_time)
+        
+        if time.time() - self._last_session_purge > 3600:
+            self._last_session_purge = time.time()
+            self.purge_expired_sessions()
+            self.purge_stale_attempts()
+    
+    def _start_write_flusher(self) -> None:
+        """Start the background thread that flushes buffered writes"""
+        def run():
+            while True:
+                time.sleep(self.write_flush_interval)
+                self.flush_pending_writes()
+        
+        threading.Thread(target=run, daemon=True, name="shiksha-db-flusher").start()
+    
     def create_or_update_profile(self, user_id: int, full_name: str, class_number: int, 
                                   language: str, subjects: List[str], 
                                   date_of_birth: Optional[str] = None,
@@ -270,6 +547,7 @@ class ShikshaMitraDB:
             conn.commit()
             conn.close()
             
+            self._invalidate_cached_profile(user_id)
             return True, "Profile saved successfully!"
             
         except Exception as e:
@@ -497,8 +775,13 @@ class ShikshaMitraDB:
     # ==================== ENHANCED TEST METHODS ====================
     
     def save_test_result(self, user_id, subject, level, total_marks, obtained_marks, 
-                         percentage, correct_answers, total_questions, answers):
-        """Save test result to database"""
+                         percentage, correct_answers, total_questions, answers,
+                         attempt_id=None):
+        """
+        Save test result to database
+        With an attempt_id the save is idempotent: repeated saves of the
+        same attempt keep the first result instead of adding rows.
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -506,12 +789,13 @@ class ShikshaMitraDB:
             cursor.execute("""
             INSERT INTO enhanced_test_results 
             (user_id, subject, level, total_marks, obtained_marks, percentage, 
-             correct_answers, total_questions, answers, completed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             correct_answers, total_questions, answers, completed_at, attempt_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(attempt_id) DO NOTHING
             """, (
                 user_id, subject, level, total_marks, obtained_marks, 
                 percentage, correct_answers, total_questions, answers,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'), attempt_id
             ))
             
             conn.commit()
@@ -521,6 +805,135 @@ class ShikshaMitraDB:
             print(f"Error saving test result: {e}")
             return False
 
+    def start_test_attempt(self, attempt_id, user_id, subject, level, language, question_ids):
+        """Record a new in-progress test attempt"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute("""
+            INSERT OR IGNORE INTO test_attempts
+            (attempt_id, user_id, subject, level, language, question_ids, answers, started_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (attempt_id, user_id, subject, level, language,
+                  json.dumps(list(question_ids)), json.dumps({}), now, now))
+            
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error starting test attempt: {e}")
+            return False
+
+    def queue_attempt_answers(self, attempt_id, answers):
+        """
+        Autosave in-progress answers
+        Only the latest answers per attempt are kept; they are written
+        together with other buffered updates on the next flush.
+        """
+        with self._pending_lock:
+            self._pending_answers[attempt_id] = (
+                dict(answers), datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+    def get_active_attempt(self, user_id):
+        """Get the user's most recent unfinished test attempt, including unflushed answers"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+            SELECT attempt_id, subject, level, language, question_ids, answers, started_at, updated_at
+            FROM test_attempts
+            WHERE user_id = ?
+            ORDER BY updated_at DESC
+            LIMIT 1
+            """, (user_id,))
+            
+            row = cursor.fetchone()
+            
+            if row:
+                columns = [description[0] for description in cursor.description]
+                conn.close()
+                attempt = dict(zip(columns, row))
+                attempt['question_ids'] = json.loads(attempt['question_ids'])
+                attempt['answers'] = json.loads(attempt['answers']) if attempt['answers'] else {}
+                
+                with self._pending_lock:
+                    pending = self._pending_answers.get(attempt['attempt_id'])
+                if pending:
+                    attempt['answers'] = dict(pending[0])
+                return attempt
+            
+            conn.close()
+            return None
+        except Exception as e:
+            print(f"Error fetching active attempt: {e}")
+            return None
+
+    def finish_test_attempt(self, attempt_id):
+        """Remove an attempt once it is submitted or cancelled"""
+        with self._pending_lock:
+            self._pending_answers.pop(attempt_id, None)
+        
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM test_attempts WHERE attempt_id = ?", (attempt_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error finishing test attempt: {e}")
+            return False
+
+    def purge_stale_attempts(self, max_age_days=7):
+        """Delete attempts abandoned for more than max_age_days"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cutoff = datetime.now() - timedelta(days=max_age_days)
+            cursor.execute(
+                "DELETE FROM test_attempts WHERE updated_at <= ?",
+                (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)
+            )
+            removed = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return removed
+        except Exception as e:
+            print(f"Error purging test attempts: {e}")
+            return 0
+
+    def get_test_result(self, attempt_id):
+        """Get the saved result of a test attempt"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+            SELECT id, user_id, subject, level, total_marks, obtained_marks, percentage,
+                   correct_answers, total_questions, answers, completed_at, attempt_id
+            FROM enhanced_test_results
+            WHERE attempt_id = ?
+            """, (attempt_id,))
+            
+            row = cursor.fetchone()
+            
+            if row:
+                columns = [description[0] for description in cursor.description]
+                conn.close()
+                result = dict(zip(columns, row))
+                result['answers'] = json.loads(result['answers']) if result['answers'] else {}
+                return result
+            
+            conn.close()
+            return None
+        except Exception as e:
+            print(f"Error fetching test result: {e}")
+            return None
+
     def get_user_test_results(self, user_id, limit=20):
         """Get user's test results"""
         try:
@@ -657,4 +1070,11 @@ if __name__ == "__main__":
         # Update streak
         db.update_streak(auth_user_id)
         db.add_xp(auth_user_id, 50)
-        print("Updated streak and XP")
\ No newline at end of file
+        print("Updated streak and XP")
+        
+        # Test session resume
+        token = db.create_session(auth_user_id, profile)
+        resumed = db.resume_session(token)
+        print(f"Session resume: {'Success' if resumed else 'Failed'}")
+        db.revoke_session(token)
+        db.flush_pending_writes()
\ No newline at end of file
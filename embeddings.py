@@ -0,0 +1,217 @@
+# embeddings.py
+"""
+Embedding Backend for Shiksha Mitra
+Explicit CPU embedding function for the textbook index: model, batch size
+and thread count are configurable, an ONNX Runtime backend (optionally
+int8-quantized) can replace PyTorch, and every embedding is cached on disk by
+content hash so duplicate or re-ingested text is never embedded twice.
+
+Install `optimum[onnxruntime]` to use the ONNX backend.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("SHIKSHA_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+DEFAULT_EMBEDDING_CACHE_PATH = os.getenv("SHIKSHA_EMBEDDING_CACHE", "embedding_cache.db")
+# Quantized weights shipped in the all-MiniLM-L6-v2 repository (AVX2 works on most x86 CPUs)
+DEFAULT_QUANTIZED_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def text_hash(text: str) -> str:
+    """Content hash used as the embedding cache key"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings keyed by model and text hash, stored as float32 blobs"""
+
+    def __init__(self, db_path: str = DEFAULT_EMBEDDING_CACHE_PATH):
+        """Open (or create) the cache"""
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_database()
+
+    def get_connection(self):
+        """Get database connection"""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Initialize cache table"""
+        conn = self.get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            vector BLOB NOT NULL,  -- float32
+            created_at TIMESTAMP,
+            PRIMARY KEY (model, text_hash)
+        ) WITHOUT ROWID
+        """)
+        conn.commit()
+        conn.close()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, "np.ndarray"]:
+        """Cached vectors for these hashes (missing ones are left out)"""
+        found = {}
+        conn = self.get_connection()
+        try:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = conn.execute(f"""
+                SELECT text_hash, vector FROM embeddings
+                WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})
+                """, (model, *batch)).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, "np.ndarray"]) -> None:
+        """Store vectors in one transaction"""
+        if not vectors:
+            return
+        now = datetime.now().isoformat()
+        conn = self.get_connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for key, vector in vectors.items()]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class EmbeddingBackend:
+    """
+    Sentence-transformers embedding function usable by ChromaDB
+    The model is loaded on first use. Calls are serialized so concurrent
+    sessions share one model without oversubscribing the CPU.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64,
+                 num_threads: Optional[int] = None, backend: str = "torch",
+                 quantized: bool = False, onnx_file: Optional[str] = None,
+                 cache_path: Optional[str] = DEFAULT_EMBEDDING_CACHE_PATH):
+        """
+        backend: "torch" or "onnx" (ONNX Runtime via optimum)
+        quantized: with the ONNX backend, load int8 weights (onnx_file overrides which)
+        cache_path: embedding cache database, None disables caching
+        """
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown embedding backend '{backend}'. Choose 'torch' or 'onnx'")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.backend = backend
+        self.onnx_file = onnx_file or (DEFAULT_QUANTIZED_ONNX_FILE if quantized else None)
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+
+        # Cached vectors are only reused by an identical model configuration
+        self.model_key = model_name if backend == "torch" else f"{model_name}|onnx|{self.onnx_file or 'model.onnx'}"
+
+        self._model = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.embedded = 0
+        self.cache_hits = 0
+
+    def _load_model(self):
+        """Load the model on first use"""
+        if self._model is not None:
+            return self._model
+
+        # Imported here: it pulls in PyTorch, which is slow to import
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "onnx":
+            model_kwargs = {}
+            if self.onnx_file:
+                model_kwargs["file_name"] = self.onnx_file
+            if self.num_threads:
+                import onnxruntime
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = self.num_threads
+                model_kwargs["session_options"] = options
+            self._model = SentenceTransformer(self.model_name, device="cpu", backend="onnx",
+                                              model_kwargs=model_kwargs)
+        else:
+            if self.num_threads:
+                import torch
+                torch.set_num_threads(self.num_threads)
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+
+        print(f"✓ Embedding model: {self.model_name} ({self.backend}{', ' + self.onnx_file if self.onnx_file else ''})")
+        return self._model
+
+    def embed(self, texts: List[str], cache: bool = True) -> List[List[float]]:
+        """
+        Embed texts, reusing cached and duplicate embeddings
+        cache=False skips the on-disk cache (search queries: no SQLite I/O on
+        the request path, and one-off questions never fill the cache).
+        """
+        cache = self.cache if cache else None
+        hashes = [text_hash(text) for text in texts]
+        vectors = cache.get_many(self.model_key, list(set(hashes))) if cache else {}
+        self.cache_hits += sum(1 for key in hashes if key in vectors)
+
+        # Each distinct uncached text is embedded once
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            with self._lock:
+                model = self._load_model()
+                encoded = model.encode(list(missing.values()), batch_size=self.batch_size,
+                                       normalize_embeddings=True, convert_to_numpy=True,
+                                       show_progress_bar=False)
+            new_vectors = dict(zip(missing.keys(), encoded.astype(np.float32)))
+            if cache:
+                cache.put_many(self.model_key, new_vectors)
+            vectors.update(new_vectors)
+            self.embedded += len(new_vectors)
+
+        return [vectors[key].tolist() for key in hashes]
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """ChromaDB embedding function interface"""
+        return self.embed(list(input))
+
+
+# Shared backends, one per configuration, so the model is loaded once per process
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64,
+                          num_threads: Optional[int] = None, backend: str = "torch",
+                          quantized: bool = False, onnx_file: Optional[str] = None,
+                          cache_path: Optional[str] = DEFAULT_EMBEDDING_CACHE_PATH) -> Optional[EmbeddingBackend]:
+    """Get the shared embedding backend for a configuration (None without sentence-transformers)"""
+    if importlib.util.find_spec("sentence_transformers") is None:
+        return None
+
+    key = (model_name, batch_size, num_threads, backend, quantized, onnx_file, cache_path)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = EmbeddingBackend(model_name, batch_size, num_threads, backend,
+                                              quantized, onnx_file, cache_path)
+        return _backends[key]
@@ -0,0 +1,261 @@
+# ingest_textbooks.py
+"""
+Headless textbook ingestion for Shiksha Mitra
+Walks every `TextBooks/Class N Subject` folder, extracts PDFs across a
+process pool and feeds a single embedding writer, so the vector store can
+be built offline instead of on the request path. The ingestion manifest
+makes re-runs incremental: unchanged PDFs are skipped, changed ones are
+replaced and removed ones are purged. Chunks are also written to the
+keyword (BM25) index used for hybrid retrieval, and chapter titles and
+headings to the topic index. Extracted page text is cached, so
+`--force` re-runs with a new chunk size do not parse PDFs again.
+
+Usage:
+    python ingest_textbooks.py --textbooks TextBooks --workers 4
+    python ingest_textbooks.py --classes 6 7 --subjects Science Mathematics
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from ingestion_manifest import file_hash
+from pdf_extractors import EXTRACTORS, DEFAULT_EXTRACTOR, get_extractor
+from text_cache import DEFAULT_TEXT_CACHE_PATH
+from text_chunker import TextChunker
+from embeddings import DEFAULT_EMBEDDING_MODEL, DEFAULT_EMBEDDING_CACHE_PATH, get_embedding_backend
+from numpy_vector_store import DEFAULT_VECTOR_DTYPE, DEFAULT_VECTOR_RESCORE
+from teaching_agent import (
+    TeachingAgent,
+    DEFAULT_VECTOR_STORE_PATH,
+    DEFAULT_VECTOR_BACKEND,
+    DEFAULT_TEXTBOOK_LANGUAGE,
+    extract_pdf_chunks,
+    parse_textbook_folder,
+)
+
+load_dotenv()
+
+
+def find_textbook_pdfs(textbook_path: Path, classes: Optional[List[int]] = None,
+                       subjects: Optional[List[str]] = None) -> List[Dict]:
+    """List PDFs under `Class N Subject` folders, optionally filtered"""
+    jobs = []
+    if not textbook_path.exists():
+        return jobs
+
+    for folder in sorted(textbook_path.iterdir()):
+        if not folder.is_dir():
+            continue
+        parsed = parse_textbook_folder(folder.name)
+        if not parsed:
+            continue
+        class_num, subject = parsed
+        if classes and class_num not in classes:
+            continue
+        if subjects and subject not in subjects:
+            continue
+
+        for pdf_file in sorted(folder.glob("*.pdf")):
+            jobs.append({"class_num": class_num, "subject": subject, "pdf": pdf_file})
+
+    return jobs
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def run_ingestion(agent: TeachingAgent, jobs: List[Dict], language: str, workers: int,
+                  chunker: TextChunker, extractor: Optional[str] = None,
+                  text_cache_path: Optional[str] = None) -> Dict:
+    """
+    Extract PDFs in a process pool and write chunks from this process only.
+    At most 2 x workers extractions are in flight so memory stays bounded.
+    """
+    total = len(jobs)
+    done = 0
+    chunks_total = 0
+    chunks_new = 0
+    start = time.perf_counter()
+    pending_jobs = iter(jobs)
+    in_flight = {}
+
+    def submit_next(executor) -> bool:
+        job = next(pending_jobs, None)
+        if job is None:
+            return False
+        future = executor.submit(extract_pdf_chunks, job["pdf"], chunker, extractor,
+                                 text_cache_path, job["content_hash"])
+        in_flight[future] = job
+        return True
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in range(workers * 2):
+            if not submit_next(executor):
+                break
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = in_flight.pop(future)
+                pdf_file = job["pdf"]
+                try:
+                    text_chunks, topics = future.result()
+                    added = agent.ingest_pdf_chunks(job["class_num"], job["subject"], language,
+                                                    pdf_file, text_chunks,
+                                                    job["content_hash"], job["entry"], topics)
+                except Exception as e:
+                    print(f"❌ {pdf_file}: {e}")
+                    text_chunks, added = [], 0
+
+                done += 1
+                chunks_total += len(text_chunks)
+                chunks_new += added
+
+                elapsed = time.perf_counter() - start
+                rate = done / elapsed if elapsed > 0 else 0.0
+                eta = (total - done) / rate if rate > 0 else 0.0
+                print(f"[{done}/{total}] {pdf_file.parent.name}/{pdf_file.name}: "
+                      f"{len(text_chunks)} chunks ({added} new) | "
+                      f"{rate:.2f} PDFs/s, {chunks_total / elapsed if elapsed > 0 else 0:.1f} chunks/s | "
+                      f"ETA {format_duration(eta)}", flush=True)
+
+                submit_next(executor)
+
+    return {
+        "pdfs": done,
+        "chunks": chunks_total,
+        "new_chunks": chunks_new,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-build the Shiksha Mitra textbook index")
+    parser.add_argument("--textbooks", default="TextBooks", help="Folder containing 'Class N Subject' folders")
+    parser.add_argument("--vector-store", default=DEFAULT_VECTOR_STORE_PATH, help="Persistent vector store path")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default=DEFAULT_VECTOR_BACKEND,
+                        help="Vector store implementation")
+    parser.add_argument("--vector-dtype", choices=["float32", "float16", "int8"], default=DEFAULT_VECTOR_DTYPE,
+                        help="NumPy store vector storage. float16/int8 halve/quarter the memory scanned per "
+                             "query, but with re-scoring a float32 copy is kept too, so the files grow 1.5x/1.25x")
+    parser.add_argument("--no-rescore", dest="rescore", action="store_false", default=DEFAULT_VECTOR_RESCORE,
+                        help="Don't keep the float32 copy of float16/int8 vectors (files shrink 2x/4x, "
+                             "results ranked by the compact scores)")
+    parser.add_argument("--language", default=DEFAULT_TEXTBOOK_LANGUAGE,
+                        help="Language of the PDFs (selects the partition they are searched in)")
+    parser.add_argument("--classes", type=int, nargs="*", help="Only these classes")
+    parser.add_argument("--subjects", nargs="*", help="Only these subjects")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Extraction processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding/write batch")
+    parser.add_argument("--chunk-tokens", type=int, default=128, help="Target tokens per chunk")
+    parser.add_argument("--overlap-tokens", type=int, default=24, help="Tokens repeated between chunks")
+    parser.add_argument("--keep-boilerplate", action="store_true",
+                        help="Keep running headers, footers and page numbers")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default=DEFAULT_EXTRACTOR,
+                        help="PDF text extraction backend")
+    parser.add_argument("--text-cache", default=DEFAULT_TEXT_CACHE_PATH,
+                        help="Extracted page text cache (re-chunking skips PDF parsing)")
+    parser.add_argument("--no-text-cache", action="store_true", help="Always parse PDFs")
+    parser.add_argument("--prune-text-cache", action="store_true",
+                        help="Drop cached text of PDFs that are not in this vector store")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL, help="Sentence-transformers model")
+    parser.add_argument("--embedding-batch-size", type=int, default=64, help="Texts per model forward pass")
+    parser.add_argument("--embedding-threads", type=int, help="CPU threads for embedding (default: all)")
+    parser.add_argument("--onnx", action="store_true", help="Embed with ONNX Runtime instead of PyTorch")
+    parser.add_argument("--quantized", action="store_true", help="Use int8 ONNX weights (implies --onnx)")
+    parser.add_argument("--embedding-cache", default=DEFAULT_EMBEDDING_CACHE_PATH,
+                        help="Embedding cache database ('' disables)")
+    parser.add_argument("--rebuild-lexical", action="store_true",
+                        help="Rebuild the keyword (BM25) index from the vector store")
+    parser.add_argument("--force", action="store_true", help="Re-ingest PDFs even if unchanged")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    textbook_path = Path(args.textbooks)
+    jobs = find_textbook_pdfs(textbook_path, args.classes, args.subjects)
+
+    text_cache_path = None if args.no_text_cache else args.text_cache
+    chunker = TextChunker(chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens,
+                          strip_boilerplate=not args.keep_boilerplate)
+    embedding_backend = get_embedding_backend(
+        model_name=args.embedding_model,
+        batch_size=args.embedding_batch_size,
+        num_threads=args.embedding_threads,
+        backend="onnx" if args.onnx or args.quantized else "torch",
+        quantized=args.quantized,
+        cache_path=args.embedding_cache or None
+    )
+    agent = TeachingAgent(
+        groq_api_key=os.getenv("GROQ_API_KEY", ""),
+        textbook_path=args.textbooks,
+        vector_store_path=args.vector_store,
+        ingest_batch_size=args.batch_size,
+        pdf_extractor=args.extractor,
+        text_cache_path=text_cache_path,
+        chunker=chunker,
+        embedding_backend=embedding_backend,
+        vector_backend=args.vector_backend,
+        vector_dtype=args.vector_dtype,
+        vector_rescore=args.rescore
+    )
+    if not agent.vector_store_available:
+        print("❌ Vector store not available")
+        return 1
+
+    removed = agent.purge_missing_pdfs()
+    if removed:
+        print(f"🗑 Purged {removed} PDFs that no longer exist")
+
+    # Only new or changed PDFs are extracted
+    known = agent.manifest.all_entries()
+    remaining = []
+    for job in jobs:
+        entry = known.get(str(job["pdf"].resolve()))
+        if args.force:
+            content_hash = file_hash(job["pdf"])
+        else:
+            content_hash = agent.manifest.check(job["pdf"], entry, args.language)
+        if content_hash is not None:
+            remaining.append(dict(job, entry=entry, content_hash=content_hash))
+
+    skipped = len(jobs) - len(remaining)
+    if skipped:
+        print(f"⏭ {skipped} PDFs unchanged since the last run")
+
+    if remaining:
+        extractor = get_extractor(args.extractor).name
+        print(f"📚 Ingesting {len(remaining)} PDFs with {args.workers} {extractor} extraction workers...")
+        summary = run_ingestion(agent, remaining, args.language, args.workers, chunker,
+                                extractor, text_cache_path)
+        print(f"\n✅ {summary['pdfs']} PDFs, {summary['chunks']} chunks ({summary['new_chunks']} written)")
+        if embedding_backend is not None:
+            print(f"   Embedded {embedding_backend.embedded} texts, {embedding_backend.cache_hits} from cache")
+
+    if args.rebuild_lexical:
+        indexed = agent.rebuild_lexical_index()
+        print(f"🔎 Keyword index rebuilt ({indexed} chunks)")
+
+    if args.prune_text_cache and agent.text_cache is not None:
+        pruned = agent.text_cache.prune(e['content_hash'] for e in agent.manifest.all_entries().values())
+        if pruned:
+            print(f"🗑 Dropped cached text of {pruned} old PDF versions")
+
+    print(f"Done in {format_duration(time.perf_counter() - start)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# ingestion_jobs.py
+"""
+Background Ingestion Jobs for Shiksha Mitra
+Textbook ingestion runs on a shared worker thread instead of inside a page
+render. Jobs are keyed by vector store, class, subject and textbook language,
+so every session asking for the same textbook shares one job and polls its
+progress (files, chunks, ETA) while lessons use general knowledge.
+"""
+
+import os
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from teaching_agent import TeachingAgent
+
+# Ingestion is CPU-bound (PDF parsing, embedding); one worker keeps the app responsive
+DEFAULT_INGESTION_WORKERS = int(os.getenv("SHIKSHA_INGESTION_WORKERS", "1"))
+# A failed job is submitted again at most this often
+FAILED_RETRY_SECONDS = float(os.getenv("SHIKSHA_INGESTION_RETRY_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class IngestionJob:
+    """Ingestion of one class/subject folder and its progress"""
+
+    def __init__(self, key: tuple, class_num: int, subject: str, language: str):
+        self.key = key
+        self.class_num = class_num
+        self.subject = subject
+        self.language = language
+        self.status = QUEUED
+        self.message = ""
+        self.files_done = 0
+        self.files_total = 0
+        self.chunks = 0
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update(self, files_done: int, files_total: int, chunks: int) -> None:
+        """Progress callback for TeachingAgent.ingest_textbook"""
+        self.files_done = files_done
+        self.files_total = files_total
+        self.chunks = chunks
+
+    def fraction(self) -> float:
+        """Share of PDFs done, 0.0 to 1.0"""
+        if self.finished:
+            return 1.0
+        if not self.files_total:
+            return 0.0
+        return self.files_done / self.files_total
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds left from the average time per PDF so far, None before the first PDF"""
+        if self.status != RUNNING or not self.files_done or not self.files_total:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.files_done * (self.files_total - self.files_done)
+
+    def to_dict(self) -> Dict:
+        return {
+            "class_num": self.class_num,
+            "subject": self.subject,
+            "language": self.language,
+            "status": self.status,
+            "message": self.message,
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+            "chunks": self.chunks,
+            "fraction": self.fraction(),
+            "eta_seconds": self.eta_seconds()
+        }
+
+
+class IngestionJobRunner:
+    """Runs ingestion jobs on a small thread pool, one job per textbook partition"""
+
+    def __init__(self, max_workers: int = DEFAULT_INGESTION_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="ingestion")
+        self.jobs = {}  # key -> latest IngestionJob
+        self._lock = threading.Lock()
+
+    def _key(self, agent: TeachingAgent, class_num: int, subject: str, language: str) -> tuple:
+        return (str(Path(agent.manifest.db_path).resolve()), class_num, subject, language)
+
+    def submit(self, agent: TeachingAgent, class_num: int, subject: str,
+               language: Optional[str] = None) -> IngestionJob:
+        """
+        Queue ingestion of a class/subject, or return the job that already covers it
+        A failed job is retried once FAILED_RETRY_SECONDS have passed; a finished
+        one is returned as is (the textbook watcher picks up later changes to the folder).
+        """
+        language = language or agent.textbook_language
+        key = self._key(agent, class_num, subject, language)
+        with self._lock:
+            job = self.jobs.get(key)
+            if job is not None and (job.status != FAILED
+                                    or time.time() - job.finished_at < FAILED_RETRY_SECONDS):
+                return job
+            job = IngestionJob(key, class_num, subject, language)
+            self.jobs[key] = job
+        self.executor.submit(self._run, agent, job)
+        return job
+
+    def _run(self, agent: TeachingAgent, job: IngestionJob) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            success, message = agent.ingest_textbook(job.class_num, job.subject, job.language,
+                                                     progress=job.update)
+        except Exception as e:
+            success, message = False, str(e)
+        job.message = message
+        job.finished_at = time.time()
+        job.status = DONE if success else FAILED
+        print(f"{'✅' if success else '❌'} Ingestion of Class {job.class_num} {job.subject}: {message}")
+
+    def get(self, agent: TeachingAgent, class_num: int, subject: str,
+            language: Optional[str] = None) -> Optional[IngestionJob]:
+        """The job of a class/subject, if one was submitted"""
+        key = self._key(agent, class_num, subject, language or agent.textbook_language)
+        with self._lock:
+            return self.jobs.get(key)
+
+    def jobs_for(self, agent: TeachingAgent, class_num: int, subjects: List[str]) -> List[IngestionJob]:
+        """Submitted jobs of a student's subjects"""
+        jobs = [self.get(agent, class_num, subject) for subject in subjects]
+        return [job for job in jobs if job is not None]
+
+
+_ingestion_jobs = None
+_ingestion_jobs_lock = threading.Lock()
+
+
+def get_ingestion_jobs() -> IngestionJobRunner:
+    """Get the process-wide ingestion job runner"""
+    global _ingestion_jobs
+    with _ingestion_jobs_lock:
+        if _ingestion_jobs is None:
+            _ingestion_jobs = IngestionJobRunner()
+        return _ingestion_jobs
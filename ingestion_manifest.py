@@ -0,0 +1,255 @@
+# ingestion_manifest.py
+"""
+Ingestion Manifest for Shiksha Mitra
+Records, for every ingested PDF, its content hash, size, mtime and the IDs
+of the chunks it produced. Ingestion uses it to skip unchanged files without
+opening them, replace the chunks of changed files and purge removed ones.
+
+The manifest also owns the write lock of the stores it describes: every
+process (app, textbook watcher, CLI) holds it while ingesting or purging,
+so only one of them writes the vector, keyword and topic stores at a time.
+"""
+
+import time
+import sqlite3
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def lock_file(path: str, blocking: bool = True) -> Optional[IO]:
+    """
+    Take an exclusive cross-process lock on a file, released by closing the
+    returned handle. Without blocking, returns None if another process holds it.
+    """
+    handle = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return handle
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                return handle
+            except OSError:
+                if not blocking:
+                    raise
+                time.sleep(1)
+    except OSError:
+        handle.close()
+        if blocking:
+            raise
+        return None
+
+
+class StoreWriteLock:
+    """
+    Re-entrant write lock of one manifest's stores, shared by the threads of a
+    process and held against other processes through a lock file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self) -> "StoreWriteLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._handle = lock_file(self.path, blocking=False)
+                if self._handle is None:
+                    print(f"⏳ Waiting for another process to finish writing the textbook index ({self.path})")
+                    self._handle = lock_file(self.path)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._handle.close()  # releases the lock
+            self._handle = None
+        self._thread_lock.release()
+
+
+# One write lock per manifest per process
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+class IngestionManifest:
+    """SQLite-backed record of ingested PDFs"""
+
+    def __init__(self, db_path):
+        """Open (or create) the manifest"""
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_database()
+
+    def get_connection(self):
+        """Get database connection"""
+        return sqlite3.connect(self.db_path)
+
+    def write_lock(self) -> StoreWriteLock:
+        """Lock to hold while writing the stores this manifest describes"""
+        path = str(Path(self.db_path).resolve()) + ".write.lock"
+        with _write_locks_guard:
+            return _write_locks.setdefault(path, StoreWriteLock(path))
+
+    def init_database(self):
+        """Initialize manifest table"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            pdf_path TEXT PRIMARY KEY,
+            class_num INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            language TEXT,
+            content_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            chunk_ids TEXT NOT NULL,  -- JSON array
+            ingested_at TIMESTAMP
+        )
+        """)
+
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ingested_files_partition
+        ON ingested_files(class_num, subject)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def _row_to_entry(self, row) -> Dict:
+        return {
+            'pdf_path': row[0],
+            'class_num': row[1],
+            'subject': row[2],
+            'language': row[3],
+            'content_hash': row[4],
+            'size': row[5],
+            'mtime': row[6],
+            'chunk_ids': json.loads(row[7]),
+            'ingested_at': row[8]
+        }
+
+    def get(self, pdf_path) -> Optional[Dict]:
+        """Manifest entry of one PDF"""
+        conn = self.get_connection()
+        row = conn.execute("SELECT * FROM ingested_files WHERE pdf_path = ?", (str(pdf_path),)).fetchone()
+        conn.close()
+        return self._row_to_entry(row) if row else None
+
+    def entries_for(self, class_num: int, subject: str) -> Dict[str, Dict]:
+        """All entries of a class and subject, keyed by PDF path"""
+        conn = self.get_connection()
+        rows = conn.execute(
+            "SELECT * FROM ingested_files WHERE class_num = ? AND subject = ?",
+            (class_num, subject)
+        ).fetchall()
+        conn.close()
+        return {row[0]: self._row_to_entry(row) for row in rows}
+
+    def all_entries(self) -> Dict[str, Dict]:
+        """Every entry, keyed by PDF path"""
+        conn = self.get_connection()
+        rows = conn.execute("SELECT * FROM ingested_files").fetchall()
+        conn.close()
+        return {row[0]: self._row_to_entry(row) for row in rows}
+
+    def partition_version(self, class_num: int, subject: str, language: str,
+                          default_language: Optional[str] = None) -> str:
+        """
+        Changes whenever a PDF of the partition is ingested, replaced or removed
+        Entries without a language belong to `default_language`.
+        """
+        conn = self.get_connection()
+        row = conn.execute(
+            "SELECT COUNT(*), MAX(ingested_at) FROM ingested_files "
+            "WHERE class_num = ? AND subject = ? AND COALESCE(language, ?) = ?",
+            (class_num, subject, default_language, language)
+        ).fetchone()
+        conn.close()
+        return f"{row[0]}:{row[1]}"
+
+    def record_many(self, entries: List[Dict]) -> None:
+        """Insert or replace entries in one transaction"""
+        if not entries:
+            return
+        now = datetime.now().isoformat()
+        conn = self.get_connection()
+        conn.executemany("""
+        INSERT OR REPLACE INTO ingested_files
+        (pdf_path, class_num, subject, language, content_hash, size, mtime, chunk_ids, ingested_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (str(e['pdf_path']), e['class_num'], e['subject'], e.get('language'), e['content_hash'],
+             e['size'], e['mtime'], json.dumps(e['chunk_ids']), now)
+            for e in entries
+        ])
+        conn.commit()
+        conn.close()
+
+    def touch(self, pdf_path, size: int, mtime: float) -> None:
+        """Update size/mtime of a file whose contents did not change"""
+        conn = self.get_connection()
+        conn.execute(
+            "UPDATE ingested_files SET size = ?, mtime = ? WHERE pdf_path = ?",
+            (size, mtime, str(pdf_path))
+        )
+        conn.commit()
+        conn.close()
+
+    def remove(self, pdf_path) -> None:
+        """Forget a PDF"""
+        conn = self.get_connection()
+        conn.execute("DELETE FROM ingested_files WHERE pdf_path = ?", (str(pdf_path),))
+        conn.commit()
+        conn.close()
+
+    def check(self, pdf_path: Path, entry: Optional[Dict], language: Optional[str] = None) -> Optional[str]:
+        """
+        Decide whether a PDF needs ingesting, given its entry (None if unknown)
+        Returns None when unchanged (same size and mtime, or same hash),
+        otherwise the new content hash. A PDF ingested under a different
+        language always needs re-ingesting, into that language's partition.
+        """
+        stat = pdf_path.stat()
+
+        if entry and language and entry.get('language') != language:
+            return file_hash(pdf_path)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return None
+
+        content_hash = file_hash(pdf_path)
+        if entry and entry['content_hash'] == content_hash:
+            self.touch(entry['pdf_path'], stat.st_size, stat.st_mtime)
+            return None
+        return content_hash
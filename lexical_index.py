@@ -0,0 +1,234 @@
+# lexical_index.py
+"""
+Lexical Index for Shiksha Mitra
+SQLite FTS5 keyword index of textbook chunks, one table pair per textbook
+partition, built during ingestion alongside the vectors. BM25 search finds
+exact terms (chapter names, formulas, numbers) that embeddings miss, and
+reciprocal rank fusion combines both rankings.
+
+Text is normalized in Python (lowercase, punctuation removed) and indexed
+with FTS5's `ascii` tokenizer, which keeps every non-ASCII character inside
+its word, so Devanagari, Kannada and Telugu words (with their vowel signs)
+stay whole.
+"""
+
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Reciprocal rank fusion constant (60 is the usual choice)
+RRF_K = 60
+
+# Question words and particles that would otherwise match almost every chunk
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "to", "for", "and", "or",
+    "what", "why", "how", "when", "where", "which", "who", "does", "do", "did", "can", "it", "this",
+    "that", "with", "as", "by", "me", "explain", "about", "tell",
+    "क्या", "है", "हैं", "का", "की", "के", "में", "से", "को", "और", "कैसे", "क्यों",
+}
+
+
+def normalize_terms(text: str) -> str:
+    """Lowercase text with all punctuation and symbols replaced by spaces"""
+    return "".join(
+        " " if unicodedata.category(char)[0] in "PSZC" else char
+        for char in text.lower()
+    )
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct search terms of a query, in order, without stopwords"""
+    seen = []
+    for term in normalize_terms(text).split():
+        if term not in seen and term not in STOPWORDS:
+            seen.append(term)
+    return seen
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = RRF_K) -> Dict[str, float]:
+    """Fuse ranked ID lists: each list adds 1 / (k + rank) to its IDs"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def term_coverage(terms: List[str], text: str) -> float:
+    """Fraction of the query terms present in a text (cheap re-rank signal)"""
+    if not terms:
+        return 0.0
+    words = set(normalize_terms(text).split())
+    return sum(1 for term in terms if term in words) / len(terms)
+
+
+def fuse_rankings(vector_ids: List[str], lexical_ids: List[str], texts: Dict[str, str],
+                  query: str, rerank: bool = True) -> List[str]:
+    """
+    Hybrid ranking of vector and keyword results by reciprocal rank fusion
+    With rerank, the share of query terms a chunk contains is added with the
+    weight of one top-ranked vote, which breaks ties towards exact matches.
+    """
+    scores = reciprocal_rank_fusion([vector_ids, lexical_ids])
+    if rerank:
+        terms = query_terms(query)
+        for doc_id in scores:
+            scores[doc_id] += term_coverage(terms, texts.get(doc_id, "")) / (RRF_K + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex:
+    """Per-partition FTS5/BM25 index of chunk text"""
+
+    def __init__(self, db_path):
+        """Open (or create) the index"""
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._known_partitions = set()
+        self._lock = threading.Lock()
+        self.available = self._fts5_available()
+        if not self.available:
+            print("Warning: SQLite FTS5 not available, keyword search disabled")
+
+    def get_connection(self):
+        """Get database connection"""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _fts5_available(self) -> bool:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(terms)")
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _tables(partition: str) -> Tuple[str, str]:
+        if not re.fullmatch(r"[a-z0-9_]+", partition):
+            raise ValueError(f"Invalid partition name: {partition}")
+        return f"docs_{partition}", f"fts_{partition}"
+
+    def _ensure_partition(self, conn, partition: str) -> None:
+        """Create a partition's tables on first write"""
+        if partition in self._known_partitions:
+            return
+        docs, fts = self._tables(partition)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {docs} (
+            rowid INTEGER PRIMARY KEY,
+            doc_id TEXT UNIQUE NOT NULL,
+            text TEXT NOT NULL,
+            terms TEXT NOT NULL
+        )
+        """)
+        # External-content FTS table kept in sync by triggers
+        conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+        USING fts5(terms, content='{docs}', content_rowid='rowid', tokenize='ascii')
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {docs}_ai AFTER INSERT ON {docs} BEGIN
+            INSERT INTO {fts}(rowid, terms) VALUES (new.rowid, new.terms);
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {docs}_ad AFTER DELETE ON {docs} BEGIN
+            INSERT INTO {fts}({fts}, rowid, terms) VALUES ('delete', old.rowid, old.terms);
+        END
+        """)
+        self._known_partitions.add(partition)
+
+    def _has_partition(self, conn, partition: str) -> bool:
+        if partition in self._known_partitions:
+            return True
+        docs, _ = self._tables(partition)
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (docs,)).fetchone()
+        if row:
+            self._known_partitions.add(partition)
+        return row is not None
+
+    def add(self, partition: str, ids: List[str], documents: List[str]) -> None:
+        """Insert or replace chunks of a partition in one transaction"""
+        if not self.available or not ids:
+            return
+        docs, _ = self._tables(partition)
+        conn = self.get_connection()
+        try:
+            with self._lock:
+                self._ensure_partition(conn, partition)
+            # Delete first so the FTS delete trigger sees the old terms
+            conn.executemany(f"DELETE FROM {docs} WHERE doc_id = ?", [(doc_id,) for doc_id in ids])
+            conn.executemany(
+                f"INSERT INTO {docs} (doc_id, text, terms) VALUES (?, ?, ?)",
+                [(doc_id, text, normalize_terms(text)) for doc_id, text in zip(ids, documents)]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def delete(self, partition: str, ids: List[str]) -> None:
+        """Remove chunks of a partition"""
+        if not self.available or not ids:
+            return
+        docs, _ = self._tables(partition)
+        conn = self.get_connection()
+        try:
+            if self._has_partition(conn, partition):
+                conn.executemany(f"DELETE FROM {docs} WHERE doc_id = ?", [(doc_id,) for doc_id in ids])
+                conn.commit()
+        finally:
+            conn.close()
+
+    def count(self, partition: Optional[str] = None) -> int:
+        """Chunks in one partition, or in all of them"""
+        if not self.available:
+            return 0
+        conn = self.get_connection()
+        try:
+            if partition is not None:
+                if not self._has_partition(conn, partition):
+                    return 0
+                return conn.execute(f"SELECT COUNT(*) FROM {self._tables(partition)[0]}").fetchone()[0]
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'docs\\_%' ESCAPE '\\'"
+            )]
+            return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables)
+        finally:
+            conn.close()
+
+    def search(self, partition: str, query: str, limit: int = 10) -> List[Dict]:
+        """
+        BM25 search within a partition
+        Any query term may match; chunks matching more (and rarer) terms rank
+        higher. Returns dicts with id, text and score (higher is better).
+        """
+        terms = query_terms(query)
+        if not self.available or not terms:
+            return []
+        docs, fts = self._tables(partition)
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+        conn = self.get_connection()
+        try:
+            if not self._has_partition(conn, partition):
+                return []
+            rows = conn.execute(f"""
+            SELECT d.doc_id, d.text, bm25({fts}) AS rank
+            FROM {fts} JOIN {docs} d ON d.rowid = {fts}.rowid
+            WHERE {fts} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """, (match, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Keyword search error: {e}")
+            return []
+        finally:
+            conn.close()
+
+        # FTS5's bm25() is negative, more negative is better
+        return [{"id": doc_id, "text": text, "score": -rank} for doc_id, text, rank in rows]
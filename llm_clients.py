@@ -0,0 +1,89 @@
+# llm_clients.py
+"""
+LLM Client Registry for Shiksha Mitra
+Process-wide Groq clients shared by every session. All of them send requests
+through one httpx connection pool with keep-alive (and HTTP/2 when `h2` is
+installed), so steady-state calls reuse warm connections instead of paying
+TCP and TLS setup per session or per translation.
+"""
+
+import os
+import threading
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from groq import Groq
+except ImportError:
+    pass
+
+try:
+    from langchain_groq import ChatGroq
+except ImportError:
+    pass
+
+# Connection pool bounds, shared by every session in the process
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("SHIKSHA_LLM_MAX_CONNECTIONS", "20"))
+DEFAULT_MAX_KEEPALIVE = int(os.getenv("SHIKSHA_LLM_MAX_KEEPALIVE", "10"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv("SHIKSHA_LLM_KEEPALIVE_EXPIRY", "120"))
+DEFAULT_LLM_TIMEOUT = float(os.getenv("SHIKSHA_LLM_TIMEOUT", "30"))
+
+_http_client = None
+_groq_clients = {}
+_chat_models = {}
+_lock = threading.Lock()
+
+
+def get_http_client():
+    """The shared httpx client (None without httpx, clients then use their own pools)"""
+    global _http_client
+    if httpx is None:
+        return None
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=DEFAULT_LLM_TIMEOUT,
+                limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS,
+                                    max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+                                    keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY)
+            )
+        return _http_client
+
+
+def get_groq_client(api_key: Optional[str] = None) -> "Groq":
+    """Shared Groq client for an API key (GROQ_API_KEY by default)"""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    http_client = get_http_client()
+    with _lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            client = Groq(api_key=api_key, http_client=http_client)
+            _groq_clients[api_key] = client
+        return client
+
+
+def get_chat_groq(model_name: str, temperature: float = 0.0, api_key: Optional[str] = None,
+                  timeout: float = DEFAULT_LLM_TIMEOUT) -> "ChatGroq":
+    """Shared LangChain ChatGroq model for an API key, model and temperature"""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    key = (api_key, model_name, temperature, timeout)
+    http_client = get_http_client()
+    with _lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            llm = ChatGroq(temperature=temperature, model_name=model_name, timeout=timeout,
+                           groq_api_key=api_key, http_client=http_client)
+            _chat_models[key] = llm
+        return llm
+
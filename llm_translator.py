@@ -6,9 +6,38 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
 
+from llm_clients import get_chat_groq
+
 # Load environment variables
 load_dotenv()
 
+# Translation model (verified working models as of Nov 2024):
+# - "llama-3.1-8b-instant" (1000 T/sec) ⭐ FASTEST & RECOMMENDED
+# - "gemma2-9b-it" (1200 T/sec) - Google's Gemma
+# - "llama-3.3-70b-versatile" (560 T/sec) - Highest quality
+# - "mixtral-8x7b-32768" (500 T/sec) - Good for multilingual
+TRANSLATION_MODEL = "llama-3.1-8b-instant"  # Change this if needed
+
+# Translation chains per API key, built once and reused by every call
+_translation_chains = {}
+
+
+def get_translation_chain():
+    """Prompt | shared ChatGroq | parser chain for the current GROQ_API_KEY"""
+    api_key = os.getenv("GROQ_API_KEY")
+    chain = _translation_chains.get(api_key)
+    if chain is None:
+        llm = get_chat_groq(TRANSLATION_MODEL, temperature=0.0, api_key=api_key, timeout=30)
+        prompt = ChatPromptTemplate.from_template(
+            "You are a professional translator. Translate the following text into {language}. "
+            "Return ONLY the translated text without any explanations, preamble, or additional commentary.\n\n"
+            "Text to translate: {text}"
+        )
+        chain = prompt | llm | StrOutputParser()
+        _translation_chains[api_key] = chain
+    return chain
+
+
 def get_basic_translation(text_input: str, target_language: str) -> str:
     """
     Translates the given text into the target language using LangChain and Groq.
@@ -35,30 +64,8 @@ def get_basic_translation(text_input: str, target_language: str) -> str:
     llm_target_lang = language_map.get(target_language, "English")
 
     try:
-        # Initialize Groq LLM with CURRENT ACTIVE MODEL
-        # Verified working models as of Nov 2024:
-        # - "llama-3.1-8b-instant" (1000 T/sec) ⭐ FASTEST & RECOMMENDED
-        # - "gemma2-9b-it" (1200 T/sec) - Google's Gemma
-        # - "llama-3.3-70b-versatile" (560 T/sec) - Highest quality
-        # - "mixtral-8x7b-32768" (500 T/sec) - Good for multilingual
-        
-        llm = ChatGroq(
-            temperature=0.0,
-            model_name="llama-3.1-8b-instant",  # Change this if needed
-            timeout=30,  # Add timeout for better error handling
-        )
-
-        # Create translation prompt
-        prompt = ChatPromptTemplate.from_template(
-            "You are a professional translator. Translate the following text into {language}. "
-            "Return ONLY the translated text without any explanations, preamble, or additional commentary.\n\n"
-            "Text to translate: {text}"
-        )
-        
-        output_parser = StrOutputParser()
-        
-        # Create and invoke chain
-        chain = prompt | llm | output_parser
+        # Shared model and keep-alive connections, so only the first call pays setup
+        chain = get_translation_chain()
         response = chain.invoke({
             "language": llm_target_lang,
             "text": text_input
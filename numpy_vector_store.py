@@ -0,0 +1,421 @@
+# numpy_vector_store.py
+"""
+NumPy Vector Store for Shiksha Mitra
+A lightweight alternative to ChromaDB for small deployments: each
+collection (one textbook partition) is a memory-mapped float32 matrix with
+ids, documents and metadata in a JSON sidecar. Search is a brute-force
+matrix-vector product with top-k by argpartition, which is sub-millisecond
+for a few thousand chunks and needs no server process or heavy import.
+
+A collection mimics the subset of the ChromaDB collection API used by
+TeachingAgent (upsert, delete, get, query), so either backend can be
+selected with SHIKSHA_VECTOR_BACKEND=numpy|chroma. Ingestion stages its
+batches in memory and commits them once per PDF; a commit copies the
+existing matrix to the new files block by block instead of loading it.
+
+Vectors can be stored as float16 or int8 (with a per-vector scale,
+SHIKSHA_VECTOR_DTYPE) to cut the memory scanned per query 2-4x. Search then
+runs on the compact matrix in blocks and, by default, the top candidates are
+re-scored against a float32 copy that stays on disk (memory-mapped, only
+those rows are read). That copy makes the files 1.25x (int8) or 1.5x
+(float16) the size of a float32-only store; with SHIKSHA_VECTOR_RESCORE=0
+it is not written, the files shrink 2-4x and results are ranked by the
+compact scores.
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+# "float32", "float16" or "int8"
+DEFAULT_VECTOR_DTYPE = os.getenv("SHIKSHA_VECTOR_DTYPE", "float32")
+VECTOR_DTYPES = ("float32", "float16", "int8")
+# Keep a float32 copy of compact matrices on disk to re-score candidates
+DEFAULT_VECTOR_RESCORE = os.getenv("SHIKSHA_VECTOR_RESCORE", "1") == "1"
+# Rows converted to float32 at a time when scanning a compact matrix
+SCAN_BLOCK_ROWS = 8192
+# Candidates per requested result that are re-scored at full precision
+RESCORE_FACTOR = 4
+
+
+def quantize(vectors: "np.ndarray", dtype: str):
+    """Compact copy of float32 vectors: (matrix, per-vector scales or None)"""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        matrix = np.round(vectors / scales[:, None]).astype(np.int8)
+        return matrix, scales.astype(np.float32)
+    return vectors, None
+
+
+def _create_matrix(path: Path, dtype, rows: int, dim: int):
+    """New .npy file of shape (rows, dim), memory-mapped for writing (a plain array when empty)"""
+    if rows == 0:
+        matrix = np.empty((0, dim), dtype=dtype)
+        np.save(path, matrix)
+        return matrix
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(rows, dim))
+
+
+def _flatten_where(where: Optional[Dict]) -> Dict:
+    """Turn a ChromaDB equality filter ({k: v}, {k: {"$eq": v}}, {"$and": [...]}) into {k: v}"""
+    if not where:
+        return {}
+    flat = {}
+    for key, value in where.items():
+        if key == "$and":
+            for clause in value:
+                flat.update(_flatten_where(clause))
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator for the NumPy vector store: {key}")
+        elif isinstance(value, dict):
+            if set(value) != {"$eq"}:
+                raise ValueError(f"Unsupported filter on '{key}' for the NumPy vector store: {value}")
+            flat[key] = value["$eq"]
+        else:
+            flat[key] = value
+    return flat
+
+
+class _Snapshot:
+    """A collection as last written to disk (vectors memory-mapped)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        records_file = path / "records.json"
+        self.version = records_file.stat().st_mtime_ns
+        with open(records_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self.vectors_file = records["vectors_file"]
+        self.dtype = records.get("dtype", "float32")
+        self.files = [records[key] for key in ("vectors_file", "scales_file", "full_file") if records.get(key)]
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.vectors = np.load(path / self.vectors_file, mmap_mode='r')
+        self.scales = np.load(path / records["scales_file"], mmap_mode='r') if records.get("scales_file") else None
+        # Full-precision vectors: the search matrix itself when it is float32, None without a copy
+        if records.get("full_file"):
+            self.full = np.load(path / records["full_file"], mmap_mode='r')
+        else:
+            self.full = self.vectors if self.dtype == "float32" else None
+
+    def float_rows(self, rows) -> "np.ndarray":
+        """float32 copy of some rows (a slice or index array), dequantized if there is no full-precision copy"""
+        if self.full is not None:
+            return np.array(self.full[rows], dtype=np.float32)
+        block = np.array(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows])[:, None]
+        return block
+
+    def scores(self, query: "np.ndarray") -> "np.ndarray":
+        """Similarity of every vector to a query, from the search matrix"""
+        if self.dtype == "float32":
+            return self.vectors @ query
+        # Convert block by block so a compact matrix is never expanded whole
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), SCAN_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search_bytes(self) -> int:
+        """Bytes scanned per query"""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def disk_bytes(self) -> int:
+        """Bytes of the vector files, including the float32 re-scoring copy"""
+        return sum((self.path / name).stat().st_size for name in self.files)
+
+    def is_stale(self) -> bool:
+        try:
+            return (self.path / "records.json").stat().st_mtime_ns != self.version
+        except FileNotFoundError:
+            return True
+
+
+class NumpyCollection:
+    """Brute-force vector collection stored in one folder, with a ChromaDB-like API"""
+
+    def __init__(self, path: str, embedding_function: Callable[[List[str]], List[List[float]]],
+                 dtype: str = DEFAULT_VECTOR_DTYPE, rescore: bool = DEFAULT_VECTOR_RESCORE):
+        """
+        Open (or create) the collection in folder `path`
+        dtype: storage of the search matrix; an existing collection is
+        converted on its next write.
+        rescore: with a compact dtype, also write a float32 copy to re-score
+        candidates (more accurate, but the files grow instead of shrinking)
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype '{dtype}'. Choose from: {', '.join(VECTOR_DTYPES)}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        self.rescore = rescore
+        self._snapshot = None
+        # Staged, uncommitted documents: id -> (document, metadata, vector)
+        self._staged = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def exists(path) -> bool:
+        """Whether a collection has been written at `path`"""
+        return (Path(path) / "records.json").exists()
+
+    def _load(self) -> Optional[_Snapshot]:
+        """Current snapshot, re-read if another process rewrote it"""
+        with self._lock:
+            if self._snapshot is None or self._snapshot.is_stale():
+                self._snapshot = _Snapshot(self.path) if self.exists(self.path) else None
+            return self._snapshot
+
+    def _write(self, ids: List[str], documents: List[str], metadatas: List[Dict],
+               blocks: Iterable["np.ndarray"], dim: int) -> None:
+        """
+        Atomically replace the collection
+        `blocks` yields the float32 vectors of all rows in order, a block at a
+        time; they are written straight to memory-mapped files, so the
+        partition's matrix is never held in RAM. Vectors go to new files
+        first; records.json, which names the vector files, is swapped in last
+        so readers never see a half-written collection.
+        """
+        old = self._snapshot
+        generation = (int(old.vectors_file.split(".")[1]) + 1) if old else 0
+        records = {"vectors_file": f"vectors.{generation}.npy", "dtype": self.dtype}
+        if self.dtype == "int8":
+            records["scales_file"] = f"scales.{generation}.npy"
+        if self.dtype != "float32" and self.rescore:
+            records["full_file"] = f"full.{generation}.npy"
+
+        rows = len(ids)
+        matrix = _create_matrix(self.path / records["vectors_file"], self.dtype, rows, dim)
+        full = _create_matrix(self.path / records["full_file"], np.float32, rows, dim) if "full_file" in records else None
+        scales = np.empty(rows, dtype=np.float32) if self.dtype == "int8" else None
+
+        row = 0
+        for block in blocks:
+            end = row + len(block)
+            compact, block_scales = quantize(block, self.dtype)
+            matrix[row:end] = compact
+            if full is not None:
+                full[row:end] = block
+            if scales is not None:
+                scales[row:end] = block_scales
+            row = end
+        if row != rows:
+            raise ValueError(f"Expected {rows} vectors, got {row}")
+        for written in (matrix, full):
+            if isinstance(written, np.memmap):
+                written.flush()
+        del full, matrix
+        if scales is not None:
+            np.save(self.path / records["scales_file"], scales)
+
+        tmp = self.path / "records.json.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dict(records, ids=ids, documents=documents, metadatas=metadatas), f, ensure_ascii=False)
+        os.replace(tmp, self.path / "records.json")
+
+        if old:
+            for name in old.files:
+                try:
+                    os.remove(self.path / name)
+                except OSError:
+                    pass  # still mapped elsewhere (Windows); replaced on the next write
+        self._snapshot = None
+
+    # ==================== COLLECTION API ====================
+
+    def stage(self, ids: List[str], documents: List[str], metadatas: List[Dict],
+              embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Embed documents and keep them in memory until commit()
+        Ingestion stages every batch of a PDF and commits once, instead of
+        rewriting the collection per batch. Staged documents are not searchable yet.
+        """
+        if not ids:
+            return
+        if embeddings is None:
+            embeddings = self.embedding_function(documents)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            for i, doc_id in enumerate(ids):
+                self._staged.pop(doc_id, None)
+                self._staged[doc_id] = (documents[i], metadatas[i], vectors[i])
+
+    def commit(self) -> None:
+        """Write staged documents (inserted or replacing ones with the same ID) in one pass"""
+        with self._lock:
+            if not self._staged:
+                return
+            staged, self._staged = self._staged, {}
+            snapshot = self._load()
+            dim = len(next(iter(staged.values()))[2])
+
+            if snapshot is None:
+                all_ids, all_docs, all_meta, positions = [], [], [], {}
+            else:
+                all_ids, all_docs, all_meta = list(snapshot.ids), list(snapshot.documents), list(snapshot.metadatas)
+                positions = snapshot.positions
+            existing = len(all_ids)
+
+            replaced = {}
+            appended = []
+            for doc_id, (document, metadata, vector) in staged.items():
+                pos = positions.get(doc_id)
+                if pos is not None:
+                    all_docs[pos], all_meta[pos] = document, metadata
+                    replaced[pos] = vector
+                else:
+                    all_ids.append(doc_id)
+                    all_docs.append(document)
+                    all_meta.append(metadata)
+                    appended.append(vector)
+
+            def blocks():
+                for start in range(0, existing, SCAN_BLOCK_ROWS):
+                    block = snapshot.float_rows(slice(start, start + SCAN_BLOCK_ROWS))
+                    for pos, vector in replaced.items():
+                        if start <= pos < start + len(block):
+                            block[pos - start] = vector
+                    yield block
+                if appended:
+                    yield np.asarray(appended, dtype=np.float32)
+
+            self._write(all_ids, all_docs, all_meta, blocks(), dim)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict],
+               embeddings: Optional[List[List[float]]] = None) -> None:
+        """Insert or replace documents"""
+        with self._lock:
+            self.stage(ids, documents, metadatas, embeddings)
+            self.commit()
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete documents by ID"""
+        remove = set(ids)
+        with self._lock:
+            self.commit()
+            snapshot = self._load()
+            if snapshot is None:
+                return
+            keep = np.array([i for i, doc_id in enumerate(snapshot.ids) if doc_id not in remove], dtype=np.int64)
+            if len(keep) == len(snapshot.ids):
+                return
+
+            def blocks():
+                for start in range(0, len(keep), SCAN_BLOCK_ROWS):
+                    yield snapshot.float_rows(keep[start:start + SCAN_BLOCK_ROWS])
+
+            self._write([snapshot.ids[i] for i in keep],
+                        [snapshot.documents[i] for i in keep],
+                        [snapshot.metadatas[i] for i in keep],
+                        blocks(), snapshot.vectors.shape[1])
+
+    def get(self, ids: List[str], include: Optional[List[str]] = None) -> Dict:
+        """Which of these IDs exist (with documents/metadatas if included)"""
+        include = include if include is not None else ["documents", "metadatas"]
+        result = {"ids": [], "documents": [], "metadatas": []}
+        snapshot = self._load()
+        if snapshot is not None:
+            for doc_id in ids:
+                pos = snapshot.positions.get(doc_id)
+                if pos is not None:
+                    result["ids"].append(doc_id)
+                    result["documents"].append(snapshot.documents[pos])
+                    result["metadatas"].append(snapshot.metadatas[pos])
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    def count(self) -> int:
+        """Number of documents"""
+        snapshot = self._load()
+        return len(snapshot.ids) if snapshot else 0
+
+    def search_bytes(self) -> int:
+        """Bytes of the matrix scanned per query (the float32 re-scoring copy stays on disk)"""
+        snapshot = self._load()
+        return snapshot.search_bytes() if snapshot else 0
+
+    def disk_bytes(self) -> int:
+        """Bytes of the vector files on disk"""
+        snapshot = self._load()
+        return snapshot.disk_bytes() if snapshot else 0
+
+    def query(self, query_texts: Optional[List[str]] = None, n_results: int = 10,
+              where: Optional[Dict] = None,
+              query_embeddings: Optional[List[List[float]]] = None) -> Dict:
+        """
+        Top-n documents per query by cosine similarity (equality filters applied as a mask)
+        Queries are given as texts or, like ChromaDB, as precomputed embeddings.
+        Compact matrices with a float32 copy pick RESCORE_FACTOR x n candidates, re-scored at full precision.
+        """
+        filters = _flatten_where(where)
+        snapshot = self._load()
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if snapshot is None or not snapshot.ids:
+            for _ in (query_embeddings if query_embeddings is not None else query_texts):
+                for values in result.values():
+                    values.append([])
+            return result
+
+        mask = None
+        if filters:
+            mask = np.array([all(meta.get(k) == v for k, v in filters.items()) for meta in snapshot.metadatas])
+
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        rescore = snapshot.dtype != "float32" and snapshot.full is not None
+        for query in queries:
+            scores = snapshot.scores(query)
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            k = min(n_results * RESCORE_FACTOR if rescore else n_results, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[scores[top] > -np.inf]
+            if rescore:
+                # Only the candidates' rows of the float32 copy are read
+                top.sort()
+                exact = np.asarray(snapshot.full[top]) @ query
+            else:
+                exact = scores[top]
+            order = np.argsort(-exact)[:n_results]
+            top, exact = [int(top[i]) for i in order], exact[order]
+
+            result["ids"].append([snapshot.ids[i] for i in top])
+            result["documents"].append([snapshot.documents[i] for i in top])
+            result["metadatas"].append([snapshot.metadatas[i] for i in top])
+            result["distances"].append([1.0 - float(score) for score in exact])
+
+        return result
+
+
+# One collection object per folder per process, shared by every session
+_collections = {}
+_collections_lock = threading.Lock()
+
+
+def get_numpy_collection(path: str, embedding_function, dtype: str = DEFAULT_VECTOR_DTYPE,
+                         rescore: bool = DEFAULT_VECTOR_RESCORE) -> NumpyCollection:
+    """Get the shared NumPy collection for a folder"""
+    path = str(Path(path).resolve())
+    with _collections_lock:
+        collection = _collections.get(path)
+        if collection is None:
+            collection = NumpyCollection(path, embedding_function, dtype, rescore)
+            _collections[path] = collection
+        return collection
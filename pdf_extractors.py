@@ -0,0 +1,190 @@
+# pdf_extractors.py
+"""
+PDF Text Extraction Backends for Shiksha Mitra
+PyPDF2 is the default; pypdfium2 and PyMuPDF are used when installed and
+selected (they are several times faster on large textbooks).
+
+Select a backend with the SHIKSHA_PDF_EXTRACTOR environment variable or the
+`pdf_extractor` argument of TeachingAgent / ingest_textbooks.py.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+DEFAULT_EXTRACTOR = os.getenv("SHIKSHA_PDF_EXTRACTOR", "pypdf2")
+
+
+class PDFExtractor:
+    """Base class: yields (page_number, text) for every page with text"""
+
+    name = "base"
+    # Bump when the extracted text of a backend changes
+    version = "1"
+
+    @classmethod
+    def available(cls) -> bool:
+        return False
+
+    def iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        raise NotImplementedError
+
+    def outline(self, pdf_path: Path) -> List[Tuple[int, str, int]]:
+        """Bookmarks as (level, title, page_number), empty if the PDF has none"""
+        return []
+
+    def _page_error(self, pdf_path: Path, page_num: int, error: Exception) -> None:
+        print(f"Warning: {self.name} could not extract page {page_num} of {Path(pdf_path).name}: {error}")
+
+
+class PyPDF2Extractor(PDFExtractor):
+    """Pure-Python extractor (always available with requirements.txt)"""
+
+    name = "pypdf2"
+    version = "1"
+
+    @classmethod
+    def available(cls) -> bool:
+        return PyPDF2 is not None
+
+    def iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                try:
+                    text = page.extract_text()
+                except Exception as e:
+                    self._page_error(pdf_path, page_num, e)
+                    continue
+                if text:
+                    yield page_num, text
+
+    def outline(self, pdf_path: Path) -> List[Tuple[int, str, int]]:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            entries = []
+
+            def walk(items, level):
+                for item in items:
+                    if isinstance(item, list):
+                        walk(item, level + 1)
+                        continue
+                    try:
+                        page = pdf_reader.get_destination_page_number(item) + 1
+                    except Exception:
+                        continue
+                    entries.append((level, str(item.title), page))
+
+            walk(pdf_reader.outline, 1)
+            return entries
+
+
+class PdfiumExtractor(PDFExtractor):
+    """PDFium-based extractor (pip install pypdfium2)"""
+
+    name = "pypdfium2"
+    version = "1"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pypdfium2 is not None
+
+    def iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        pdf = pypdfium2.PdfDocument(str(pdf_path))
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                try:
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range()
+                    textpage.close()
+                except Exception as e:
+                    self._page_error(pdf_path, index + 1, e)
+                    continue
+                finally:
+                    page.close()
+                if text:
+                    yield index + 1, text
+        finally:
+            pdf.close()
+
+    def outline(self, pdf_path: Path) -> List[Tuple[int, str, int]]:
+        pdf = pypdfium2.PdfDocument(str(pdf_path))
+        try:
+            return [(item.level + 1, item.title, item.page_index + 1)
+                    for item in pdf.get_toc() if item.page_index is not None]
+        finally:
+            pdf.close()
+
+
+class PyMuPDFExtractor(PDFExtractor):
+    """MuPDF-based extractor (pip install pymupdf)"""
+
+    name = "pymupdf"
+    version = "1"
+
+    @classmethod
+    def available(cls) -> bool:
+        return fitz is not None
+
+    def iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        doc = fitz.open(str(pdf_path))
+        try:
+            for index, page in enumerate(doc):
+                try:
+                    text = page.get_text()
+                except Exception as e:
+                    self._page_error(pdf_path, index + 1, e)
+                    continue
+                if text:
+                    yield index + 1, text
+        finally:
+            doc.close()
+
+    def outline(self, pdf_path: Path) -> List[Tuple[int, str, int]]:
+        doc = fitz.open(str(pdf_path))
+        try:
+            return [(level, title, page) for level, title, page in doc.get_toc() if page > 0]
+        finally:
+            doc.close()
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (PyPDF2Extractor, PdfiumExtractor, PyMuPDFExtractor)
+}
+
+
+def available_extractors() -> List[str]:
+    """Names of the backends that can be used in this environment"""
+    return [name for name, extractor in EXTRACTORS.items() if extractor.available()]
+
+
+def get_extractor(name: Optional[str] = None) -> PDFExtractor:
+    """Get an extractor by name, falling back to PyPDF2 if it is not installed"""
+    name = (name or DEFAULT_EXTRACTOR).lower()
+    extractor = EXTRACTORS.get(name)
+
+    if extractor is None:
+        raise ValueError(f"Unknown PDF extractor '{name}'. Choose from: {', '.join(EXTRACTORS)}")
+    if not extractor.available():
+        print(f"Warning: PDF extractor '{name}' is not installed, using pypdf2")
+        extractor = PyPDF2Extractor
+
+    return extractor()
@@ -0,0 +1,315 @@
+# question_bank.py
+"""
+Question Bank for Shiksha Mitra Tests
+SQLite-backed store indexed by subject, level, tags and language.
+Only the requested language's text is loaded, and questions are sampled
+without replacement straight from the index, so large banks cost almost
+nothing until a test is started.
+"""
+
+import sqlite3
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Language mapping
+LANGUAGE_CODES = {
+    "English": "en",
+    "Hindi": "hi",
+    "Kannada": "kn",
+    "Telugu": "te",
+    "Marathi": "mr"
+}
+
+DEFAULT_SEED_PATH = Path(__file__).parent / "questions_seed.jsonl"
+
+
+class QuestionBank:
+    """Indexed, file-backed question bank"""
+
+    def __init__(self, db_path: str = "question_bank.db", seed_path: Optional[str] = None):
+        """Open the bank, importing the seed questions if it is empty"""
+        self.db_path = db_path
+        self.init_database()
+
+        if self.total_questions() == 0:
+            seed = Path(seed_path) if seed_path else DEFAULT_SEED_PATH
+            if seed.exists():
+                imported = self.import_jsonl(seed)
+                print(f"✅ Imported {imported} questions into the question bank")
+
+    def get_connection(self):
+        """Get database connection"""
+        return sqlite3.connect(self.db_path)
+
+    def init_database(self):
+        """Initialize question bank tables"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # seq numbers questions 0..n-1 within a (subject, level) so random
+        # samples can be drawn from the index without scanning the table
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id TEXT PRIMARY KEY,
+            subject TEXT NOT NULL,
+            level TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            options TEXT NOT NULL,  -- JSON array
+            correct INTEGER NOT NULL,
+            marks INTEGER NOT NULL
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS question_texts (
+            question_id TEXT NOT NULL,
+            language_code TEXT NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (question_id, language_code)
+        ) WITHOUT ROWID
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS question_tags (
+            tag TEXT NOT NULL,
+            question_id TEXT NOT NULL,
+            PRIMARY KEY (tag, question_id)
+        ) WITHOUT ROWID
+        """)
+
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_subject_level
+        ON questions(subject, level, seq)
+        """)
+
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_question_tags_question
+        ON question_tags(question_id)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    # ==================== IMPORT ====================
+
+    def import_questions(self, records: Iterable[Dict]) -> int:
+        """
+        Add or update questions in one transaction
+        Each record: id, subject, level, question_<code> texts, options,
+        correct, marks and optional tags. Returns number imported.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        next_seq = {}
+        count = 0
+
+        try:
+            for record in records:
+                question_id = record['id']
+                subject = record['subject']
+                level = record['level']
+
+                cursor.execute("SELECT seq, subject, level FROM questions WHERE question_id = ?", (question_id,))
+                existing = cursor.fetchone()
+
+                if existing and (existing[1], existing[2]) == (subject, level):
+                    seq = existing[0]
+                else:
+                    if existing:
+                        raise ValueError(f"Question {question_id} cannot move to a different subject or level")
+                    key = (subject, level)
+                    if key not in next_seq:
+                        cursor.execute(
+                            "SELECT COALESCE(MAX(seq) + 1, 0) FROM questions WHERE subject = ? AND level = ?",
+                            key
+                        )
+                        next_seq[key] = cursor.fetchone()[0]
+                    seq = next_seq[key]
+                    next_seq[key] += 1
+
+                cursor.execute("""
+                INSERT OR REPLACE INTO questions (question_id, subject, level, seq, options, correct, marks)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (question_id, subject, level, seq, json.dumps(record['options'], ensure_ascii=False),
+                      record['correct'], record['marks']))
+
+                cursor.executemany("""
+                INSERT OR REPLACE INTO question_texts (question_id, language_code, text)
+                VALUES (?, ?, ?)
+                """, [
+                    (question_id, key[len("question_"):], text)
+                    for key, text in record.items()
+                    if key.startswith("question_") and text
+                ])
+
+                cursor.execute("DELETE FROM question_tags WHERE question_id = ?", (question_id,))
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO question_tags (tag, question_id) VALUES (?, ?)",
+                    [(tag.strip().lower(), question_id) for tag in record.get('tags', []) if tag.strip()]
+                )
+                count += 1
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        return count
+
+    def import_jsonl(self, path) -> int:
+        """Import questions from a JSON-lines file (one question per line)"""
+        def records():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+        return self.import_questions(records())
+
+    # ==================== QUERIES ====================
+
+    def total_questions(self) -> int:
+        """Number of questions in the bank"""
+        conn = self.get_connection()
+        count = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        conn.close()
+        return count
+
+    def subjects(self) -> List[str]:
+        """Subjects that have questions"""
+        conn = self.get_connection()
+        rows = conn.execute("SELECT DISTINCT subject FROM questions ORDER BY subject").fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def count(self, subject: str, level: str) -> int:
+        """Number of questions for a subject and level"""
+        conn = self.get_connection()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM questions WHERE subject = ? AND level = ?",
+            (subject, level)
+        ).fetchone()[0]
+        conn.close()
+        return count
+
+    def sample(self, subject: str, level: str, k: Optional[int] = None, language: str = "English",
+               tags: Optional[List[str]] = None, rng: Optional[random.Random] = None) -> List[Dict]:
+        """
+        Draw k distinct questions for a subject and level
+        Without k (or when k covers the whole set) all questions are returned
+        in bank order. With tags, only questions having all the tags qualify.
+        """
+        rng = rng or random
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            if tags:
+                tags = [tag.strip().lower() for tag in tags]
+                cursor.execute(f"""
+                SELECT q.question_id FROM questions q
+                JOIN question_tags t ON t.question_id = q.question_id
+                WHERE q.subject = ? AND q.level = ? AND t.tag IN ({','.join('?' * len(tags))})
+                GROUP BY q.question_id
+                HAVING COUNT(*) = ?
+                ORDER BY q.seq
+                """, (subject, level, *tags, len(tags)))
+                ids = [row[0] for row in cursor.fetchall()]
+                if k is not None and k < len(ids):
+                    ids = rng.sample(ids, k)
+            else:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM questions WHERE subject = ? AND level = ?",
+                    (subject, level)
+                )
+                total = cursor.fetchone()[0]
+
+                if k is None or k >= total:
+                    seqs = list(range(total))
+                else:
+                    seqs = rng.sample(range(total), k)
+
+                ids = []
+                for batch in _batches(seqs, 500):
+                    cursor.execute(f"""
+                    SELECT seq, question_id FROM questions
+                    WHERE subject = ? AND level = ? AND seq IN ({','.join('?' * len(batch))})
+                    """, (subject, level, *batch))
+                    by_seq = dict(cursor.fetchall())
+                    ids.extend(by_seq[seq] for seq in batch if seq in by_seq)
+
+            return self._load(cursor, ids, language)
+        finally:
+            conn.close()
+
+    def get_questions(self, question_ids: List[str], language: str = "English") -> List[Dict]:
+        """Load questions by ID, keeping the given order"""
+        conn = self.get_connection()
+        try:
+            return self._load(conn.cursor(), question_ids, language)
+        finally:
+            conn.close()
+
+    def _load(self, cursor, question_ids: List[str], language: str) -> List[Dict]:
+        """Load questions with only the requested language's text (English as fallback)"""
+        lang_code = LANGUAGE_CODES.get(language, "en")
+        loaded = {}
+
+        for batch in _batches(list(question_ids), 500):
+            cursor.execute(f"""
+            SELECT q.question_id, q.options, q.correct, q.marks, local.text, en.text
+            FROM questions q
+            LEFT JOIN question_texts local
+                ON local.question_id = q.question_id AND local.language_code = ?
+            LEFT JOIN question_texts en
+                ON en.question_id = q.question_id AND en.language_code = 'en'
+            WHERE q.question_id IN ({','.join('?' * len(batch))})
+            """, (lang_code, *batch))
+
+            for question_id, options, correct, marks, local_text, en_text in cursor.fetchall():
+                question = {
+                    'id': question_id,
+                    'options': json.loads(options),
+                    'correct': correct,
+                    'marks': marks,
+                    'question_en': en_text
+                }
+                if local_text:
+                    question[f'question_{lang_code}'] = local_text
+                loaded[question_id] = question
+
+        return [loaded[qid] for qid in question_ids if qid in loaded]
+
+
+def _batches(items: List, size: int):
+    """Split a list into chunks of at most `size` (SQLite variable limit)"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Singleton instance
+_bank_instance = None
+_bank_lock = threading.Lock()
+
+def get_question_bank() -> QuestionBank:
+    """Get question bank instance (singleton)"""
+    global _bank_instance
+    with _bank_lock:
+        if _bank_instance is None:
+            _bank_instance = QuestionBank()
+    return _bank_instance
+
+
+# Import questions from the command line
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python question_bank.py <questions.jsonl> [bank.db]")
+        sys.exit(1)
+
+    bank = QuestionBank(sys.argv[2]) if len(sys.argv) > 2 else QuestionBank()
+    imported = bank.import_jsonl(sys.argv[1])
+    print(f"Imported {imported} questions ({bank.total_questions()} in bank)")
@@ -0,0 +1,96 @@
+# retrieval_cache.py
+"""
+Retrieval Cache for Shiksha Mitra
+Process-wide LRU cache of retrieved passages with a time-to-live, shared by
+every session. Many students of a class ask about the same topics within
+minutes; a hit skips query embedding and the vector/keyword search.
+
+Entries carry the version of the partition they were read from and are
+ignored once ingestion changes that partition.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from lexical_index import normalize_terms
+
+DEFAULT_RETRIEVAL_CACHE_SIZE = int(os.getenv("SHIKSHA_RETRIEVAL_CACHE_SIZE", "2048"))
+DEFAULT_RETRIEVAL_CACHE_TTL = float(os.getenv("SHIKSHA_RETRIEVAL_CACHE_TTL", "900"))
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: lowercase, no punctuation, single spaces"""
+    return " ".join(normalize_terms(query).split())
+
+
+class RetrievalCache:
+    """Thread-safe LRU + TTL cache of passage lists"""
+
+    def __init__(self, max_entries: int = DEFAULT_RETRIEVAL_CACHE_SIZE,
+                 ttl_seconds: float = DEFAULT_RETRIEVAL_CACHE_TTL):
+        """max_entries 0 disables caching"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (version, expires_at, passages)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: str) -> Optional[List[str]]:
+        """Cached passages, or None if missing, expired or from an older index version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, version: str, passages: List[str]) -> None:
+        """Store passages, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl_seconds, list(passages))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, partition: Optional[str] = None) -> None:
+        """Drop the entries of one partition (keys start with its name), or all"""
+        with self._lock:
+            if partition is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == partition]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+_retrieval_cache = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Get the process-wide retrieval cache"""
+    global _retrieval_cache
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache()
+        return _retrieval_cache
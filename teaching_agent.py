@@ -5,20 +5,148 @@ Uses latest Groq models with translation support
 """
 
 import os
+import re
 import json
+import hashlib
 import time
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from groq import Groq
     import chromadb
-    import PyPDF2
 except ImportError:
     pass
 
+from ingestion_manifest import IngestionManifest, file_hash
+from llm_clients import get_groq_client
+from pdf_extractors import get_extractor
+from text_cache import TextCache, DEFAULT_TEXT_CACHE_PATH
+from text_chunker import TextChunker
+from embeddings import EmbeddingBackend, get_embedding_backend, DEFAULT_EMBEDDING_MODEL
+from numpy_vector_store import NumpyCollection, get_numpy_collection, DEFAULT_VECTOR_DTYPE, DEFAULT_VECTOR_RESCORE
+from lexical_index import LexicalIndex, fuse_rankings, query_terms, term_coverage
+from retrieval_cache import get_retrieval_cache, normalize_query
+from topic_index import TopicChunkMatcher, TopicCollector, TopicIndex
+
+# Where the persistent vector store lives (shared by all sessions)
+DEFAULT_VECTOR_STORE_PATH = os.getenv("SHIKSHA_VECTOR_STORE", "vector_store")
+# "chroma", or "numpy" for the lightweight memory-mapped store (small deployments)
+DEFAULT_VECTOR_BACKEND = os.getenv("SHIKSHA_VECTOR_BACKEND", "chroma")
+# "hybrid" fuses BM25 keyword and vector results; "vector" or "lexical" use one alone
+DEFAULT_RETRIEVAL_MODE = os.getenv("SHIKSHA_RETRIEVAL_MODE", "hybrid")
+
+# Language of the PDFs in the textbook folder (the CLI can ingest other-language folders)
+DEFAULT_TEXTBOOK_LANGUAGE = os.getenv("SHIKSHA_TEXTBOOK_LANGUAGE", "English")
+# Single collection used before the index was partitioned (migrated on first use)
+LEGACY_COLLECTION_NAME = "shiksha_mitra_textbooks"
+# Context given to the model when no textbook is indexed (yet) for a class and subject
+GENERAL_KNOWLEDGE = "Using general knowledge."
+# Same, while the textbook is being ingested (lessons written meanwhile are not cached)
+TEXTBOOK_LOADING = "Using general knowledge (the textbook is still loading)."
+# Whitespace after the end of a sentence, or a line break, in a streamed answer
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+# After the first sentence, streamed answers are translated this many characters (or more) at a time
+TRANSLATION_SEGMENT_CHARS = int(os.getenv("SHIKSHA_TRANSLATION_SEGMENT_CHARS", "300"))
+
+# Process-wide ChromaDB clients, partition collections and ingested partitions, shared by every session
+_chroma_clients = {}
+_chroma_collections = {}
+_migrated_stores = set()
+_ingested_partitions = set()
+_ingesting_partitions = {}  # partition -> True while its first ingestion runs, False while it is rescanned
+_ingest_locks = {}
+_shared_lock = threading.Lock()
+
+
+def get_chroma_client(path: str = DEFAULT_VECTOR_STORE_PATH):
+    """Get the persistent ChromaDB client for a path (one per process)"""
+    path = str(Path(path).resolve())
+    with _shared_lock:
+        client = _chroma_clients.get(path)
+        if client is None:
+            client = chromadb.PersistentClient(path=path)
+            _chroma_clients[path] = client
+        return client
+
+
+def iter_pdf_pages(pdf_path: Path, extractor: Optional[str] = None,
+                   text_cache: Optional[TextCache] = None, content_hash: Optional[str] = None):
+    """
+    Yield (page_number, text) for each page with text, one page at a time
+    With a text cache, previously extracted PDFs are not parsed again.
+    """
+    pdf_extractor = get_extractor(extractor)
+    if text_cache is not None:
+        return text_cache.pages(pdf_path, pdf_extractor, content_hash)
+    return pdf_extractor.iter_pages(pdf_path)
+
+
+def iter_pdf_chunks(pdf_path: Path, chunker: Optional[TextChunker] = None, extractor: Optional[str] = None,
+                    text_cache: Optional[TextCache] = None, content_hash: Optional[str] = None,
+                    topic_collector: Optional[TopicCollector] = None):
+    """
+    Stream page-aware chunks from a PDF while it is being read
+    A topic collector, if given, notes the headings of the pages on the way.
+    """
+    chunker = chunker or TextChunker()
+    pages = iter_pdf_pages(pdf_path, extractor, text_cache, content_hash)
+    if topic_collector is not None:
+        pages = topic_collector.wrap(pages)
+    return chunker.iter_chunks(pages)
+
+
+def pdf_topic_collector(pdf_path: Path, extractor: Optional[str] = None) -> TopicCollector:
+    """Topic collector seeded with the PDF's bookmarks (none if they cannot be read)"""
+    try:
+        outline = get_extractor(extractor).outline(pdf_path)
+    except Exception as e:
+        print(f"Warning: Could not read the outline of {Path(pdf_path).name}: {e}")
+        outline = []
+    return TopicCollector(outline)
+
+
+def extract_pdf_chunks(pdf_path: Path, chunker: Optional[TextChunker] = None, extractor: Optional[str] = None,
+                       text_cache_path: Optional[str] = None,
+                       content_hash: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Extract all page-aware chunks of a PDF, and its topics
+    Module-level so ingestion can run it in worker processes.
+    """
+    text_cache = TextCache(text_cache_path) if text_cache_path else None
+    collector = pdf_topic_collector(pdf_path, extractor)
+    chunks = list(iter_pdf_chunks(pdf_path, chunker, extractor, text_cache, content_hash, collector))
+    return chunks, collector.topics()
+
+
+def partition_name(class_num: int, subject: str, language: str, suffix: str = "") -> str:
+    """Collection name of one (class, subject, language) partition, e.g. textbooks_6_science_english"""
+    slug = lambda value: re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_")
+    name = f"textbooks_{class_num}_{slug(subject)}_{slug(language)}{suffix}"
+    # ChromaDB names are limited to 63 characters
+    if len(name) > 63:
+        name = name[:54] + "_" + hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    return name
+
+
+def _model_suffix(embedding_backend: Optional[EmbeddingBackend]) -> str:
+    """Collection/manifest name suffix for non-default embedding models"""
+    if embedding_backend is None or embedding_backend.model_name == DEFAULT_EMBEDDING_MODEL:
+        # ChromaDB's built-in default is the same all-MiniLM-L6-v2 model
+        return ""
+    slug = re.sub(r"[^a-zA-Z0-9]+", "_", embedding_backend.model_name.split("/")[-1]).strip("_").lower()
+    return f"_{slug}"
+
+
+def parse_textbook_folder(folder_name: str) -> Optional[tuple]:
+    """Parse a 'Class N Subject' folder name into (class_num, subject)"""
+    match = re.match(r"^Class\s+(\d+)\s+(.+)$", folder_name)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2).strip()
+
+
 class TeachingAgent:
     """
     Fast Teaching Agent using Groq API with RAG
@@ -29,15 +157,31 @@ class TeachingAgent:
     - Translation support
     """
     
-    def __init__(self, groq_api_key: str, textbook_path: str = "TextBooks"):
-        """Initialize the teaching agent"""
+    def __init__(self, groq_api_key: str, textbook_path: str = "TextBooks",
+                 vector_store_path: str = DEFAULT_VECTOR_STORE_PATH,
+                 ingest_batch_size: int = 256, pdf_extractor: Optional[str] = None,
+                 text_cache_path: Optional[str] = DEFAULT_TEXT_CACHE_PATH,
+                 chunker: Optional[TextChunker] = None,
+                 embedding_backend: Optional[EmbeddingBackend] = None,
+                 vector_backend: str = DEFAULT_VECTOR_BACKEND,
+                 retrieval_mode: str = DEFAULT_RETRIEVAL_MODE,
+                 hnsw_params: Optional[Dict] = None,
+                 vector_dtype: str = DEFAULT_VECTOR_DTYPE,
+                 vector_rescore: bool = DEFAULT_VECTOR_RESCORE):
+        """
+        Initialize the teaching agent
+        hnsw_params: ChromaDB index settings for new partitions, e.g. {"hnsw:M": 32, "hnsw:search_ef": 50}
+        vector_dtype: NumPy store vector storage, "float32", "float16" or "int8"
+        vector_rescore: with a compact vector_dtype, keep a float32 copy on disk to re-score candidates
+        """
         
         self.groq_api_key = groq_api_key
         # Updated to use latest available model
         self.model = "llama-3.3-70b-versatile"  # This will be handled with fallback
         
         try:
-            self.client = Groq(api_key=groq_api_key)
+            # Shared by every session, so requests reuse pooled keep-alive connections
+            self.client = get_groq_client(groq_api_key)
             self.groq_available = True
             # Try to detect available models
             self._set_best_available_model()
@@ -45,25 +189,73 @@ class TeachingAgent:
             print(f"Warning: Groq not available: {e}")
             self.groq_available = False
         
-        # ChromaDB for RAG
+        # Explicit embedding function; without sentence-transformers ChromaDB embeds with its default
+        self.embedding_backend = embedding_backend or get_embedding_backend()
+        # Passing embedding_function=None would disable ChromaDB's embedding instead
+        self._chroma_embedding = ({"embedding_function": self.embedding_backend}
+                                  if self.embedding_backend is not None else {})
+        
+        # Vector store for RAG (persistent on disk, shared across sessions)
+        self.vector_store_path = vector_store_path
+        self.vector_backend = vector_backend
+        self.hnsw_params = hnsw_params or {}
+        self.vector_dtype = vector_dtype
+        self.vector_rescore = vector_rescore
+        self.chroma_client = None
+        # Vectors of different models cannot share a collection or manifest
+        suffix = _model_suffix(self.embedding_backend)
+        self.collection_suffix = suffix
         try:
-            self.chroma_client = chromadb.Client()
-            self.collection_name = "shiksha_mitra_textbooks"
-            
-            try:
-                self.collection = self.chroma_client.get_collection(name=self.collection_name)
-            except:
-                self.collection = self.chroma_client.create_collection(
-                    name=self.collection_name,
-                    metadata={"description": "Shiksha Mitra Textbook Embeddings"}
-                )
-            self.chroma_available = True
+            if vector_backend == "numpy":
+                if self.embedding_backend is None:
+                    raise RuntimeError("the NumPy vector store needs sentence-transformers")
+            elif vector_backend == "chroma":
+                self.chroma_client = get_chroma_client(vector_store_path)
+            else:
+                raise ValueError(f"Unknown vector backend '{vector_backend}'. Choose 'chroma' or 'numpy'")
+            self.vector_store_available = True
         except Exception as e:
-            print(f"Warning: ChromaDB not available: {e}")
-            self.chroma_available = False
-            self.collection = None
+            print(f"Warning: Vector store ({vector_backend}) not available: {e}")
+            self.vector_store_available = False
         
         self.textbook_path = Path(textbook_path)
+        self.textbook_language = DEFAULT_TEXTBOOK_LANGUAGE
+        self.ingest_batch_size = ingest_batch_size
+        
+        if self.chroma_client is not None:
+            try:
+                self._migrate_legacy_collection(LEGACY_COLLECTION_NAME + suffix)
+            except Exception as e:
+                print(f"Warning: Could not migrate the old textbook collection: {e}")
+        self.pdf_extractor = pdf_extractor
+        self.chunker = chunker or TextChunker()
+        
+        # Extracted page text, so re-chunking never re-parses PDFs (None disables)
+        self.text_cache = TextCache(text_cache_path) if text_cache_path else None
+        
+        # What has been ingested, so unchanged PDFs are never re-parsed
+        backend_suffix = "" if vector_backend == "chroma" else f"_{vector_backend}"
+        self.manifest = IngestionManifest(Path(vector_store_path) / f"ingestion_manifest{backend_suffix}{suffix}.db")
+        
+        # Keyword index of the same chunks, for hybrid retrieval
+        if retrieval_mode not in ("hybrid", "vector", "lexical"):
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'. Choose 'hybrid', 'vector' or 'lexical'")
+        self.retrieval_mode = retrieval_mode
+        lexical_path = Path(vector_store_path) / f"lexical_index{backend_suffix}{suffix}.db"
+        lexical_is_new = not lexical_path.exists()
+        self.lexical_index = LexicalIndex(lexical_path)
+        if lexical_is_new and self.vector_store_available and self.manifest.all_entries():
+            # Vector store built before the keyword index existed
+            try:
+                self.rebuild_lexical_index()
+            except Exception as e:
+                print(f"Warning: Could not build the keyword index: {e}")
+        
+        # Chapter and section titles, so queries naming a topic skip search
+        self.topic_index = TopicIndex(Path(vector_store_path) / f"topic_index{backend_suffix}{suffix}.db")
+        
+        # Retrieved passages, shared by every session in the process
+        self.retrieval_cache = get_retrieval_cache()
         
         # Caching
         self.cache = {}
@@ -112,14 +304,9 @@ class TeachingAgent:
             return text
         
         try:
-            prompt = f"""Translate the following text to {target_language}. 
-Only provide the translation, nothing else.
-
-Text: {text}"""
-            
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=[{"role": "user", "content": self._translation_prompt(text, target_language)}],
                 temperature=0.3,
                 max_tokens=500,
                 top_p=0.9
@@ -130,11 +317,204 @@ Text: {text}"""
             print(f"Translation error: {e}")
             return text
     
-    def ingest_textbook(self, class_num: int, subject: str, language: str = "English") -> tuple:
-        """Ingest textbooks for a class and subject"""
-        if not self.chroma_available:
-            return False, "ChromaDB not available"
+    def _translation_prompt(self, text: str, target_language: str) -> str:
+        return f"""Translate the following text to {target_language}. 
+Only provide the translation, nothing else.
+
+Text: {text}"""
+    
+    def translate_text_stream(self, text: str, target_language: str) -> Iterator[str]:
+        """translate_text, yielding the translation as it is generated"""
+        if not self.groq_available or target_language.lower() == "english":
+            yield text
+            return
         
+        started = False
+        try:
+            for part in self._stream_chat(self._translation_prompt(text, target_language),
+                                          max_tokens=500, temperature=0.3):
+                started = True
+                yield part
+        except Exception as e:
+            print(f"Translation error: {e}")
+            if started:
+                raise
+            yield text
+    
+    def _stream_chat(self, prompt: str, max_tokens: int, temperature: float = 0.7) -> Iterator[str]:
+        """Text of a chat completion, chunk by chunk as the model generates it"""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=0.9,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _stream_in_language(self, prompt: str, max_tokens: int, language: str) -> Iterator[str]:
+        """
+        Stream an answer in the student's language
+        Other languages translate the English answer sentence by sentence while
+        it is still being generated: the first sentence on its own, so the
+        student sees text early, then about TRANSLATION_SEGMENT_CHARS at a time.
+        """
+        if language.lower() == "english":
+            yield from self._stream_chat(prompt, max_tokens)
+            return
+        
+        buffer = ""
+        first = True
+        for part in self._stream_chat(prompt, max_tokens):
+            buffer += part
+            # The last break followed by text (a break at the very end may still grow)
+            breaks = [match for match in SENTENCE_BREAK.finditer(buffer) if match.end() < len(buffer)]
+            if breaks and (first or breaks[-1].start() >= TRANSLATION_SEGMENT_CHARS):
+                end = breaks[-1]
+                yield from self._translate_segment(buffer[:end.start()], language)
+                yield end.group()
+                buffer = buffer[end.end():]
+                first = False
+        yield from self._translate_segment(buffer, language)
+    
+    def _translate_segment(self, text: str, language: str) -> Iterator[str]:
+        """Streamed translation of part of an answer, keeping its surrounding whitespace"""
+        stripped = text.strip()
+        if not stripped:
+            yield text
+            return
+        leading = text[:len(text) - len(text.lstrip())]
+        if leading:
+            yield leading
+        yield from self.translate_text_stream(stripped, language)
+        trailing = text[len(text.rstrip()):]
+        if trailing:
+            yield trailing
+    
+    # ==================== PARTITIONS ====================
+    
+    def get_collection(self, class_num: int, subject: str, language: str, create: bool = False):
+        """
+        Collection of one (class, subject, language) partition
+        Partitions are created on first write; reading a missing one returns None.
+        """
+        name = partition_name(class_num, subject, language, self.collection_suffix)
+        
+        if self.vector_backend == "numpy":
+            path = Path(self.vector_store_path) / "numpy" / name
+            if not create and not NumpyCollection.exists(path):
+                return None
+            return get_numpy_collection(path, self.embedding_backend, self.vector_dtype, self.vector_rescore)
+        
+        key = (str(Path(self.vector_store_path).resolve()), name)
+        with _shared_lock:
+            collection = _chroma_collections.get(key)
+        if collection is not None:
+            return collection
+        
+        if create:
+            collection = self.chroma_client.get_or_create_collection(
+                name=name,
+                metadata={"description": f"Class {class_num} {subject} ({language}) textbook embeddings",
+                          **self.hnsw_params},
+                **self._chroma_embedding
+            )
+        else:
+            try:
+                collection = self.chroma_client.get_collection(name=name, **self._chroma_embedding)
+            except Exception:
+                # Not created yet (may be created later by another process)
+                return None
+        
+        with _shared_lock:
+            _chroma_collections[key] = collection
+        return collection
+    
+    def _migrate_legacy_collection(self, legacy_name: str) -> None:
+        """Move chunks of the old single collection into partition collections, once"""
+        key = (str(Path(self.vector_store_path).resolve()), legacy_name)
+        with _shared_lock:
+            if key in _migrated_stores:
+                return
+            _migrated_stores.add(key)
+        
+        try:
+            legacy = self.chroma_client.get_collection(name=legacy_name, **self._chroma_embedding)
+        except Exception:
+            return  # nothing to migrate
+        
+        total = legacy.count()
+        print(f"Migrating {total} chunks from '{legacy_name}' into per-class partitions...")
+        step = max(self.ingest_batch_size, 1000)
+        for offset in range(0, total, step):
+            batch = legacy.get(limit=step, offset=offset, include=["embeddings", "documents", "metadatas"])
+            groups = {}
+            for i, metadata in enumerate(batch["metadatas"]):
+                partition = (metadata.get("class"), metadata.get("subject"),
+                             metadata.get("language") or self.textbook_language)
+                groups.setdefault(partition, []).append(i)
+            
+            for (class_num, subject, language), rows in groups.items():
+                self.get_collection(class_num, subject, language, create=True).upsert(
+                    ids=[batch["ids"][i] for i in rows],
+                    embeddings=[batch["embeddings"][i] for i in rows],
+                    documents=[batch["documents"][i] for i in rows],
+                    metadatas=[batch["metadatas"][i] for i in rows]
+                )
+        
+        self.chroma_client.delete_collection(name=legacy_name)
+        print(f"✅ Migrated {total} chunks")
+    
+    # ==================== INGESTION ====================
+    
+    def ingest_textbook(self, class_num: int, subject: str, language: Optional[str] = None,
+                        rescan: bool = False,
+                        progress: Optional[Callable[[int, int, int], None]] = None) -> tuple:
+        """
+        Ingest textbooks for a class and subject
+        `language` is the language of the PDFs (defaults to the textbook language).
+        `rescan` checks the folder again even if this process already ingested it.
+        `progress(files_done, files_total, chunks)` is called after each PDF.
+        """
+        if not self.vector_store_available:
+            return False, "Vector store not available"
+        
+        language = language or self.textbook_language
+        
+        partition = self._partition_key(class_num, subject, language)
+        with _shared_lock:
+            lock = _ingest_locks.setdefault(partition, threading.Lock())
+        
+        # One ingestion per partition at a time; sessions arriving meanwhile wait for it
+        with lock:
+            # Already ingested by another session in this process
+            with _shared_lock:
+                if partition in _ingested_partitions and not rescan:
+                    return True, "Textbooks already loaded"
+            
+            # Searches skip a partition until its first ingestion is done (see search_passages)
+            first = self.manifest.partition_version(class_num, subject, language,
+                                                    self.textbook_language).startswith("0:")
+            with _shared_lock:
+                _ingesting_partitions[partition] = first
+            try:
+                # Other processes (the textbook watcher, the CLI) write the same stores
+                with self.manifest.write_lock():
+                    return self._ingest_folder(class_num, subject, language, partition, progress)
+            finally:
+                with _shared_lock:
+                    _ingesting_partitions.pop(partition, None)
+    
+    def _partition_key(self, class_num: int, subject: str, language: str) -> tuple:
+        """Process-wide key of a partition of this agent's stores"""
+        return (str(Path(self.manifest.db_path).resolve()), class_num, subject, language)
+    
+    def _ingest_folder(self, class_num: int, subject: str, language: str, partition: tuple,
+                       progress: Optional[Callable[[int, int, int], None]] = None) -> tuple:
+        """Ingest new and changed PDFs of a class/subject folder and purge removed ones"""
         try:
             folder_name = f"Class {class_num} {subject}"
             folder_path = self.textbook_path / folder_name
@@ -142,95 +522,416 @@ Text: {text}"""
             if not folder_path.exists():
                 return True, f"Textbook folder not found (optional): {folder_name}"
             
-            pdf_files = list(folder_path.glob("*.pdf"))
+            pdf_files = sorted(folder_path.glob("*.pdf"))
+            known = self.manifest.entries_for(class_num, subject)
             processed = 0
+            skipped = 0
+            batcher = _ChunkBatcher(self)
+            if progress:
+                progress(0, len(pdf_files), 0)
             
-            for pdf_file in pdf_files:
+            for done, pdf_file in enumerate(pdf_files, 1):
                 try:
-                    text_chunks = self._extract_pdf_text(pdf_file)
+                    entry = known.pop(str(pdf_file.resolve()), None)
+                    content_hash = self.manifest.check(pdf_file, entry, language)
+                    if content_hash is None:
+                        skipped += 1
+                        continue
                     
-                    for i, chunk in enumerate(text_chunks):
-                        doc_id = f"{class_num}_{subject}_{pdf_file.stem}_chunk_{i}"
-                        
-                        try:
-                            if self.collection.get(ids=[doc_id])['ids']:
-                                continue
-                        except:
-                            pass
-                        
-                        self.collection.add(
-                            documents=[chunk],
-                            ids=[doc_id],
-                            metadatas=[{
-                                "class": class_num,
-                                "subject": subject,
-                                "chapter": pdf_file.stem,
-                                "language": language,
-                                "timestamp": datetime.now().isoformat()
-                            }]
-                        )
+                    # Chunks are embedded in batches while the PDF is still being read
+                    collector = pdf_topic_collector(pdf_file, self.pdf_extractor)
+                    self._write_pdf(batcher, class_num, subject, language, pdf_file,
+                                    iter_pdf_chunks(pdf_file, self.chunker, self.pdf_extractor,
+                                                    self.text_cache, content_hash, collector),
+                                    content_hash, entry, collector.topics, collector.candidates)
                     processed += 1
                 except Exception as e:
                     print(f"Error processing {pdf_file.name}: {e}")
+                finally:
+                    if progress:
+                        progress(done, len(pdf_files), batcher.chunks)
+            
+            batcher.flush()
+            added = batcher.added
+            
+            # PDFs that were ingested before but have since been removed
+            removed = self._purge_pdfs([e for e in known.values() if not Path(e['pdf_path']).exists()])
             
-            return True, f"Ingested {processed} chapters"
+            with _shared_lock:
+                _ingested_partitions.add(partition)
+            
+            message = f"Ingested {processed} chapters ({added} new chunks)"
+            if skipped:
+                message += f", {skipped} unchanged"
+            if removed:
+                message += f", {removed} removed"
+            return True, message
         
         except Exception as e:
             return False, str(e)
     
-    def _extract_pdf_text(self, pdf_path: Path, chunk_size: int = 1500) -> List[str]:
-        """Extract text from PDF in optimized chunks"""
-        chunks = []
+    def ingest_pdf_chunks(self, class_num: int, subject: str, language: str,
+                          pdf_file: Path, text_chunks,
+                          content_hash: Optional[str] = None, entry: Optional[Dict] = None,
+                          topics: Optional[List[Dict]] = None) -> int:
+        """
+        Add already-extracted chunks of one PDF and record it in the manifest
+        `entry` is the PDF's previous manifest entry, if any; `topics` are
+        its headings from extract_pdf_chunks.
+        Returns number of chunks written.
+        """
+        if not self.vector_store_available:
+            return 0
+        batcher = _ChunkBatcher(self)
+        titles = [(topic["topic"], topic["page_start"]) for topic in topics or []]
+        with self.manifest.write_lock():
+            self._write_pdf(batcher, class_num, subject, language, pdf_file, text_chunks,
+                            content_hash or file_hash(pdf_file), entry,
+                            (lambda: topics) if topics is not None else None, lambda: titles)
+            batcher.flush()
+        return batcher.added
+    
+    def purge_missing_pdfs(self) -> int:
+        """Remove chunks and manifest entries of PDFs that no longer exist"""
+        if not self.vector_store_available:
+            return 0
+        with self.manifest.write_lock():
+            return self._purge_pdfs([
+                entry for entry in self.manifest.all_entries().values()
+                if not Path(entry['pdf_path']).exists()
+            ])
+    
+    def rebuild_lexical_index(self) -> int:
+        """Re-index the text of every ingested chunk for keyword search, returns chunks indexed"""
+        indexed = 0
+        step = max(self.ingest_batch_size, 1000)
+        with self.manifest.write_lock():
+            for entry in self.manifest.all_entries().values():
+                language = entry.get('language') or self.textbook_language
+                collection = self.get_collection(entry['class_num'], entry['subject'], language)
+                if collection is None:
+                    continue
+                name = partition_name(entry['class_num'], entry['subject'], language, self.collection_suffix)
+                ids = entry['chunk_ids']
+                for i in range(0, len(ids), step):
+                    result = collection.get(ids=ids[i:i + step], include=["documents"])
+                    self.lexical_index.add(name, result['ids'], result['documents'])
+                    indexed += len(result['ids'])
+        return indexed
+    
+    def _write_pdf(self, batcher: "_ChunkBatcher", class_num: int, subject: str, language: str,
+                   pdf_file: Path, text_chunks, content_hash: str, entry: Optional[Dict],
+                   topics: Optional[Callable[[], List[Dict]]] = None,
+                   topic_candidates: Optional[Callable[[], List[Tuple[str, int]]]] = None) -> None:
+        """
+        Queue a new or changed PDF's chunks and its manifest record
+        `topics` is called once all chunks are read (headings are collected as pages stream);
+        `topic_candidates` gives the titles known so far, matched against each chunk as it passes.
+        A changed PDF's new chunks overwrite its old ones by ID; old chunks beyond the new
+        count (all of them if the PDF moved to another partition, e.g. another language)
+        are only deleted once the new version is recorded, so a failed extraction leaves
+        the previous version searchable.
+        """
+        name = partition_name(class_num, subject, language, self.collection_suffix)
+        collection = self.get_collection(class_num, subject, language, create=True)
+        timestamp = datetime.now().isoformat()
+        ids = []
+        matcher = TopicChunkMatcher(topic_candidates or list)
         
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        text = page.extract_text()
-                        if text:
-                            full_text += f"\n[Page {page_num + 1}]\n{text}"
-                    except:
-                        continue
-                
-                words = full_text.split()
-                for i in range(0, len(words), chunk_size):
-                    chunk = " ".join(words[i:i + chunk_size])
-                    if len(chunk) > 200:
-                        chunks.append(chunk)
+        for i, chunk in enumerate(text_chunks):
+            doc_id = f"{class_num}_{subject}_{pdf_file.stem}_chunk_{i}"
+            ids.append(doc_id)
+            # Unknown files may have chunks from before the manifest was kept
+            batcher.add(name, collection, doc_id, chunk["text"], {
+                "class": class_num,
+                "subject": subject,
+                "chapter": pdf_file.stem,
+                "language": language,
+                "page_start": chunk["page_start"],
+                "page_end": chunk["page_end"],
+                "timestamp": timestamp
+            }, skip_if_exists=entry is None)
+            if topics is not None:
+                matcher.add(doc_id, chunk["page_start"], chunk["page_end"], chunk["text"])
         
+        if topics is not None:
+            self.topic_index.replace_pdf(name, str(pdf_file.resolve()), pdf_file.stem,
+                                         matcher.attach(topics()))
+        
+        stat = pdf_file.stat()
+        stale_ids = []
+        if entry:
+            previous_name = partition_name(entry['class_num'], entry['subject'],
+                                           entry.get('language') or self.textbook_language, self.collection_suffix)
+            if previous_name != name:
+                # Chunk IDs don't name the language, so none of the old partition's chunks were overwritten
+                stale_ids = list(entry['chunk_ids'])
+                if topics is None:
+                    self.topic_index.remove_pdf(entry['pdf_path'])
+            else:
+                new_ids = set(ids)
+                stale_ids = [doc_id for doc_id in entry['chunk_ids'] if doc_id not in new_ids]
+        batcher.finish_pdf({
+            'pdf_path': str(pdf_file.resolve()),
+            'class_num': class_num,
+            'subject': subject,
+            'language': language,
+            'content_hash': content_hash,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'chunk_ids': ids
+        }, entry, stale_ids)
+    
+    def _purge_pdfs(self, entries: List[Dict]) -> int:
+        """Delete the chunks and manifest entries of these PDFs"""
+        for entry in entries:
+            self._delete_chunks(entry, entry['chunk_ids'])
+            self.manifest.remove(entry['pdf_path'])
+        return len(entries)
+    
+    def _delete_chunks(self, entry: Dict, ids: List[str], remove_topics: bool = True) -> None:
+        """Delete chunks by ID, in batches, from the partition of a manifest entry"""
+        language = entry.get('language') or self.textbook_language
+        name = partition_name(entry['class_num'], entry['subject'], language, self.collection_suffix)
+        self.lexical_index.delete(name, ids)
+        if remove_topics:
+            self.topic_index.remove_pdf(entry['pdf_path'])
+        self.retrieval_cache.invalidate(name)
+        collection = self.get_collection(entry['class_num'], entry['subject'], language)
+        if collection is None:
+            return
+        step = max(self.ingest_batch_size, 1000)
+        for i in range(0, len(ids), step):
+            collection.delete(ids=ids[i:i + step])
+    
+    def _existing_ids(self, collection, ids: List[str]) -> set:
+        """Which of these chunk IDs are already in the collection (batched lookups)"""
+        existing = set()
+        step = max(self.ingest_batch_size, 1000)
+        for i in range(0, len(ids), step):
+            try:
+                result = collection.get(ids=ids[i:i + step], include=[])
+                existing.update(result['ids'])
+            except Exception as e:
+                print(f"Error checking existing chunks: {e}")
+        return existing
+    
+    def _add_chunks(self, collection, pending: Dict[str, list]) -> int:
+        """Add chunks in batches of ingest_batch_size, returns number added"""
+        batch_size = self.ingest_batch_size
+        if self.chroma_client is not None:
+            try:
+                batch_size = min(batch_size, self.chroma_client.get_max_batch_size())
+            except Exception:
+                pass
+        
+        # The NumPy store keeps batches in memory until the batcher commits them
+        write = getattr(collection, "stage", collection.upsert)
+        added = 0
+        for i in range(0, len(pending["ids"]), batch_size):
+            write(
+                ids=pending["ids"][i:i + batch_size],
+                documents=pending["documents"][i:i + batch_size],
+                metadatas=pending["metadatas"][i:i + batch_size]
+            )
+            added += len(pending["ids"][i:i + batch_size])
+        return added
+    
+    def _extract_pdf_text(self, pdf_path: Path) -> List[str]:
+        """Extract text from PDF in optimized chunks"""
+        try:
+            return [chunk["text"] for chunk in iter_pdf_chunks(pdf_path, self.chunker, self.pdf_extractor,
+                                                               self.text_cache)]
         except Exception as e:
             print(f"Error extracting PDF: {e}")
+            return []
+    
+    def search_passages(self, query: str, class_num: int, subject: str, language: str,
+                        n_results: int = 2, by_topic: bool = False) -> Optional[List[Dict]]:
+        """
+        Best passages ({"id", "text"}) of a textbook for a query, in rank order
+        With by_topic (lesson requests), a query naming a topic is answered from
+        that topic's chunks without searching.
+        Returns None when no textbook of this class and subject is indexed, or
+        while it is ingested for the first time (its chunks are incomplete).
+        """
+        return self._search_passages(query, class_num, subject, language, n_results, by_topic)[0]
+    
+    def _search_passages(self, query: str, class_num: int, subject: str, language: str,
+                         n_results: int = 2, by_topic: bool = False) -> Tuple[Optional[List[Dict]], bool]:
+        """search_passages, and whether its textbook is still being ingested for the first time"""
+        # Only this textbook's partition is searched; students whose language
+        # has no textbooks of its own search the default-language books
+        collection = self.get_collection(class_num, subject, language)
+        if collection is None and language != self.textbook_language:
+            language = self.textbook_language
+            collection = self.get_collection(class_num, subject, language)
+        if collection is None:
+            return None, False
         
-        return chunks
+        name = partition_name(class_num, subject, language, self.collection_suffix)
+        # Popular topics are served without embedding the query or searching
+        cache_key = (name, str(Path(self.vector_store_path).resolve()), self.retrieval_mode,
+                     normalize_query(query), n_results, by_topic)
+        version = self.manifest.partition_version(class_num, subject, language, self.textbook_language)
+        with _shared_lock:
+            first_ingestion = _ingesting_partitions.get(self._partition_key(class_num, subject, language))
+        if first_ingestion:
+            return None, True
+        # Chunks can be written before any PDF is recorded ("0:" versions), also by another process
+        if version.startswith("0:"):
+            return None, collection.count() > 0
+        hits = self.retrieval_cache.get(cache_key, version)
+        if hits is None:
+            hits = ((by_topic and self._topic_passages(collection, name, query, n_results))
+                    or self._search_partition(collection, name, query, n_results))
+            # A rescan in progress may change the results before its version is recorded
+            if first_ingestion is None:
+                self.retrieval_cache.put(cache_key, version, hits)
+        return hits, False
     
-    def _retrieve_content(self, query: str, class_num: int, subject: str, language: str, n_results: int = 2) -> str:
-        """Retrieve relevant content from vector DB"""
-        if not self.chroma_available or not self.collection:
-            return "Using general knowledge."
+    def _retrieve_content(self, query: str, class_num: int, subject: str, language: str,
+                          n_results: int = 2, max_chars: Optional[int] = None, by_topic: bool = False) -> str:
+        """
+        Retrieve relevant content from vector DB
+        With max_chars, whole passages are kept in rank order until the budget
+        is used (the best passage is always included, truncated if needed).
+        by_topic: the query is a lesson topic (see search_passages)
+        """
+        if not self.vector_store_available:
+            return GENERAL_KNOWLEDGE
         
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where={
-                    "$and": [
-                        {"class": class_num},
-                        {"subject": subject}
-                    ]
-                }
-            )
+            hits, loading = self._search_passages(query, class_num, subject, language, n_results, by_topic)
+            if hits is None:
+                return TEXTBOOK_LOADING if loading else GENERAL_KNOWLEDGE
             
-            if results['documents'] and results['documents'][0]:
-                return "\n\n".join(results['documents'][0])
+            if hits:
+                return _fit_passages([hit["text"] for hit in hits], max_chars)
             else:
                 return "Core concept explanation available."
         
         except Exception as e:
             print(f"Retrieval error: {e}")
-            return "Using general knowledge."
+            return GENERAL_KNOWLEDGE
+    
+    def _topic_passages(self, collection, name: str, query: str, n_results: int) -> List[Dict]:
+        """
+        Passages of the topic a short query names, found without embedding it (empty on a miss)
+        The topic's chunks are ranked by the share of query terms they contain;
+        ties keep document order, so the chunk with the heading comes first.
+        """
+        match = self.topic_index.lookup(name, query)
+        if match is None:
+            return []
+        result = collection.get(ids=match["chunk_ids"], include=["documents"])
+        texts = dict(zip(result['ids'], result['documents']))
+        terms = query_terms(query)
+        ranked = sorted((doc_id for doc_id in match["chunk_ids"] if doc_id in texts),
+                        key=lambda doc_id: -term_coverage(terms, texts[doc_id]))
+        return [{"id": doc_id, "text": texts[doc_id]} for doc_id in ranked[:n_results]]
+    
+    def _search_partition(self, collection, name: str, query: str, n_results: int) -> List[Dict]:
+        """
+        Best passages of one partition, in rank order
+        In hybrid mode a wider candidate set from vector and BM25 search is
+        fused by reciprocal rank, so exact terms that embeddings miss
+        (chapter names, formulas, numbers) still find their passage.
+        """
+        if self.retrieval_mode == "vector" or not self.lexical_index.available:
+            results = self._vector_query(collection, query, n_results)
+            if not results['ids']:
+                return []
+            return [{"id": doc_id, "text": text} for doc_id, text in zip(results['ids'][0], results['documents'][0])]
+        
+        n_candidates = max(n_results * 4, 10)
+        lexical = self.lexical_index.search(name, query, n_candidates)
+        if self.retrieval_mode == "lexical":
+            return [{"id": hit["id"], "text": hit["text"]} for hit in lexical[:n_results]]
+        
+        results = self._vector_query(collection, query, n_candidates)
+        vector_ids = results['ids'][0] if results['ids'] else []
+        texts = dict(zip(vector_ids, results['documents'][0])) if vector_ids else {}
+        texts.update((hit["id"], hit["text"]) for hit in lexical)
+        ranked = fuse_rankings(vector_ids, [hit["id"] for hit in lexical], texts, query)
+        return [{"id": doc_id, "text": texts[doc_id]} for doc_id in ranked[:n_results]]
+    
+    def _vector_query(self, collection, query: str, n_results: int) -> Dict:
+        """Vector search for one query; its embedding is not written to the embedding cache"""
+        if self.embedding_backend is None:
+            return collection.query(query_texts=[query], n_results=n_results)
+        # Student questions rarely repeat verbatim; caching them would grow the cache without bound
+        embedding = self.embedding_backend.embed([query], cache=False)
+        return collection.query(query_embeddings=embedding, n_results=n_results)
+    
+    def _lesson_prompt(self, topic: str, student_class: int, subject: str, content: str,
+                       local_context: str) -> str:
+        """Prompt of a micro-lesson"""
+        return f"""Create a BRIEF micro-lesson on "{topic}" for Class {student_class} {subject}.
+
+TEXTBOOK CONTEXT: {content}
+
+Format:
+1. **Concept** (1-2 lines): Simple explanation
+2. **Real-World Example**: Connection to {local_context}
+3. **Key Practice**: One simple problem with answer
+4. **Main Takeaway**: Most important point
+
+Keep total response under 300 words."""
+    
+    def _explanation_prompt(self, concept: str, student_question: str, class_num: int, subject: str,
+                            content: str) -> str:
+        """Prompt of an explanation of a student's question"""
+        return f"""A Class {class_num} student studying {subject} asks about {concept}:
+Question: "{student_question}"
+
+TEXTBOOK REFERENCE: {content}
+
+Provide:
+1. Direct answer to their question
+2. Simple, age-appropriate explanation
+3. One relatable example
+
+Keep under 200 words."""
+    
+    def _finish_lesson(self, topic: str, lesson_content: str, content: str, cache_key: str) -> Dict:
+        """Record a finished lesson in the history and the cache, returns its result"""
+        self.conversation_history.append({
+            "type": "lesson",
+            "topic": topic,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        if len(self.conversation_history) > self.max_history_length:
+            self.conversation_history = self.conversation_history[-self.max_history_length:]
+        
+        from_textbook = content not in (GENERAL_KNOWLEDGE, TEXTBOOK_LOADING)
+        result = {
+            "success": True,
+            "lesson": lesson_content,
+            "topic": topic,
+            "difficulty": round(self.comprehension_score),
+            "sources": ["Textbook", "AI Generated"] if from_textbook else ["General knowledge", "AI Generated"]
+        }
+        
+        # Lessons written while the textbook is still being ingested are not kept
+        if content != TEXTBOOK_LOADING:
+            self._cache_set(cache_key, json.dumps(result))
+        return result
+    
+    def _finish_explanation(self, student_question: str, explanation: str) -> Dict:
+        """Record a finished explanation in the history, returns its result"""
+        self.conversation_history.append({
+            "type": "doubt",
+            "question": student_question,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        return {
+            "success": True,
+            "explanation": explanation,
+            "comprehension_level": round(self.comprehension_score)
+        }
     
     def create_micro_lesson(self, topic: str, student_class: int, subject: str, 
                            language: str = "English", local_context: str = "farming") -> Dict:
@@ -247,19 +948,9 @@ Text: {text}"""
             return json.loads(cached)
         
         # Retrieve relevant content
-        content = self._retrieve_content(topic, student_class, subject, language)
+        content = self._retrieve_content(topic, student_class, subject, language, max_chars=500, by_topic=True)
         
-        prompt = f"""Create a BRIEF micro-lesson on "{topic}" for Class {student_class} {subject}.
-
-TEXTBOOK CONTEXT: {content[:500]}
-
-Format:
-1. **Concept** (1-2 lines): Simple explanation
-2. **Real-World Example**: Connection to {local_context}
-3. **Key Practice**: One simple problem with answer
-4. **Main Takeaway**: Most important point
-
-Keep total response under 300 words."""
+        prompt = self._lesson_prompt(topic, student_class, subject, content, local_context)
         
         try:
             response = self.client.chat.completions.create(
@@ -276,29 +967,47 @@ Keep total response under 300 words."""
             if language.lower() != "english":
                 lesson_content = self.translate_text(lesson_content, language)
             
-            self.conversation_history.append({
-                "type": "lesson",
-                "topic": topic,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            if len(self.conversation_history) > self.max_history_length:
-                self.conversation_history = self.conversation_history[-self.max_history_length:]
-            
-            result = {
-                "success": True,
-                "lesson": lesson_content,
-                "topic": topic,
-                "difficulty": round(self.comprehension_score),
-                "sources": ["Textbook", "AI Generated"]
-            }
-            
-            self._cache_set(cache_key, json.dumps(result))
-            return result
+            return self._finish_lesson(topic, lesson_content, content, cache_key)
         
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def stream_micro_lesson(self, topic: str, student_class: int, subject: str,
+                            language: str = "English", local_context: str = "farming") -> Dict:
+        """
+        Streaming create_micro_lesson: result["stream"] yields the lesson text as it is generated
+        Once the stream is exhausted the result has the fields of create_micro_lesson
+        (or success False and an error); the history and cache are updated then.
+        """
+        if not self.groq_available:
+            return {"success": False, "error": "Groq API not available"}
+        
+        cache_key = f"lesson_{topic}_{student_class}_{subject}"
+        cached = self._cache_get(cache_key)
+        if cached:
+            result = json.loads(cached)
+            result["stream"] = iter([result["lesson"]])
+            return result
+        
+        content = self._retrieve_content(topic, student_class, subject, language, max_chars=500, by_topic=True)
+        prompt = self._lesson_prompt(topic, student_class, subject, content, local_context)
+        
+        result = {"success": True, "topic": topic}
+        
+        def stream():
+            parts = []
+            try:
+                for text in self._stream_in_language(prompt, 400, language):
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                result.update(success=False, error=str(e))
+                return
+            result.update(self._finish_lesson(topic, "".join(parts), content, cache_key))
+        
+        result["stream"] = stream()
+        return result
+    
     def explain_adaptively(self, concept: str, student_question: str, class_num: int, 
                           subject: str, language: str = "English") -> Dict:
         """Provide adaptive explanation with translation"""
@@ -307,19 +1016,9 @@ Keep total response under 300 words."""
         if not self.groq_available:
             return {"success": False, "error": "Groq API not available"}
         
-        content = self._retrieve_content(student_question, class_num, subject, language)
+        content = self._retrieve_content(student_question, class_num, subject, language, max_chars=300)
         
-        prompt = f"""A Class {class_num} student studying {subject} asks about {concept}:
-Question: "{student_question}"
-
-TEXTBOOK REFERENCE: {content[:300]}
-
-Provide:
-1. Direct answer to their question
-2. Simple, age-appropriate explanation
-3. One relatable example
-
-Keep under 200 words."""
+        prompt = self._explanation_prompt(concept, student_question, class_num, subject, content)
         
         try:
             response = self.client.chat.completions.create(
@@ -336,21 +1035,40 @@ Keep under 200 words."""
             if language.lower() != "english":
                 explanation = self.translate_text(explanation, language)
             
-            self.conversation_history.append({
-                "type": "doubt",
-                "question": student_question,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            return {
-                "success": True,
-                "explanation": explanation,
-                "comprehension_level": round(self.comprehension_score)
-            }
+            return self._finish_explanation(student_question, explanation)
         
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def stream_explanation(self, concept: str, student_question: str, class_num: int,
+                           subject: str, language: str = "English") -> Dict:
+        """
+        Streaming explain_adaptively: result["stream"] yields the explanation as it is generated
+        Once the stream is exhausted the result has the fields of explain_adaptively
+        (or success False and an error); the history is updated then.
+        """
+        if not self.groq_available:
+            return {"success": False, "error": "Groq API not available"}
+        
+        content = self._retrieve_content(student_question, class_num, subject, language, max_chars=300)
+        prompt = self._explanation_prompt(concept, student_question, class_num, subject, content)
+        
+        result = {"success": True}
+        
+        def stream():
+            parts = []
+            try:
+                for text in self._stream_in_language(prompt, 300, language):
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                result.update(success=False, error=str(e))
+                return
+            result.update(self._finish_explanation(student_question, "".join(parts)))
+        
+        result["stream"] = stream()
+        return result
+    
     def generate_practice_problems(self, topic: str, class_num: int, subject: str, count: int = 3) -> Dict:
         """Generate practice problems"""
         start_time = time.time()
@@ -483,6 +1201,117 @@ Score out of 10."""
         }
 
 
-def create_teaching_agent(api_key: str) -> TeachingAgent:
+def _fit_passages(passages: List[str], max_chars: Optional[int] = None) -> str:
+    """Join ranked passages, dropping whole passages that exceed the budget"""
+    if max_chars is None:
+        return "\n\n".join(passages)
+    
+    kept = [passages[0][:max_chars]]
+    used = len(kept[0])
+    for passage in passages[1:]:
+        if used + 2 + len(passage) > max_chars:
+            break
+        kept.append(passage)
+        used += 2 + len(passage)
+    return "\n\n".join(kept)
+
+
+class _ChunkBatcher:
+    """
+    Buffers chunks across PDFs and writes them in batches of the agent's
+    ingest_batch_size. A PDF's manifest record is only written once all
+    of its chunks have been.
+    """
+    
+    def __init__(self, agent: TeachingAgent):
+        self.agent = agent
+        # Pending chunks per partition: partition name -> (collection, pending)
+        self.partitions = {}
+        self.size = 0
+        self.records = []
+        # Previous versions of recorded PDFs and their chunk IDs the new version no longer has
+        self.stale = []
+        # Collections holding staged, uncommitted chunks (NumPy store)
+        self.staged = {}
+        self.added = 0
+        # Chunks queued so far, written or not (for progress reports)
+        self.chunks = 0
+    
+    def add(self, name: str, collection, doc_id: str, document: str, metadata: Dict,
+            skip_if_exists: bool = False) -> None:
+        _, pending = self.partitions.setdefault(
+            name, (collection, {"ids": [], "documents": [], "metadatas": [], "check_ids": []})
+        )
+        pending["ids"].append(doc_id)
+        pending["documents"].append(document)
+        pending["metadatas"].append(metadata)
+        if skip_if_exists:
+            pending["check_ids"].append(doc_id)
+        self.size += 1
+        self.chunks += 1
+        if self.size >= self.agent.ingest_batch_size:
+            self._write()
+    
+    def finish_pdf(self, record: Dict, previous: Optional[Dict] = None,
+                   stale_ids: Optional[List[str]] = None) -> None:
+        self.records.append(record)
+        if previous and stale_ids:
+            self.stale.append((previous, stale_ids))
+    
+    def flush(self) -> None:
+        self._write(commit=True)
+    
+    def _write(self, commit: bool = False) -> None:
+        for name, (collection, pending) in self.partitions.items():
+            # Keyword rows are cheap to replace, so every chunk is (re)indexed
+            self.agent.lexical_index.add(name, pending["ids"], pending["documents"])
+            self.agent.retrieval_cache.invalidate(name)
+            
+            check_ids = pending.pop("check_ids")
+            if check_ids:
+                # One batched lookup for every chunk that may already exist
+                existing = self.agent._existing_ids(collection, check_ids)
+                if existing:
+                    keep = [i for i, doc_id in enumerate(pending["ids"]) if doc_id not in existing]
+                    pending = {key: [values[i] for i in keep] for key, values in pending.items()}
+            
+            self.added += self.agent._add_chunks(collection, pending)
+            if hasattr(collection, "commit"):
+                self.staged[name] = collection
+        self.partitions = {}
+        self.size = 0
+        
+        if not (commit or self.records):
+            return
+        
+        # Staged chunks are written once per finished PDF rather than per batch
+        for collection in self.staged.values():
+            collection.commit()
+        self.staged = {}
+        
+        # Records of PDFs whose chunks are all written now
+        self.agent.manifest.record_many(self.records)
+        self.records = []
+        
+        # Only now that the new versions are recorded are their leftover old chunks dropped
+        for previous, stale_ids in self.stale:
+            self.agent._delete_chunks(previous, stale_ids, remove_topics=False)
+        self.stale = []
+
+
+def create_teaching_agent(api_key: str, vector_store_path: str = DEFAULT_VECTOR_STORE_PATH,
+                          ingest_batch_size: int = 256, pdf_extractor: Optional[str] = None,
+                          text_cache_path: Optional[str] = DEFAULT_TEXT_CACHE_PATH,
+                          chunker: Optional[TextChunker] = None,
+                          embedding_backend: Optional[EmbeddingBackend] = None,
+                          vector_backend: str = DEFAULT_VECTOR_BACKEND,
+                          retrieval_mode: str = DEFAULT_RETRIEVAL_MODE,
+                          vector_dtype: str = DEFAULT_VECTOR_DTYPE,
+                          vector_rescore: bool = DEFAULT_VECTOR_RESCORE) -> TeachingAgent:
     """Factory function to create teaching agent"""
-    return TeachingAgent(groq_api_key=api_key)
\ No newline at end of file
+    return TeachingAgent(groq_api_key=api_key, vector_store_path=vector_store_path,
+                         ingest_batch_size=ingest_batch_size, pdf_extractor=pdf_extractor,
+                         text_cache_path=text_cache_path, chunker=chunker,
+                         embedding_backend=embedding_backend, vector_backend=vector_backend,
+                         retrieval_mode=retrieval_mode, vector_dtype=vector_dtype,
+                         vector_rescore=vector_rescore)
\ No newline at end of file
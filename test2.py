@@ -1,4 +1,5 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
@@ -16,6 +17,8 @@ from database import get_db
 from translations import get_text, TRANSLATIONS
 from onboarding import handle_onboarding, show_curriculum_overview, CLASSES, LANGUAGES, SUBJECTS_BY_CLASS
 from teaching_agent import create_teaching_agent
+from textbook_watcher import start_textbook_watcher
+from ingestion_jobs import get_ingestion_jobs, DONE, FAILED
 from test_ai import show_enhanced_tests_page
 
 
@@ -30,6 +33,10 @@ st.set_page_config(
 # Initialize database
 db = get_db()
 
+# Browser cookie holding the login session token (never the URL, which leaks
+# through history, shared links, Referer headers and proxy logs)
+SESSION_COOKIE = "shiksha_session"
+
 # Initialize session state
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -53,6 +60,10 @@ if 'practice_problems' not in st.session_state:
     st.session_state.practice_problems = []
 if 'textbooks_ingested' not in st.session_state:
     st.session_state.textbooks_ingested = False
+if 'session_token' not in st.session_state:
+    st.session_state.session_token = None
+if 'pending_session_cookie' not in st.session_state:
+    st.session_state.pending_session_cookie = None
 
 # Theme Configuration
 DARK_THEME = {
@@ -209,6 +220,8 @@ def initialize_teaching_agent():
         
         try:
             st.session_state.teaching_agent = create_teaching_agent(api_key)
+            # Only with SHIKSHA_WATCH_TEXTBOOKS=1 (one app process); normally textbook_watcher.py runs on its own
+            start_textbook_watcher(st.session_state.teaching_agent)
             return True
         except Exception as e:
             st.sidebar.error(f"Error initializing Teaching Agent: {str(e)}")
@@ -217,7 +230,7 @@ def initialize_teaching_agent():
 
 
 def ingest_textbooks_for_user():
-    """Ingest textbooks for current user's class and subjects"""
+    """Queue background ingestion of the current user's class and subjects"""
     if st.session_state.textbooks_ingested:
         return True
     
@@ -232,24 +245,99 @@ def ingest_textbooks_for_user():
     if not class_num or not subjects:
         return False
     
-    with st.spinner("📚 Loading textbooks into AI system..."):
-        for subject in subjects:
-            try:
-                success, msg = agent.ingest_textbook(
-                    class_num=int(class_num),
-                    subject=subject,
-                    language=st.session_state.current_language
-                )
-                if not success:
-                    st.warning(f"Note: {msg}")
-            except Exception as e:
-                st.warning(f"Could not load {subject} textbook: {str(e)}")
-        
-        st.session_state.textbooks_ingested = True
+    # Sessions asking for the same textbooks share one job; lessons use
+    # general knowledge until it finishes. Failed jobs are submitted again
+    # (after a delay) until every subject is loaded.
+    jobs = get_ingestion_jobs()
+    # Textbooks are indexed in their own language, not the student's
+    submitted = [jobs.submit(agent, int(class_num), subject) for subject in subjects]
     
+    st.session_state.textbooks_ingested = all(job.status == DONE for job in submitted)
     return True
 
 
+def format_eta(seconds) -> str:
+    """Human-readable time left"""
+    if seconds is None:
+        return "estimating time left..."
+    if seconds < 60:
+        return f"about {max(int(seconds), 1)}s left"
+    return f"about {int(seconds // 60)} min left"
+
+
+@st.fragment(run_every=2)
+def show_ingestion_progress(class_num: int, subjects: list):
+    """Progress of the student's textbook ingestion, refreshed without rerunning the page"""
+    agent = st.session_state.teaching_agent
+    jobs = get_ingestion_jobs().jobs_for(agent, class_num, subjects)
+    running = [job for job in jobs if not job.finished]
+    
+    if not running:
+        # Rerun the whole page once, which stops polling
+        st.rerun(scope="app")
+    
+    st.info("📚 Loading your textbooks in the background. Lessons use general knowledge until they are ready.")
+    for job in running:
+        if job.files_total:
+            label = (f"{job.subject}: {job.files_done}/{job.files_total} chapters, "
+                     f"{job.chunks} passages, {format_eta(job.eta_seconds())}")
+        else:
+            label = f"{job.subject}: waiting..."
+        st.progress(job.fraction(), text=label)
+
+
+def set_session_cookie(token):
+    """Queue storing the session token in the browser (None clears it), written on the next render"""
+    st.session_state.pending_session_cookie = token or ""
+
+
+def write_session_cookie():
+    """Write a queued session cookie change from a zero-height component"""
+    token = st.session_state.pending_session_cookie
+    if token is None:
+        return
+    st.session_state.pending_session_cookie = None
+    
+    max_age = int(db.session_ttl.total_seconds()) if token else 0
+    components.html(f"""
+    <script>
+    const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+    window.parent.document.cookie = "{SESSION_COOKIE}={token}; Max-Age={max_age}; Path=/; SameSite=Strict" + secure;
+    </script>
+    """, height=0)
+
+
+def restore_session():
+    """Resume a login from the session cookie after a page refresh"""
+    # Older links carried the token in the URL; never accept or keep it there
+    if "session" in st.query_params:
+        del st.query_params["session"]
+    
+    if st.session_state.authenticated:
+        return
+    
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return
+    
+    session = db.resume_session(token)
+    if not session:
+        set_session_cookie(None)
+        return
+    
+    st.session_state.authenticated = True
+    st.session_state.session_token = token
+    st.session_state.user_id = session['user_id']
+    st.session_state.user_profile = session['profile']
+    
+    profile = session['profile']
+    if profile and profile.get('language'):
+        st.session_state.current_language = profile['language']
+    
+    if session['first_visit_today']:
+        db.update_streak(session['user_id'])
+
+
 def show_login_page():
     """Display login/signup page"""
     lang = st.session_state.current_language
@@ -295,6 +383,12 @@ def show_login_page():
                         profile = db.get_user_profile(user_id)
                         st.session_state.user_profile = profile
                         
+                        # Keep the session token in a cookie so a refresh can resume
+                        token = db.create_session(user_id, profile)
+                        if token:
+                            st.session_state.session_token = token
+                            set_session_cookie(token)
+                        
                         if profile and profile.get('language'):
                             st.session_state.current_language = profile['language']
                         
@@ -413,6 +507,14 @@ def show_ai_teacher_page():
     class_num = get_profile_field(profile, 'class_number')
     subjects = profile.get('subjects', [])
     
+    if class_num and subjects:
+        jobs = get_ingestion_jobs().jobs_for(agent, int(class_num), subjects)
+        if any(not job.finished for job in jobs):
+            show_ingestion_progress(int(class_num), subjects)
+        for job in jobs:
+            if job.status == FAILED:
+                st.warning(f"Could not load {job.subject} textbook: {job.message}")
+    
     # Learning Summary
     col1, col2, col3, col4 = st.columns(4)
     summary = agent.get_learning_summary()
@@ -444,20 +546,24 @@ def show_ai_teacher_page():
             st.error("Please enter a topic!")
         else:
             with st.spinner("🧠 Creating your personalized lesson..."):
-                result = agent.create_micro_lesson(
+                result = agent.stream_micro_lesson(
                     topic=topic_input,
                     student_class=int(class_num),
                     subject=selected_subject,
                     language=lang,
                     local_context=local_context
                 )
-                
-                if result['success']:
-                    st.session_state.current_lesson = result
-                    st.success("✅ Lesson created!")
-                    st.rerun()
-                else:
-                    st.error(f"Error: {result.get('error', 'Unknown error')}")
+            
+            # The lesson appears as it is written; the result is complete once the stream ends
+            if result['success']:
+                st.write_stream(result.pop('stream'))
+            
+            if result['success']:
+                st.session_state.current_lesson = result
+                st.success("✅ Lesson created!")
+                st.rerun()
+            else:
+                st.error(f"Error: {result.get('error', 'Unknown error')}")
     
     # Display current lesson
     if st.session_state.current_lesson:
@@ -493,27 +599,23 @@ def show_ai_teacher_page():
             if st.button("🤔 Get Explanation", use_container_width=True):
                 if student_question:
                     with st.spinner("Thinking..."):
-                        result = agent.explain_adaptively(
+                        result = agent.stream_explanation(
                             concept=lesson['topic'],
                             student_question=student_question,
                             class_num=int(class_num),
                             subject=selected_subject,
                             language=lang
                         )
-                        
-                        if result['success']:
-                            explanation_text = result['explanation'].replace('\n', '<br>')
-                            st.markdown(f"""
-                            <div class='metric-card'>
-                                <h4 style='color: {accent};'>Teacher's Explanation:</h4>
-                                <p style='color: {txt_color}; line-height: 1.8;'>
-                                    {explanation_text}
-                                </p>
-                                <p style='opacity: 0.7; margin-top: 1rem;'>
-                                    Your comprehension level: {result.get('comprehension_level', 5)}/10
-                                </p>
-                            </div>
-                            """, unsafe_allow_html=True)
+                    
+                    if result['success']:
+                        st.markdown(f"<h4 style='color: {accent};'>Teacher's Explanation:</h4>",
+                                    unsafe_allow_html=True)
+                        st.write_stream(result.pop('stream'))
+                    
+                    if result['success']:
+                        st.caption(f"Your comprehension level: {result.get('comprehension_level', 5)}/10")
+                    else:
+                        st.error(f"Error: {result.get('error', 'Unknown error')}")
                 else:
                     st.warning("Please enter a question!")
         
@@ -689,42 +791,40 @@ def show_doubt_ai_page(lang=None, theme=None):
             with st.chat_message("assistant"):
                 with st.spinner("🤔 Thinking and translating..."):
                     # Get explanation from agent
-                    result = agent.explain_adaptively(
+                    result = agent.stream_explanation(
                         concept="Student Question",
                         student_question=user_question,
                         class_num=class_num,
                         subject=selected_subject,
                         language=lang  # Pass the language for translation
                     )
+                
+                # Display the (translated) response as it arrives
+                if result["success"]:
+                    st.write_stream(result.pop("stream"))
+                
+                if result["success"]:
+                    response_text = result['explanation']
                     
-                    if result["success"]:
-                        # Get the translated response
-                        response_text = result['explanation']
-                        
-                        # Display response
-                        st.write(response_text)
-                        
-                        # Show language info
-                        if lang.lower() != "english":
-                            st.caption(f"🌍 Translated to: {lang}")
-                        
-                        # Add to message history
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": response_text,
-                            "language": lang
-                        })
-                        
-                        # Award XP
-                        try:
-                            db.add_xp(st.session_state.user_id, 10)
-                        except:
-                            pass
-                    else:
-                        error_msg = f"Error: {result.get('error', 'Unknown error')}"
-                        st.error(error_msg)
-            
-            st.rerun()
+                    # Show language info
+                    if lang.lower() != "english":
+                        st.caption(f"🌍 Translated to: {lang}")
+                    
+                    # Add to message history (already shown, so no rerun is needed)
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": response_text,
+                        "language": lang
+                    })
+                    
+                    # Award XP
+                    try:
+                        db.add_xp(st.session_state.user_id, 10)
+                    except:
+                        pass
+                else:
+                    error_msg = f"Error: {result.get('error', 'Unknown error')}"
+                    st.error(error_msg)
     
     with col2:
         # Show subjects in sidebar
@@ -1045,6 +1145,10 @@ def show_main_app():
         st.markdown("---")
         
         if st.button(get_text('logout', lang), use_container_width=True):
+            if st.session_state.session_token:
+                db.revoke_session(st.session_state.session_token)
+                st.session_state.session_token = None
+            set_session_cookie(None)
             st.session_state.authenticated = False
             st.session_state.user_id = None
             st.session_state.user_profile = None
@@ -1195,6 +1299,9 @@ def show_main_app():
 
 def main():
     """Main application flow"""
+    restore_session()
+    write_session_cookie()
+    
     if not st.session_state.authenticated:
         show_login_page()
     else:
@@ -6,188 +6,14 @@ Add this as a separate file in your project
 
 import streamlit as st
 import json
+import uuid
 from datetime import datetime
 import plotly.graph_objects as go
 
-# Test Questions Bank (Persistent - Won't change on login)
-TEST_QUESTIONS_BANK = {
-    "Mathematics": {
-        "Level 1": [
-            {
-                "id": "math_l1_q1",
-                "question_en": "What is 15 + 27?",
-                "question_hi": "15 + 27 क्या है?",
-                "question_kn": "15 + 27 ಎಷ್ಟು?",
-                "question_te": "15 + 27 ఎంత?",
-                "question_mr": "15 + 27 किती आहे?",
-                "options": ["42", "52", "32", "62"],
-                "correct": 0,
-                "marks": 5
-            },
-            {
-                "id": "math_l1_q2",
-                "question_en": "What is 8 × 7?",
-                "question_hi": "8 × 7 क्या है?",
-                "question_kn": "8 × 7 ಎಷ್ಟು?",
-                "question_te": "8 × 7 ఎంత?",
-                "question_mr": "8 × 7 किती आहे?",
-                "options": ["54", "56", "64", "48"],
-                "correct": 1,
-                "marks": 5
-            },
-            {
-                "id": "math_l1_q3",
-                "question_en": "What is the value of 100 - 37?",
-                "question_hi": "100 - 37 का मान क्या है?",
-                "question_kn": "100 - 37 ರ ಮೌಲ್ಯ ಎಷ್ಟು?",
-                "question_te": "100 - 37 విలువ ఎంత?",
-                "question_mr": "100 - 37 चे मूल्य काय आहे?",
-                "options": ["73", "63", "53", "67"],
-                "correct": 1,
-                "marks": 5
-            }
-        ],
-        "Level 2": [
-            {
-                "id": "math_l2_q1",
-                "question_en": "Solve: 2x + 5 = 15. Find x.",
-                "question_hi": "हल करें: 2x + 5 = 15। x का मान ज्ञात करें।",
-                "question_kn": "ಪರಿಹರಿಸಿ: 2x + 5 = 15. x ಅನ್ನು ಕಂಡುಹಿಡಿಯಿರಿ.",
-                "question_te": "పరిష్కరించండి: 2x + 5 = 15. x కనుగొనండి.",
-                "question_mr": "सोडवा: 2x + 5 = 15. x शोधा.",
-                "options": ["5", "10", "7", "8"],
-                "correct": 0,
-                "marks": 10
-            },
-            {
-                "id": "math_l2_q2",
-                "question_en": "What is the area of a rectangle with length 12 cm and width 8 cm?",
-                "question_hi": "12 सेमी लंबाई और 8 सेमी चौड़ाई वाले आयत का क्षेत्रफल क्या है?",
-                "question_kn": "12 ಸೆಂ.ಮೀ ಉದ್ದ ಮತ್ತು 8 ಸೆಂ.ಮೀ ಅಗಲದ ಆಯತದ ವಿಸ್ತೀರ್ಣ ಎಷ್ಟು?",
-                "question_te": "12 సెం.మీ పొడవు మరియు 8 సెం.మీ వెడల్పు ఉన్న దీర్ఘచతురస్రం వైశాల్యం ఎంత?",
-                "question_mr": "12 सेमी लांबी आणि 8 सेमी रुंदी असलेल्या आयताचे क्षेत्रफळ काय आहे?",
-                "options": ["96 cm²", "20 cm²", "40 cm²", "106 cm²"],
-                "correct": 0,
-                "marks": 10
-            }
-        ],
-        "Level 3": [
-            {
-                "id": "math_l3_q1",
-                "question_en": "If a² + b² = 13 and ab = 6, find (a + b)²",
-                "question_hi": "यदि a² + b² = 13 और ab = 6 है, तो (a + b)² का मान ज्ञात करें",
-                "question_kn": "a² + b² = 13 ಮತ್ತು ab = 6 ಆಗಿದ್ದರೆ, (a + b)² ಕಂಡುಹಿಡಿಯಿರಿ",
-                "question_te": "a² + b² = 13 మరియు ab = 6 అయితే, (a + b)² కనుగొనండి",
-                "question_mr": "जर a² + b² = 13 आणि ab = 6 असेल तर (a + b)² शोधा",
-                "options": ["25", "19", "21", "23"],
-                "correct": 0,
-                "marks": 15
-            }
-        ]
-    },
-    "Science": {
-        "Level 1": [
-            {
-                "id": "sci_l1_q1",
-                "question_en": "What is the process by which plants make their food?",
-                "question_hi": "पौधे अपना भोजन किस प्रक्रिया द्वारा बनाते हैं?",
-                "question_kn": "ಸಸ್ಯಗಳು ತಮ್ಮ ಆಹಾರವನ್ನು ತಯಾರಿಸುವ ಪ್ರಕ್ರಿಯೆ ಯಾವುದು?",
-                "question_te": "మొక్కలు తమ ఆహారాన్ని తయారు చేసే ప్రక్రియ ఏమిటి?",
-                "question_mr": "वनस्पती त्यांचे अन्न कोणत्या प्रक्रियेद्वारे तयार करतात?",
-                "options": ["Photosynthesis", "Respiration", "Digestion", "Absorption"],
-                "correct": 0,
-                "marks": 5
-            },
-            {
-                "id": "sci_l1_q2",
-                "question_en": "Which organ pumps blood throughout the body?",
-                "question_hi": "कौन सा अंग पूरे शरीर में रक्त पंप करता है?",
-                "question_kn": "ಯಾವ ಅಂಗವು ದೇಹದಾದ್ಯಂತ ರಕ್ತವನ್ನು ಪಂಪ್ ಮಾಡುತ್ತದೆ?",
-                "question_te": "శరీరం అంతటా రక్తాన్ని పంప్ చేసే అవయవం ఏది?",
-                "question_mr": "कोणता अवयव संपूर्ण शरीरात रक्त पंप करतो?",
-                "options": ["Lungs", "Heart", "Liver", "Brain"],
-                "correct": 1,
-                "marks": 5
-            }
-        ],
-        "Level 2": [
-            {
-                "id": "sci_l2_q1",
-                "question_en": "What is the chemical formula for water?",
-                "question_hi": "पानी का रासायनिक सूत्र क्या है?",
-                "question_kn": "ನೀರಿನ ರಾಸಾಯನಿಕ ಸೂತ್ರ ಏನು?",
-                "question_te": "నీటి రసాయన సూత్రం ఏమిటి?",
-                "question_mr": "पाण्याचे रासायनिक सूत्र काय आहे?",
-                "options": ["H₂O", "CO₂", "O₂", "NaCl"],
-                "correct": 0,
-                "marks": 10
-            }
-        ],
-        "Level 3": [
-            {
-                "id": "sci_l3_q1",
-                "question_en": "What is the powerhouse of the cell?",
-                "question_hi": "कोशिका का पावरहाउस क्या है?",
-                "question_kn": "ಜೀವಕೋಶದ ಶಕ್ತಿಗೃಹ ಯಾವುದು?",
-                "question_te": "కణం యొక్క శక్తి గృహం ఏమిటి?",
-                "question_mr": "पेशीचे पॉवरहाऊस काय आहे?",
-                "options": ["Nucleus", "Mitochondria", "Ribosome", "Chloroplast"],
-                "correct": 1,
-                "marks": 15
-            }
-        ]
-    },
-    "English": {
-        "Level 1": [
-            {
-                "id": "eng_l1_q1",
-                "question_en": "What is the plural of 'child'?",
-                "question_hi": "'child' का बहुवचन क्या है?",
-                "question_kn": "'child' ನ ಬಹುವಚನ ಏನು?",
-                "question_te": "'child' యొక్క బహువచనం ఏమిటి?",
-                "question_mr": "'child' चे अनेकवचन काय आहे?",
-                "options": ["Childs", "Children", "Childrens", "Child"],
-                "correct": 1,
-                "marks": 5
-            }
-        ],
-        "Level 2": [
-            {
-                "id": "eng_l2_q1",
-                "question_en": "Identify the verb in: 'She runs quickly'",
-                "question_hi": "क्रिया पहचानें: 'She runs quickly'",
-                "question_kn": "ಕ್ರಿಯಾಪದ ಗುರುತಿಸಿ: 'She runs quickly'",
-                "question_te": "క్రియను గుర్తించండి: 'She runs quickly'",
-                "question_mr": "क्रियापद ओळखा: 'She runs quickly'",
-                "options": ["She", "runs", "quickly", "None"],
-                "correct": 1,
-                "marks": 10
-            }
-        ],
-        "Level 3": [
-            {
-                "id": "eng_l3_q1",
-                "question_en": "What type of sentence is: 'What a beautiful day!'",
-                "question_hi": "यह किस प्रकार का वाक्य है: 'What a beautiful day!'",
-                "question_kn": "ಈ ಯಾವ ರೀತಿಯ ವಾಕ್ಯ: 'What a beautiful day!'",
-                "question_te": "ఇది ఏ రకమైన వాక్యం: 'What a beautiful day!'",
-                "question_mr": "हे कोणत्या प्रकारचे वाक्य आहे: 'What a beautiful day!'",
-                "options": ["Interrogative", "Imperative", "Exclamatory", "Declarative"],
-                "correct": 2,
-                "marks": 15
-            }
-        ]
-    }
-}
+from question_bank import get_question_bank, LANGUAGE_CODES
 
-# Language mapping
-LANGUAGE_CODES = {
-    "English": "en",
-    "Hindi": "hi",
-    "Kannada": "kn",
-    "Telugu": "te",
-    "Marathi": "mr"
-}
+# Questions per test, sampled from the question bank
+QUESTIONS_PER_TEST = 10
 
 
 def get_question_text(question, language):
@@ -197,6 +23,64 @@ def get_question_text(question, language):
     return question.get(question_key, question.get("question_en"))
 
 
+def get_test_questions(subject, level, language):
+    """
+    Questions for a new test, sampled once per subject/level/language
+    so reruns keep showing the same test details
+    """
+    key = (subject, level, language)
+    preview = st.session_state.get('test_preview')
+    if not preview or preview['key'] != key:
+        questions = get_question_bank().sample(subject, level, k=QUESTIONS_PER_TEST, language=language)
+        preview = {'key': key, 'questions': questions}
+        st.session_state.test_preview = preview
+    return preview['questions']
+
+
+def start_attempt(db, user_id, test):
+    """Give a test a fresh attempt ID and record it as in progress"""
+    test['attempt_id'] = new_attempt_id()
+    db.start_test_attempt(
+        attempt_id=test['attempt_id'],
+        user_id=user_id,
+        subject=test['subject'],
+        level=test['level'],
+        language=test['language'],
+        question_ids=[q['id'] for q in test['questions']]
+    )
+    st.session_state.autosaved_answers = {}
+
+
+def new_attempt_id():
+    """Unique ID for one attempt at a test"""
+    return uuid.uuid4().hex
+
+
+def grade_test(questions, answers):
+    """Score answers against the questions of a test"""
+    total_marks = 0
+    obtained_marks = 0
+    correct_count = 0
+    
+    for question in questions:
+        total_marks += question['marks']
+        user_answer = answers.get(question['id'])
+        if user_answer == question['correct']:
+            obtained_marks += question['marks']
+            correct_count += 1
+    
+    percentage = (obtained_marks / total_marks * 100) if total_marks > 0 else 0
+    
+    return {
+        'total_marks': total_marks,
+        'obtained_marks': obtained_marks,
+        'percentage': percentage,
+        'correct_answers': correct_count,
+        'total_questions': len(questions),
+        'answers': answers
+    }
+
+
 def show_enhanced_tests_page(lang, theme, db, user_id):
     """Enhanced Tests page with database storage"""
     accent_color = theme['accent']
@@ -216,11 +100,48 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
         st.session_state.test_answers = {}
     if 'test_submitted' not in st.session_state:
         st.session_state.test_submitted = False
+    if 'autosaved_answers' not in st.session_state:
+        st.session_state.autosaved_answers = {}
+    if 'resumable_attempt' not in st.session_state:
+        # Checked once per session, e.g. after a dropped connection
+        st.session_state.resumable_attempt = db.get_active_attempt(user_id)
     
     tab1, tab2, tab3 = st.tabs(["📝 Take Test", "✅ My Results", "📊 Performance"])
     
     with tab1:
         if st.session_state.current_test is None:
+            # Offer to resume an unfinished attempt
+            attempt = st.session_state.resumable_attempt
+            if attempt:
+                st.info(f"📝 You have an unfinished {attempt['subject']} - {attempt['level']} test "
+                        f"({len(attempt['answers'])}/{len(attempt['question_ids'])} answered).")
+                
+                resume_col, discard_col = st.columns(2)
+                with resume_col:
+                    if st.button("▶️ Resume Test", use_container_width=True, type="primary"):
+                        st.session_state.current_test = {
+                            'subject': attempt['subject'],
+                            'level': attempt['level'],
+                            'language': attempt['language'] or "English",
+                            'questions': get_question_bank().get_questions(
+                                attempt['question_ids'], attempt['language'] or "English"
+                            ),
+                            'start_time': attempt['started_at'],
+                            'attempt_id': attempt['attempt_id']
+                        }
+                        st.session_state.test_answers = dict(attempt['answers'])
+                        st.session_state.autosaved_answers = dict(attempt['answers'])
+                        st.session_state.test_submitted = False
+                        st.session_state.resumable_attempt = None
+                        st.rerun()
+                with discard_col:
+                    if st.button("🗑 Discard", use_container_width=True):
+                        db.finish_test_attempt(attempt['attempt_id'])
+                        st.session_state.resumable_attempt = None
+                        st.rerun()
+                
+                st.markdown("---")
+            
             # Test Selection Interface
             st.subheader("Choose Your Test")
             
@@ -229,7 +150,7 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
             with col1:
                 selected_subject = st.selectbox(
                     "Subject",
-                    list(TEST_QUESTIONS_BANK.keys()),
+                    get_question_bank().subjects(),
                     key="test_subject"
                 )
             
@@ -249,8 +170,8 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                 )
             
             # Show test info
-            if selected_subject in TEST_QUESTIONS_BANK and selected_level in TEST_QUESTIONS_BANK[selected_subject]:
-                questions = TEST_QUESTIONS_BANK[selected_subject][selected_level]
+            questions = get_test_questions(selected_subject, selected_level, test_language) if selected_subject else []
+            if questions:
                 total_marks = sum(q['marks'] for q in questions)
                 
                 st.markdown(f"""
@@ -275,6 +196,8 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                         'questions': questions,
                         'start_time': datetime.now().isoformat()
                     }
+                    start_attempt(db, user_id, st.session_state.current_test)
+                    st.session_state.test_preview = None
                     st.session_state.test_answers = {}
                     st.session_state.test_submitted = False
                     st.rerun()
@@ -304,7 +227,7 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                         "Select your answer:",
                         question['options'],
                         key=f"q_{question['id']}",
-                        index=None
+                        index=st.session_state.test_answers.get(question['id'])
                     )
                     
                     if answer:
@@ -312,6 +235,11 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                     
                     st.markdown("---")
                 
+                # Autosave changed answers (buffered and written in batches)
+                if st.session_state.test_answers != st.session_state.autosaved_answers:
+                    db.queue_attempt_answers(test['attempt_id'], st.session_state.test_answers)
+                    st.session_state.autosaved_answers = dict(st.session_state.test_answers)
+                
                 # Submit button
                 col1, col2 = st.columns([1, 3])
                 with col1:
@@ -319,50 +247,49 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                         if len(st.session_state.test_answers) < len(test['questions']):
                             st.warning(f"⚠️ Please answer all questions! ({len(st.session_state.test_answers)}/{len(test['questions'])} answered)")
                         else:
-                            st.session_state.test_submitted = True
-                            st.rerun()
+                            # Save once, keyed by the attempt ID
+                            graded = grade_test(test['questions'], st.session_state.test_answers)
+                            saved = db.save_test_result(
+                                user_id=user_id,
+                                subject=test['subject'],
+                                level=test['level'],
+                                total_marks=graded['total_marks'],
+                                obtained_marks=graded['obtained_marks'],
+                                percentage=graded['percentage'],
+                                correct_answers=graded['correct_answers'],
+                                total_questions=graded['total_questions'],
+                                answers=json.dumps(graded['answers']),
+                                attempt_id=test['attempt_id']
+                            )
+                            if saved:
+                                db.finish_test_attempt(test['attempt_id'])
+                                st.session_state.test_submitted = True
+                                st.rerun()
+                            else:
+                                st.error("Error saving results. Please try submitting again.")
                 
                 with col2:
                     if st.button("❌ Cancel Test", use_container_width=True):
+                        db.finish_test_attempt(test['attempt_id'])
                         st.session_state.current_test = None
                         st.session_state.test_answers = {}
                         st.rerun()
             
             else:
-                # Show Results
+                # Show Results from the saved attempt (reruns never rewrite it)
                 test = st.session_state.current_test
                 questions = test['questions']
-                answers = st.session_state.test_answers
-                
-                # Calculate score
-                total_marks = 0
-                obtained_marks = 0
-                correct_count = 0
                 
-                for question in questions:
-                    total_marks += question['marks']
-                    user_answer = answers.get(question['id'])
-                    if user_answer == question['correct']:
-                        obtained_marks += question['marks']
-                        correct_count += 1
+                result = db.get_test_result(test['attempt_id'])
+                if result is None:
+                    st.error("Could not load saved results for this attempt.")
+                    result = grade_test(questions, st.session_state.test_answers)
                 
-                percentage = (obtained_marks / total_marks * 100) if total_marks > 0 else 0
-                
-                # Save to database
-                try:
-                    db.save_test_result(
-                        user_id=user_id,
-                        subject=test['subject'],
-                        level=test['level'],
-                        total_marks=total_marks,
-                        obtained_marks=obtained_marks,
-                        percentage=percentage,
-                        correct_answers=correct_count,
-                        total_questions=len(questions),
-                        answers=json.dumps(answers)
-                    )
-                except Exception as e:
-                    st.error(f"Error saving results: {str(e)}")
+                answers = result['answers']
+                total_marks = result['total_marks']
+                obtained_marks = result['obtained_marks']
+                correct_count = result['correct_answers']
+                percentage = result['percentage']
                 
                 # Display results
                 result_color = "#22c55e" if percentage >= 60 else ("#f59e0b" if percentage >= 40 else "#ef4444")
@@ -422,6 +349,7 @@ def show_enhanced_tests_page(lang, theme, db, user_id):
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button("🔄 Retake Test", use_container_width=True):
+                        start_attempt(db, user_id, st.session_state.current_test)
                         st.session_state.test_answers = {}
                         st.session_state.test_submitted = False
                         st.rerun()
@@ -0,0 +1,61 @@
+# conftest.py
+"""
+Shared fixtures: a TeachingAgent on the NumPy store with a small hashed
+bag-of-words embedding model, so ingestion and search run without
+downloading a model or calling Groq.
+"""
+
+import sys
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from embeddings import EmbeddingBackend
+from teaching_agent import TeachingAgent
+
+
+class _HashedWordsModel:
+    """Bag of hashed words, L2-normalized"""
+
+    dim = 64
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class HashedWordsBackend(EmbeddingBackend):
+    def _load_model(self):
+        self._model = _HashedWordsModel()
+        return self._model
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    """Build agents sharing one temporary textbook folder and store"""
+    (tmp_path / "TextBooks").mkdir()
+
+    def make(**kwargs):
+        kwargs.setdefault("embedding_backend", HashedWordsBackend(cache_path=str(tmp_path / "embeddings.db")))
+        kwargs.setdefault("vector_backend", "numpy")
+        return TeachingAgent(groq_api_key="", textbook_path=str(tmp_path / "TextBooks"),
+                             vector_store_path=str(tmp_path / "vector_store"), text_cache_path=None, **kwargs)
+
+    return make
+
+
+def write_pdf(agent: TeachingAgent, class_num: int, subject: str, name: str, content: str = "v1") -> Path:
+    """A placeholder PDF file (tests pass its chunks directly)"""
+    folder = Path(agent.textbook_path) / f"Class {class_num} {subject}"
+    folder.mkdir(parents=True, exist_ok=True)
+    pdf_file = folder / f"{name}.pdf"
+    pdf_file.write_text(content)
+    return pdf_file
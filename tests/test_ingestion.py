@@ -0,0 +1,62 @@
+# test_ingestion.py
+"""Ingestion into partitions, the cleanup of previous versions and the store write lock"""
+
+import sys
+import subprocess
+from pathlib import Path
+
+from conftest import write_pdf
+from teaching_agent import partition_name
+
+
+def _chunks(words: str, count: int):
+    return [{"text": f"{words} passage {i}", "page_start": i + 1, "page_end": i + 1} for i in range(count)]
+
+
+def test_pdf_moved_to_another_language_leaves_no_old_chunks(make_agent):
+    agent = make_agent()
+    pdf_file = write_pdf(agent, 6, "Science", "magnets")
+    agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, _chunks("magnets attract iron", 15))
+    english = agent.get_collection(6, "Science", "English")
+    assert english.count() == 15
+
+    entry = agent.manifest.entries_for(6, "Science")[str(pdf_file.resolve())]
+    assert agent.manifest.check(pdf_file, entry, "Hindi") is not None
+    agent.ingest_pdf_chunks(6, "Science", "Hindi", pdf_file, _chunks("चुंबक लोहे को खींचता है", 15), entry=entry)
+
+    assert agent.get_collection(6, "Science", "Hindi").count() == 15
+    assert english.count() == 0
+    english_name = partition_name(6, "Science", "English", agent.collection_suffix)
+    assert agent.lexical_index.search(english_name, "magnets attract", 5) == []
+    assert agent.manifest.entries_for(6, "Science")[str(pdf_file.resolve())]["language"] == "Hindi"
+
+
+def test_shorter_new_version_drops_only_leftover_chunks(make_agent):
+    agent = make_agent()
+    pdf_file = write_pdf(agent, 6, "Science", "magnets")
+    agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, _chunks("magnets attract iron", 5))
+    entry = agent.manifest.entries_for(6, "Science")[str(pdf_file.resolve())]
+
+    pdf_file.write_text("v2")
+    agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, _chunks("magnets repel magnets", 3), entry=entry)
+
+    collection = agent.get_collection(6, "Science", "English")
+    assert collection.count() == 3
+    result = collection.get(ids=[f"6_Science_magnets_chunk_{i}" for i in range(5)], include=["documents"])
+    assert sorted(result["ids"]) == [f"6_Science_magnets_chunk_{i}" for i in range(3)]
+    assert all("repel" in text for text in result["documents"])
+
+
+def test_write_lock_excludes_other_processes(make_agent):
+    agent = make_agent()
+    probe = ("import sys; sys.path.insert(0, sys.argv[1]); from ingestion_manifest import lock_file; "
+             "print(lock_file(sys.argv[2], blocking=False) is not None)")
+    lock = agent.manifest.write_lock()
+    args = [sys.executable, "-c", probe, str(Path(__file__).resolve().parent.parent), lock.path]
+
+    with lock:
+        # Re-entrant within the process: ingestion inside a held lock does not deadlock
+        pdf_file = write_pdf(agent, 6, "Science", "magnets")
+        agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, _chunks("magnets attract iron", 2))
+        assert subprocess.run(args, capture_output=True, text=True).stdout.strip() == "False"
+    assert subprocess.run(args, capture_output=True, text=True).stdout.strip() == "True"
@@ -0,0 +1,43 @@
+# test_numpy_vector_store.py
+"""Compact vector storage with and without the float32 re-scoring copy"""
+
+import numpy as np
+import pytest
+
+from conftest import HashedWordsBackend
+from numpy_vector_store import NumpyCollection
+
+TEXTS = [f"chapter {i} about {topic} and {other}" for i, (topic, other) in enumerate(
+    (topic, other) for topic in ("magnets", "plants", "fractions", "light", "water", "soil")
+    for other in ("iron", "leaves", "numbers", "shadows", "rain", "roots"))]
+
+
+def _collection(tmp_path, dtype, rescore, name="c"):
+    embed = HashedWordsBackend(cache_path=None)
+    collection = NumpyCollection(str(tmp_path / name), embed, dtype, rescore)
+    collection.upsert([f"id{i}" for i in range(len(TEXTS))], TEXTS, [{"i": i} for i in range(len(TEXTS))])
+    return collection
+
+
+@pytest.mark.parametrize("dtype,ratio", [("float16", 2), ("int8", 4)])
+def test_without_rescoring_the_files_shrink(tmp_path, dtype, ratio):
+    full = _collection(tmp_path, "float32", True, "full").disk_bytes()
+    with_copy = _collection(tmp_path, dtype, True, "copy").disk_bytes()
+    compact = _collection(tmp_path, dtype, False, "compact")
+    assert with_copy > full
+    # Matrix plus .npy headers (and int8 scales)
+    assert compact.disk_bytes() < full / ratio * 1.5
+    assert compact.query(query_texts=["magnets iron"], n_results=1)["ids"][0] == ["id0"]
+
+
+def test_writes_without_a_float32_copy_keep_the_vectors(tmp_path):
+    collection = _collection(tmp_path, "int8", False)
+    before = collection._load().float_rows(slice(0, len(TEXTS)))
+    collection.delete(["id1"])
+    collection.upsert(["new"], ["new chapter about magnets"], [{"i": -1}])
+    snapshot = collection._load()
+    assert collection.count() == len(TEXTS)
+    assert snapshot.full is None
+    after = snapshot.float_rows(np.array([snapshot.positions["id0"], snapshot.positions["id2"]]))
+    # Re-quantizing dequantized int8 vectors is stable
+    assert np.allclose(after, before[[0, 2]], atol=1e-6)
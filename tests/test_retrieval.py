@@ -0,0 +1,97 @@
+# test_retrieval.py
+"""Passage retrieval and what lessons cache while textbooks load"""
+
+import teaching_agent
+from conftest import write_pdf
+from teaching_agent import GENERAL_KNOWLEDGE, TEXTBOOK_LOADING
+
+
+def _ingest(agent, texts, name="magnets"):
+    pdf_file = write_pdf(agent, 6, "Science", name)
+    chunks = [{"text": text, "page_start": i + 1, "page_end": i + 1} for i, text in enumerate(texts)]
+    agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, chunks)
+
+
+def test_textbook_loading_only_while_first_ingestion_runs(make_agent, monkeypatch):
+    agent = make_agent()
+    assert agent._retrieve_content("magnets", 6, "Science", "English") == GENERAL_KNOWLEDGE
+
+    _ingest(agent, ["Magnets attract iron and nickel.", "Like poles repel each other."])
+    partition = agent._partition_key(6, "Science", "English")
+    monkeypatch.setitem(teaching_agent._ingesting_partitions, partition, True)
+    assert agent._retrieve_content("magnets", 6, "Science", "English") == TEXTBOOK_LOADING
+
+    monkeypatch.delitem(teaching_agent._ingesting_partitions, partition)
+    assert "Magnets attract iron" in agent._retrieve_content("magnets attract iron", 6, "Science", "English")
+
+
+def test_lessons_from_general_knowledge_are_cached_but_not_while_loading(make_agent):
+    agent = make_agent()
+    agent._finish_lesson("Magnets", "lesson", GENERAL_KNOWLEDGE, "lesson_a")
+    agent._finish_lesson("Magnets", "lesson", TEXTBOOK_LOADING, "lesson_b")
+    assert agent._cache_get("lesson_a") is not None
+    assert agent._cache_get("lesson_b") is None
+
+
+class _RecordingCollection:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        return {"ids": [[]], "documents": [[]], "distances": [[]]}
+
+
+class _RecordingChromaClient:
+    """Stands in for chromadb.PersistentClient, recording the collection kwargs"""
+
+    def __init__(self):
+        self.calls = []
+        self.collections = {}
+
+    def get_or_create_collection(self, name, **kwargs):
+        self.calls.append(kwargs)
+        return self.collections.setdefault(name, _RecordingCollection())
+
+    def get_collection(self, name, **kwargs):
+        self.calls.append(kwargs)
+        if name not in self.collections:
+            raise ValueError(f"Collection {name} does not exist")
+        return self.collections[name]
+
+
+def test_chroma_embeds_with_its_default_without_a_local_backend(tmp_path, monkeypatch):
+    client = _RecordingChromaClient()
+    monkeypatch.setattr(teaching_agent, "get_chroma_client", lambda path: client)
+    monkeypatch.setattr(teaching_agent, "get_embedding_backend", lambda: None)
+    agent = teaching_agent.TeachingAgent(groq_api_key="", textbook_path=str(tmp_path / "TextBooks"),
+                                         vector_store_path=str(tmp_path / "vector_store"),
+                                         text_cache_path=None, vector_backend="chroma")
+
+    collection = agent.get_collection(6, "Science", "English", create=True)
+    assert client.calls and all("embedding_function" not in kwargs for kwargs in client.calls)
+
+    agent._vector_query(collection, "why do magnets attract iron", 2)
+    assert collection.queries == [{"query_texts": ["why do magnets attract iron"], "n_results": 2}]
+
+
+def test_topic_shortcut_only_for_lessons_and_ranked_by_query(make_agent, monkeypatch):
+    agent = make_agent()
+    pdf_file = write_pdf(agent, 6, "Science", "magnets")
+    texts = ["Chapter opener: toys we play with at the fair.",
+             "Magnets attract objects made of iron, like pins and nails.",
+             "A compass needle always points north and south."]
+    chunks = [{"text": text, "page_start": i + 1, "page_end": i + 1} for i, text in enumerate(texts)]
+    topics = [{"topic": "Fun with Magnets", "page_start": 1, "page_end": 3, "source": "title"}]
+    agent.ingest_pdf_chunks(6, "Science", "English", pdf_file, chunks, topics=topics)
+
+    # The chapter's chunk that matches the query, not simply its first one
+    hits = agent.search_passages("magnets", 6, "Science", "English", n_results=1, by_topic=True)
+    assert [hit["id"] for hit in hits] == ["6_Science_magnets_chunk_1"]
+
+    looked_up = []
+    monkeypatch.setattr(agent, "_topic_passages", lambda *args: looked_up.append(args) or [])
+    agent.search_passages("fun with magnets", 6, "Science", "English")
+    assert looked_up == []
+    agent.search_passages("fun with magnets", 6, "Science", "English", by_topic=True)
+    assert len(looked_up) == 1
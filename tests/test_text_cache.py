@@ -0,0 +1,28 @@
+# test_text_cache.py
+"""Reading cached pages while other processes write the cache"""
+
+import sqlite3
+import types
+import zlib
+
+import text_cache
+from text_cache import TextCache
+
+EXTRACTOR = types.SimpleNamespace(name="test", version="1")
+
+
+def test_writers_are_not_locked_out_while_pages_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_cache, "PAGES_PER_READ", 8)
+    cache = TextCache(str(tmp_path / "text_cache.db"))
+    cache.store("a", EXTRACTOR, [(i, zlib.compress(f"page {i}".encode())) for i in range(1, 21)])
+
+    pages = cache.iter_cached_pages("a", EXTRACTOR)
+    first = next(pages)
+    # Another writer that would give up at once on a locked database
+    writer = TextCache(cache.db_path)
+    writer.get_connection = lambda: sqlite3.connect(writer.db_path, timeout=0)
+    writer.store("b", EXTRACTOR, [(1, zlib.compress(b"other"))])
+
+    pages = [first] + list(pages)
+    assert [page_num for page_num, _ in pages] == list(range(1, 21))
+    assert pages[-1][1] == "page 20"
@@ -0,0 +1,33 @@
+# test_text_chunker.py
+"""Chunk sizes and the overlap between neighbouring chunks"""
+
+from text_chunker import TextChunker, estimate_tokens
+
+
+def _sentences(count: int):
+    # ~15 words (about 26 estimated tokens) each, over the default 24-token overlap
+    return " ".join(f"Sentence {i} explains how the strong magnet attracts small iron filings placed near "
+                    f"both of its poles." for i in range(count))
+
+
+def test_consecutive_chunks_share_text():
+    chunks = list(TextChunker(strip_boilerplate=False).iter_chunks([(1, _sentences(40))]))
+    assert len(chunks) > 2
+    for previous, chunk in zip(chunks, chunks[1:]):
+        previous_words = previous["text"].split()
+        shared = next(n for n in range(len(previous_words), -1, -1)
+                      if chunk["text"].split()[:n] == previous_words[len(previous_words) - n:])
+        assert shared > 0
+        assert estimate_tokens(" ".join(previous_words[len(previous_words) - shared:])) <= 24
+
+
+def test_chunks_stay_within_budget():
+    chunks = list(TextChunker(strip_boilerplate=False).iter_chunks([(1, _sentences(40)), (2, _sentences(5))]))
+    assert all(estimate_tokens(chunk["text"]) <= 128 for chunk in chunks)
+    assert chunks[0]["page_start"] == 1 and chunks[-1]["page_end"] == 2
+
+
+def test_no_overlap_when_disabled():
+    chunks = list(TextChunker(overlap_tokens=0, strip_boilerplate=False).iter_chunks([(1, _sentences(40))]))
+    text = " ".join(chunk["text"] for chunk in chunks)
+    assert text == " ".join(_sentences(40).split())
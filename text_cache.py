@@ -0,0 +1,161 @@
+# text_cache.py
+"""
+Extracted Text Cache for Shiksha Mitra
+Stores the page text of every parsed PDF, zlib-compressed in SQLite, keyed
+by the PDF's content hash and the extractor name and version. Re-chunking or
+re-embedding with different settings reads pages from here instead of
+parsing the PDFs again.
+"""
+
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from ingestion_manifest import file_hash
+
+DEFAULT_TEXT_CACHE_PATH = os.getenv("SHIKSHA_TEXT_CACHE", "text_cache.db")
+# Cached pages read per query; no connection stays open while pages are chunked and embedded
+PAGES_PER_READ = 32
+
+
+class TextCache:
+    """Page text of parsed PDFs, keyed by content hash and extractor version"""
+
+    def __init__(self, db_path: str = DEFAULT_TEXT_CACHE_PATH):
+        """Open (or create) the cache"""
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_database()
+
+    def get_connection(self):
+        """Get database connection"""
+        # Extraction workers in other processes may be writing at the same time
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Initialize cache tables"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # One row per fully extracted PDF; pages are only read when it exists
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS extracted_pdfs (
+            content_hash TEXT NOT NULL,
+            extractor TEXT NOT NULL,
+            page_count INTEGER NOT NULL,
+            extracted_at TIMESTAMP,
+            PRIMARY KEY (content_hash, extractor)
+        ) WITHOUT ROWID
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS extracted_pages (
+            content_hash TEXT NOT NULL,
+            extractor TEXT NOT NULL,
+            page_num INTEGER NOT NULL,
+            text BLOB NOT NULL,  -- zlib-compressed UTF-8
+            PRIMARY KEY (content_hash, extractor, page_num)
+        ) WITHOUT ROWID
+        """)
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def extractor_key(extractor) -> str:
+        """Cache key of an extractor: its name and version"""
+        return f"{extractor.name}:{extractor.version}"
+
+    def has(self, content_hash: str, extractor) -> bool:
+        """Whether this PDF has been extracted with this extractor version"""
+        conn = self.get_connection()
+        row = conn.execute(
+            "SELECT 1 FROM extracted_pdfs WHERE content_hash = ? AND extractor = ?",
+            (content_hash, self.extractor_key(extractor))
+        ).fetchone()
+        conn.close()
+        return row is not None
+
+    def iter_cached_pages(self, content_hash: str, extractor) -> Iterator[Tuple[int, str]]:
+        """
+        Yield cached (page_number, text) pairs in page order
+        Pages are read PAGES_PER_READ at a time and the connection is closed
+        before any is yielded, so concurrent store() calls are not locked out
+        while the PDF streams through ingestion.
+        """
+        key = self.extractor_key(extractor)
+        last_page = None
+        while True:
+            conn = self.get_connection()
+            try:
+                rows = conn.execute("""
+                SELECT page_num, text FROM extracted_pages
+                WHERE content_hash = ? AND extractor = ? AND (? IS NULL OR page_num > ?)
+                ORDER BY page_num
+                LIMIT ?
+                """, (content_hash, key, last_page, last_page, PAGES_PER_READ)).fetchall()
+            finally:
+                conn.close()
+
+            for page_num, text in rows:
+                yield page_num, zlib.decompress(text).decode('utf-8')
+            if len(rows) < PAGES_PER_READ:
+                return
+            last_page = rows[-1][0]
+
+    def store(self, content_hash: str, extractor, pages: Iterable[Tuple[int, bytes]]) -> None:
+        """Store compressed pages of a PDF in one short transaction"""
+        key = self.extractor_key(extractor)
+        pages = list(pages)
+        conn = self.get_connection()
+        try:
+            conn.execute("DELETE FROM extracted_pages WHERE content_hash = ? AND extractor = ?",
+                         (content_hash, key))
+            conn.executemany(
+                "INSERT INTO extracted_pages (content_hash, extractor, page_num, text) VALUES (?, ?, ?, ?)",
+                [(content_hash, key, page_num, text) for page_num, text in pages]
+            )
+            conn.execute("""
+            INSERT OR REPLACE INTO extracted_pdfs (content_hash, extractor, page_count, extracted_at)
+            VALUES (?, ?, ?, ?)
+            """, (content_hash, key, len(pages), datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def pages(self, pdf_path: Path, extractor, content_hash: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for a PDF, from the cache when possible
+        On a miss the PDF is parsed page by page and stored once fully read.
+        """
+        content_hash = content_hash or file_hash(pdf_path)
+
+        if self.has(content_hash, extractor):
+            yield from self.iter_cached_pages(content_hash, extractor)
+            return
+
+        compressed = []
+        for page_num, text in extractor.iter_pages(pdf_path):
+            compressed.append((page_num, zlib.compress(text.encode('utf-8'))))
+            yield page_num, text
+
+        self.store(content_hash, extractor, compressed)
+
+    def prune(self, keep_hashes: Iterable[str]) -> int:
+        """Drop cached text of PDFs not in keep_hashes, returns PDFs removed"""
+        keep = set(keep_hashes)
+        conn = self.get_connection()
+        try:
+            stale = [
+                row for row in conn.execute("SELECT content_hash, extractor FROM extracted_pdfs")
+                if row[0] not in keep
+            ]
+            conn.executemany("DELETE FROM extracted_pages WHERE content_hash = ? AND extractor = ?", stale)
+            conn.executemany("DELETE FROM extracted_pdfs WHERE content_hash = ? AND extractor = ?", stale)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(stale)
@@ -0,0 +1,208 @@
+# text_chunker.py
+"""
+Textbook Chunker for Shiksha Mitra
+Splits extracted page text into small, overlapping chunks that end on
+sentence boundaries (including the Devanagari danda), sized in estimated
+tokens rather than words, after removing running headers, footers and page
+numbers. Small chunks let retrieval return the passage that answers a
+question instead of the first few hundred characters of a huge block.
+"""
+
+import math
+import re
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Sentence ends: . ? ! and the Devanagari danda / double danda, followed by space
+SENTENCE_END = re.compile(r"(?<=[.?!।॥])\s+")
+# A bare page number in Arabic/Indic digits
+PAGE_NUMBER = re.compile(r"^[\-–—\s]*\d{1,4}[\-–—\s.]*$")
+# A bare small Roman numeral; also real short lines ("I", "Vi", OCR'd "Ill"), so it
+# only counts as a page number when a neighbouring page has one at the same edge
+ROMAN_PAGE_NUMBER = re.compile(r"^[\-–—\s]*[ivxl]{1,6}[\-–—\s.]*$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough subword token count without loading a tokenizer
+    Latin-script words average ~4 characters per token; Indic-script words
+    are split much more finely by multilingual tokenizers (~2 per token).
+    """
+    tokens = 0
+    for word in text.split():
+        per_token = 4 if word.isascii() else 2
+        tokens += max(1, math.ceil(len(word) / per_token))
+    return tokens
+
+
+def _normalize_line(line: str) -> str:
+    """Key for spotting repeated lines: case and page numbers ignored"""
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def strip_boilerplate(pages: Iterable[Tuple[int, str]], edge_lines: int = 2,
+                      min_repeats: int = 3, lookahead: int = 6) -> Iterator[Tuple[int, str]]:
+    """
+    Remove running headers/footers and bare page numbers from pages
+    A line among the first or last `edge_lines` of a page is boilerplate when
+    the same line (digits ignored) sits at the edge of at least `min_repeats`
+    pages seen so far, including up to `lookahead` pages ahead. A bare Roman
+    numeral is only removed when the previous or next page has one at the same
+    edge too. Only that many pages are buffered, so PDFs still stream.
+    """
+    seen = Counter()
+    buffer = deque()
+    # Edges ("top"/"bottom") of the previously cleaned page that held a Roman numeral
+    previous_roman = set()
+
+    def edges(lines: List[str]) -> set:
+        return {_normalize_line(line) for line in lines[:edge_lines] + lines[-edge_lines:]}
+
+    def roman_edges(lines: List[str]) -> set:
+        found = set()
+        if any(ROMAN_PAGE_NUMBER.match(line) for line in lines[:edge_lines]):
+            found.add("top")
+        if any(ROMAN_PAGE_NUMBER.match(line) for line in lines[-edge_lines:]):
+            found.add("bottom")
+        return found
+
+    def clean(page_num: int, lines: List[str], neighbour_roman: set) -> Tuple[int, str]:
+        kept = []
+        for i, line in enumerate(lines):
+            top = i < edge_lines
+            bottom = i >= len(lines) - edge_lines
+            if top or bottom:
+                if PAGE_NUMBER.match(line) or seen[_normalize_line(line)] >= min_repeats:
+                    continue
+                if ROMAN_PAGE_NUMBER.match(line) and (
+                        (top and "top" in neighbour_roman) or (bottom and "bottom" in neighbour_roman)):
+                    continue
+            kept.append(line)
+        return page_num, "\n".join(kept)
+
+    def next_page() -> Tuple[int, str]:
+        nonlocal previous_roman
+        page_num, lines = buffer.popleft()
+        following = roman_edges(buffer[0][1]) if buffer else set()
+        page = clean(page_num, lines, previous_roman | following)
+        previous_roman = roman_edges(lines)
+        return page
+
+    for page_num, text in pages:
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        seen.update(edges(lines))
+        buffer.append((page_num, lines))
+        if len(buffer) > lookahead:
+            yield next_page()
+
+    while buffer:
+        yield next_page()
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping the end punctuation"""
+    text = " ".join(text.split())
+    return [sentence for sentence in SENTENCE_END.split(text) if sentence]
+
+
+class TextChunker:
+    """Token-sized, overlapping, sentence-aligned chunker"""
+
+    def __init__(self, chunk_tokens: int = 128, overlap_tokens: int = 24, min_chars: int = 80,
+                 strip_boilerplate: bool = True,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        """
+        chunk_tokens: target size of a chunk (~500 English characters at 128)
+        overlap_tokens: trailing sentences repeated at the start of the next chunk
+            (the trailing words of the last one if even that is longer)
+        token_counter: exact counter (e.g. a tokenizer) instead of the estimate
+        """
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chars = min_chars
+        self.strip_boilerplate = strip_boilerplate
+        self.token_counter = token_counter or estimate_tokens
+
+    def _pieces(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        """A sentence with its token count, split on words if it is too long"""
+        tokens = self.token_counter(sentence)
+        if tokens <= self.chunk_tokens:
+            yield sentence, tokens
+            return
+
+        words = []
+        piece_tokens = 0
+        for word in sentence.split():
+            word_tokens = self.token_counter(word)
+            if words and piece_tokens + word_tokens > self.chunk_tokens:
+                yield " ".join(words), piece_tokens
+                words, piece_tokens = [], 0
+            words.append(word)
+            piece_tokens += word_tokens
+        if words:
+            yield " ".join(words), piece_tokens
+
+    def _tail(self, sentence: str, max_tokens: int) -> Tuple[str, int]:
+        """The trailing words of a sentence that fit in max_tokens, with their token count"""
+        words = []
+        tokens = 0
+        for word in reversed(sentence.split()):
+            word_tokens = self.token_counter(word)
+            if tokens + word_tokens > max_tokens:
+                break
+            words.insert(0, word)
+            tokens += word_tokens
+        return " ".join(words), tokens
+
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Dict]:
+        """
+        Chunk (page_number, text) pairs incrementally
+        Each chunk is a dict with its text and the range of pages it came from.
+        """
+        if self.strip_boilerplate:
+            pages = strip_boilerplate(pages)
+
+        # Current chunk as (sentence, tokens, page) entries
+        current = []
+        current_tokens = 0
+        # Tokens at the start of `current` that repeat the previous chunk
+        carried_tokens = 0
+
+        def make_chunk():
+            return {
+                "text": " ".join(sentence for sentence, _, _ in current),
+                "page_start": current[0][2],
+                "page_end": current[-1][2]
+            }
+
+        for page_num, text in pages:
+            for sentence in split_sentences(text):
+                for piece, tokens in self._pieces(sentence):
+                    if current and current_tokens + tokens > self.chunk_tokens:
+                        chunk = make_chunk()
+                        if len(chunk["text"]) >= self.min_chars:
+                            yield chunk
+
+                        # Carry the trailing sentences that fit in the overlap
+                        overlap = []
+                        overlap_tokens = 0
+                        for entry in reversed(current):
+                            if overlap_tokens + entry[1] > self.overlap_tokens:
+                                break
+                            overlap.insert(0, entry)
+                            overlap_tokens += entry[1]
+                        if not overlap and self.overlap_tokens > 0:
+                            # The last sentence alone is too long: carry its end instead
+                            tail, tail_tokens = self._tail(current[-1][0], self.overlap_tokens)
+                            if tail:
+                                overlap, overlap_tokens = [(tail, tail_tokens, current[-1][2])], tail_tokens
+                        current, current_tokens, carried_tokens = overlap, overlap_tokens, overlap_tokens
+
+                    current.append((piece, tokens, page_num))
+                    current_tokens += tokens
+
+        # The tail is only new if it holds more than the overlap
+        if current and current_tokens > carried_tokens:
+            chunk = make_chunk()
+            if len(chunk["text"]) >= self.min_chars:
+                yield chunk
@@ -0,0 +1,302 @@
+# textbook_watcher.py
+"""
+Textbook Watcher for Shiksha Mitra
+Watches `TextBooks/Class N Subject/*.pdf` and re-ingests a class/subject in
+the background when PDFs are added, changed or removed, so no student's
+request ever waits for ingestion. Uses inotify (through watchdog) when
+installed, otherwise polls file sizes and modification times.
+
+Events are debounced per class/subject (a PDF still being copied keeps
+producing events) and fed to a single ingestion thread that starts at most
+one run every `min_interval_seconds`.
+
+The app does not watch unless SHIKSHA_WATCH_TEXTBOOKS=1, and a watcher that
+cannot take the watcher lock next to the ingestion manifest stays idle, so
+one process watches a store. Its ingestion runs, like every other writer's,
+hold the manifest's write lock. Install `watchdog` for inotify.
+Run standalone (one per deployment) with:
+    python textbook_watcher.py --textbooks TextBooks
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from pathlib import Path
+from typing import IO, Dict, Optional, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from ingestion_manifest import lock_file
+from teaching_agent import TeachingAgent, parse_textbook_folder
+
+# Off in the app by default: run `python textbook_watcher.py` as the one writer instead
+WATCH_TEXTBOOKS = os.getenv("SHIKSHA_WATCH_TEXTBOOKS", "0") == "1"
+
+
+def _lock_watch(agent: TeachingAgent) -> Optional[IO]:
+    """Take the cross-process watcher lock of the agent's stores, None if another process holds it"""
+    return lock_file(f"{agent.manifest.db_path}.watcher.lock", blocking=False)
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events on PDFs and class folders to the watcher"""
+
+    def __init__(self, watcher: "TextbookWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path:
+                self.watcher.notify(path)
+
+
+class TextbookWatcher:
+    """Background watcher that keeps the textbook index in sync with the folder"""
+
+    def __init__(self, agent: TeachingAgent, debounce_seconds: float = 5.0,
+                 min_interval_seconds: float = 30.0, poll_seconds: float = 10.0,
+                 use_inotify: bool = True):
+        """
+        debounce_seconds: quiet time after the last event before a class/subject is ingested
+        min_interval_seconds: minimum time between the starts of two ingestion runs
+        poll_seconds: scan interval when inotify is not available
+        """
+        self.agent = agent
+        self.textbook_path = Path(agent.textbook_path)
+        self.debounce_seconds = debounce_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.poll_seconds = poll_seconds
+        self.use_inotify = use_inotify and Observer is not None
+
+        self._pending = {}  # (class_num, subject) -> time of the last event
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._last_run = float("-inf")
+        self._observer = None
+        self._threads = []
+        self._lock_file = None
+
+        # Metrics
+        self.runs = 0
+        self.last_message = None
+
+    # ==================== EVENTS ====================
+
+    def _partition_for(self, path: str) -> Optional[Tuple[int, str]]:
+        """(class_num, subject) of a PDF or class folder path"""
+        path = Path(path)
+        if path.suffix.lower() == ".pdf":
+            path = path.parent
+        if path.parent.resolve() != self.textbook_path.resolve():
+            return None
+        return parse_textbook_folder(path.name)
+
+    def notify(self, path: str) -> None:
+        """Note a change to a PDF or class folder (restarts its debounce timer)"""
+        partition = self._partition_for(path)
+        if partition is None:
+            return
+        with self._condition:
+            self._pending[partition] = time.monotonic()
+            self._condition.notify()
+
+    def queue_all(self) -> None:
+        """Queue every class folder, to catch up on changes made while not watching"""
+        if not self.textbook_path.exists():
+            return
+        for folder in sorted(self.textbook_path.iterdir()):
+            if folder.is_dir():
+                self.notify(str(folder))
+
+    # ==================== POLLING ====================
+
+    def _snapshot(self) -> Dict[str, Tuple[int, float]]:
+        """Size and mtime of every PDF in the class folders"""
+        snapshot = {}
+        if not self.textbook_path.exists():
+            return snapshot
+        for pdf_file in self.textbook_path.glob("*/*.pdf"):
+            try:
+                stat = pdf_file.stat()
+            except OSError:
+                continue  # removed while scanning
+            snapshot[str(pdf_file)] = (stat.st_size, stat.st_mtime)
+        return snapshot
+
+    def _poll(self) -> None:
+        previous = self._snapshot()
+        while not self._stopped.wait(self.poll_seconds):
+            current = self._snapshot()
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self.notify(path)
+            previous = current
+
+    # ==================== INGESTION ====================
+
+    def _next_partition(self) -> Optional[Tuple[int, str]]:
+        """Wait for a class/subject that has been quiet for the debounce time"""
+        with self._condition:
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                ready = [p for p, last_event in self._pending.items() if now - last_event >= self.debounce_seconds]
+                if ready:
+                    partition = min(ready, key=self._pending.get)
+                    del self._pending[partition]
+                    return partition
+                if self._pending:
+                    # Sleep until the partition with the oldest last event goes quiet
+                    wait = self.debounce_seconds - (now - min(self._pending.values()))
+                    self._condition.wait(max(wait, 0.05))
+                else:
+                    self._condition.wait()
+        return None
+
+    def _ingest(self, class_num: int, subject: str) -> None:
+        folder = self.textbook_path / f"Class {class_num} {subject}"
+        if folder.exists():
+            success, message = self.agent.ingest_textbook(class_num, subject, rescan=True)
+        else:
+            # The whole folder was removed
+            removed = self.agent.purge_missing_pdfs()
+            success, message = True, f"{removed} removed"
+        self.runs += 1
+        self.last_message = f"Class {class_num} {subject}: {message}"
+        print(f"{'📚' if success else '❌'} Textbook watcher: {self.last_message}")
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            partition = self._next_partition()
+            if partition is None:
+                return
+
+            # Rate limit: a burst of changes is spread out instead of hogging the CPU
+            wait = self._last_run + self.min_interval_seconds - time.monotonic()
+            if wait > 0 and self._stopped.wait(wait):
+                return
+            self._last_run = time.monotonic()
+
+            try:
+                self._ingest(*partition)
+            except Exception as e:
+                print(f"Textbook watcher error (Class {partition[0]} {partition[1]}): {e}")
+
+    # ==================== LIFECYCLE ====================
+
+    @property
+    def active(self) -> bool:
+        """Whether this watcher holds the watcher lock and is watching"""
+        return self._lock_file is not None
+
+    def start(self, catch_up: bool = True) -> "TextbookWatcher":
+        """
+        Start watching (and the ingestion thread); with catch_up, re-check every folder once
+        Stays idle if another process already watches the same stores.
+        """
+        self._lock_file = _lock_watch(self.agent)
+        if self._lock_file is None:
+            print(f"Warning: another process is already watching textbooks for {self.agent.manifest.db_path}, not watching")
+            return self
+        self.textbook_path.mkdir(parents=True, exist_ok=True)
+
+        if self.use_inotify:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), str(self.textbook_path), recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception as e:
+                print(f"Warning: inotify watch failed ({e}), polling {self.textbook_path} instead")
+                self._observer = None
+        if self._observer is None:
+            self._threads.append(threading.Thread(target=self._poll, name="textbook-poller", daemon=True))
+        self._threads.append(threading.Thread(target=self._work, name="textbook-ingestion", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        if catch_up:
+            self.queue_all()
+        mode = "inotify" if self._observer is not None else f"polling every {self.poll_seconds:g}s"
+        print(f"👀 Watching {self.textbook_path} for textbook changes ({mode})")
+        return self
+
+    def stop(self) -> None:
+        """Stop watching; an ingestion run in progress finishes first"""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock
+            self._lock_file = None
+
+    def stats(self) -> Dict:
+        with self._condition:
+            pending = len(self._pending)
+        return {"runs": self.runs, "pending": pending, "last": self.last_message,
+                "inotify": self._observer is not None, "active": self.active}
+
+
+# One watcher per textbook folder per process, shared by every session
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def start_textbook_watcher(agent: TeachingAgent, **kwargs) -> Optional[TextbookWatcher]:
+    """Start (once per process) the watcher of the agent's textbook folder; None if disabled"""
+    if not WATCH_TEXTBOOKS or not agent.vector_store_available:
+        return None
+    key = str(Path(agent.textbook_path).resolve())
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = TextbookWatcher(agent, **kwargs).start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Keep the Shiksha Mitra textbook index in sync with a folder")
+    parser.add_argument("--textbooks", default="TextBooks", help="Folder containing 'Class N Subject' folders")
+    parser.add_argument("--debounce", type=float, default=5.0, help="Seconds of quiet before ingesting")
+    parser.add_argument("--min-interval", type=float, default=30.0, help="Minimum seconds between ingestion runs")
+    parser.add_argument("--poll", type=float, default=10.0, help="Polling interval without inotify")
+    parser.add_argument("--no-inotify", action="store_true", help="Always poll")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    agent = TeachingAgent(groq_api_key=os.getenv("GROQ_API_KEY", ""), textbook_path=args.textbooks)
+    if not agent.vector_store_available:
+        print("❌ Vector store not available")
+        return 1
+
+    watcher = TextbookWatcher(agent, debounce_seconds=args.debounce, min_interval_seconds=args.min_interval,
+                              poll_seconds=args.poll, use_inotify=not args.no_inotify).start()
+    if not watcher.active:
+        return 1
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Stopping...")
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+# topic_index.py
+"""
+Topic Index for Shiksha Mitra
+Maps syllabus topics ("Fractions", "Photosynthesis", "Fun with Magnets") to
+the chapter, pages and chunks that teach them. Topics come from PDF
+bookmarks, chapter titles and section headings found while pages stream
+through ingestion, plus synonyms from `topic_synonyms.json`.
+
+A short query that names a topic is answered by an exact (then fuzzy)
+lookup, so the query is never embedded; anything else falls back to search.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import difflib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lexical_index import normalize_terms, query_terms
+
+# Relative paths are resolved against this module's folder, not the working directory
+DEFAULT_TOPIC_SYNONYMS_PATH = str(Path(__file__).parent / os.getenv("SHIKSHA_TOPIC_SYNONYMS", "topic_synonyms.json"))
+
+# Longer queries are questions, not topic names
+MAX_TOPIC_TERMS = 6
+# Chunks returned for a topic, starting with the one that holds its heading
+CHUNKS_PER_TOPIC = 4
+
+# "Chapter 3", "Unit IV:", "अध्याय 2" or "2.1" in front of a title
+TITLE_PREFIX = re.compile(r"^\s*(?:(?:chapter|unit|lesson|अध्याय)\s*(?:\d+|[ivxlc]+)?\b"
+                          r"|\d{1,2}(?:\.\d{1,2}){0,2}(?=[\s:.\-–—]))\s*[:.\-–—]?\s*", re.IGNORECASE)
+CHAPTER_WORD = re.compile(r"^\s*(?:chapter|unit|lesson|अध्याय)\b", re.IGNORECASE)
+NUMBERED_HEADING = re.compile(r"^\d{1,2}(?:\.\d{1,2}){0,2}\s+\S")
+# Captions and recurring textbook sections that are not topics
+NOT_TOPICS = re.compile(r"^(?:fig(?:ure)?|table|activity|example|exercise|exercises|keywords|key words|summary|"
+                        r"what you have learnt|questions|let us recall|think and discuss|project|note)\b",
+                        re.IGNORECASE)
+# Words left lowercase in Title Case headings
+MINOR_WORDS = {"and", "but", "for", "from", "into", "nor", "the", "that", "with", "within", "without", "over", "upon"}
+
+
+def _stem(term: str) -> str:
+    """Fold simple English plurals so 'Fractions' finds 'Fraction'"""
+    if term.isascii() and len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def topic_key(text: str) -> str:
+    """Lookup key of a topic or query: numbering, question words and plurals removed"""
+    return " ".join(_stem(term) for term in query_terms(TITLE_PREFIX.sub("", text)))
+
+
+def topic_variants(title: str) -> List[str]:
+    """A title and its parts ('Food: Where Does It Come From?' -> both halves)"""
+    variants = [title]
+    for separator in (":", " - ", " – "):
+        if separator in title:
+            variants.extend(part for part in title.split(separator) if part.strip())
+    return variants
+
+
+def is_heading(line: str) -> bool:
+    """Whether a line of page text looks like a section heading"""
+    if not 3 <= len(line) <= 70 or NOT_TOPICS.match(line):
+        return False
+    if NUMBERED_HEADING.match(line):
+        title = TITLE_PREFIX.sub("", line)
+        return 0 < len(title.split()) <= 10 and not title.endswith((".", ",", ";"))
+
+    words = line.split()
+    if len(words) > 8 or line.endswith((".", ",", ";", ":")) or not line.isascii():
+        return False
+    if line.isupper() and any(char.isalpha() for char in line):
+        return True
+    # Title Case: every word but short and minor ones capitalized
+    main_words = [word for word in words if len(word) > 2 and word[0].isalpha() and word.lower() not in MINOR_WORDS]
+    return bool(main_words) and words[0][0].isupper() and all(word[0].isupper() for word in main_words)
+
+
+class TopicCollector:
+    """
+    Collects topic headings from (page_number, text) pairs as they stream
+    through ingestion, without holding the pages
+    """
+
+    def __init__(self, outline: Optional[List[Tuple[int, str, int]]] = None, max_per_page: int = 3):
+        """outline: PDF bookmarks as (level, title, page)"""
+        self.outline = outline or []
+        self.max_per_page = max_per_page
+        self.title = None
+        self.headings = []  # (page, heading)
+        self.first_page = None
+        self.last_page = 0
+        self._repeats = Counter()
+
+    def wrap(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """Pass pages through unchanged, noting their headings"""
+        for page_num, text in pages:
+            self._scan(page_num, text)
+            yield page_num, text
+
+    def _scan(self, page_num: int, text: str) -> None:
+        lines = [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+        if self.first_page is None:
+            self.first_page = page_num
+            self.title = self._find_title(lines)
+        self.last_page = max(self.last_page, page_num)
+
+        found = 0
+        for line in lines:
+            if found >= self.max_per_page:
+                break
+            if is_heading(line) and topic_key(line):
+                self._repeats[topic_key(line)] += 1
+                self.headings.append((page_num, line))
+                found += 1
+
+    def _find_title(self, lines: List[str]) -> Optional[str]:
+        """Chapter title: the line after 'Chapter N', else the first heading of the first page"""
+        for i, line in enumerate(lines[:8]):
+            if CHAPTER_WORD.match(line):
+                # "Chapter 13: Fun with Magnets", or "Chapter 13" above the title
+                title = TITLE_PREFIX.sub("", line)
+                if title:
+                    return title
+                if i + 1 < len(lines):
+                    return lines[i + 1]
+        return next((line for line in lines[:8] if is_heading(line)), None)
+
+    def candidates(self) -> List[Tuple[str, int]]:
+        """(title, first page) of the bookmarks, chapter title and headings seen so far"""
+        titles = [(title.strip(), page) for _, title, page in self.outline]
+        if self.title:
+            titles.append((self.title.strip(), self.first_page))
+        titles.extend((line, page) for page, line in self.headings)
+        return titles
+
+    def topics(self) -> List[Dict]:
+        """Topics with page ranges: bookmarks, then the chapter title, then headings"""
+        if self.first_page is None and not self.outline:
+            return []
+        first, last = self.first_page or 1, max(self.last_page, 1)
+        topics = []
+
+        def add(title, page_start, page_end, source):
+            topics.append({"topic": title.strip(), "page_start": page_start,
+                           "page_end": max(page_start, page_end), "source": source})
+
+        for i, (level, title, page) in enumerate(self.outline):
+            # A bookmark runs until the next one at the same or a higher level
+            end = next((p for lvl, _, p in self.outline[i + 1:] if lvl <= level), last)
+            add(title, page, end, "outline")
+
+        if self.title:
+            add(self.title, first, last, "title")
+
+        # Running headers repeat on many pages and are not topics
+        headings = [(page, line) for page, line in self.headings
+                    if self._repeats[topic_key(line)] < 3 and line != self.title]
+        for i, (page, line) in enumerate(headings):
+            end = headings[i + 1][0] if i + 1 < len(headings) else last
+            add(line, page, end, "heading")
+
+        return topics
+
+
+class TopicChunkMatcher:
+    """
+    Gives each topic the IDs of the chunks that teach it, matching topic
+    titles as chunks stream past so only (id, page_start, page_end) is kept
+    per chunk. A topic's chunks start with the first chunk in its pages that
+    contains its title.
+    """
+
+    def __init__(self, candidates: Callable[[], Iterable[Tuple[str, int]]]):
+        """candidates: (title, first page) of the topics known so far, e.g. TopicCollector.candidates"""
+        self.candidates = candidates
+        self.chunks = []  # (id, page_start, page_end) in document order
+        self._first_match = {}  # (title, first page) -> index of its first chunk containing the title
+        self._title_terms = {}
+
+    def add(self, chunk_id: str, page_start: int, page_end: int, text: str) -> None:
+        """Note the next chunk in document order"""
+        index = len(self.chunks)
+        self.chunks.append((chunk_id, page_start, page_end))
+        chunk_terms = None
+        for title, first_page in self.candidates():
+            if (title, first_page) in self._first_match or page_end < first_page:
+                continue
+            terms = self._title_terms.get(title)
+            if terms is None:
+                terms = self._title_terms[title] = set(normalize_terms(TITLE_PREFIX.sub("", title)).split())
+            if chunk_terms is None:
+                chunk_terms = set(normalize_terms(text).split())
+            if terms <= chunk_terms:
+                self._first_match[(title, first_page)] = index
+
+    def attach(self, topics: List[Dict], per_topic: int = CHUNKS_PER_TOPIC) -> List[Dict]:
+        """Topics (from TopicCollector.topics) with their chunk_ids"""
+        attached = []
+        for topic in topics:
+            in_range = [i for i, chunk in enumerate(self.chunks)
+                        if chunk[1] <= topic["page_end"] and chunk[2] >= topic["page_start"]]
+            if not in_range:
+                continue
+            match = self._first_match.get((topic["topic"], topic["page_start"]))
+            start = in_range.index(match) if match in in_range else 0
+            attached.append(dict(topic, chunk_ids=[self.chunks[i][0] for i in in_range[start:start + per_topic]]))
+        return attached
+
+
+def load_synonyms(path: Optional[str] = DEFAULT_TOPIC_SYNONYMS_PATH) -> Dict[str, str]:
+    """Synonym key -> topic key, from a JSON object of topic: [synonyms]"""
+    if not path or not Path(path).exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read topic synonyms from {path}: {e}")
+        return {}
+
+    synonyms = {}
+    for topic, alternatives in data.items():
+        for alternative in alternatives:
+            if topic_key(alternative):
+                synonyms[topic_key(alternative)] = topic_key(topic)
+    return synonyms
+
+
+class TopicIndex:
+    """SQLite index of topic keys per textbook partition"""
+
+    # When a key names several chapters, the more specific source wins
+    SOURCE_PRIORITY = {"outline": 0, "title": 1, "heading": 2}
+
+    def __init__(self, db_path, synonyms_path: Optional[str] = DEFAULT_TOPIC_SYNONYMS_PATH,
+                 fuzzy_cutoff: float = 0.85):
+        """Open (or create) the index"""
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.synonyms = load_synonyms(synonyms_path)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.init_database()
+
+    def get_connection(self):
+        """Get database connection"""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        """Initialize topic table"""
+        conn = self.get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS topics (
+            partition TEXT NOT NULL,
+            topic_key TEXT NOT NULL,
+            pdf_path TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            chapter TEXT NOT NULL,
+            page_start INTEGER,
+            page_end INTEGER,
+            chunk_ids TEXT NOT NULL,  -- JSON array
+            source TEXT NOT NULL,
+            PRIMARY KEY (partition, topic_key, pdf_path)
+        ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_topics_pdf ON topics(pdf_path)")
+        conn.commit()
+        conn.close()
+
+    def replace_pdf(self, partition: str, pdf_path: str, chapter: str, topics: List[Dict]) -> int:
+        """Store the topics of one PDF (with chunk_ids), replacing its old ones"""
+        rows = {}
+        for topic in topics:
+            for variant in topic_variants(topic["topic"]):
+                key = topic_key(variant)
+                if not key or not topic["chunk_ids"]:
+                    continue
+                # First (most specific source) wins within a PDF
+                rows.setdefault(key, (partition, key, str(pdf_path), topic["topic"], chapter,
+                                      topic["page_start"], topic["page_end"],
+                                      json.dumps(topic["chunk_ids"]), topic["source"]))
+
+        conn = self.get_connection()
+        try:
+            conn.execute("DELETE FROM topics WHERE pdf_path = ?", (str(pdf_path),))
+            conn.executemany("INSERT OR REPLACE INTO topics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows.values())
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+
+    def remove_pdf(self, pdf_path: str) -> None:
+        """Forget the topics of a PDF"""
+        conn = self.get_connection()
+        try:
+            conn.execute("DELETE FROM topics WHERE pdf_path = ?", (str(pdf_path),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def count(self, partition: Optional[str] = None) -> int:
+        """Topic keys in one partition, or in all of them"""
+        conn = self.get_connection()
+        try:
+            if partition is None:
+                return conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM topics WHERE partition = ?", (partition,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _entries(self, conn, partition: str, key: str) -> List[Dict]:
+        rows = conn.execute("""
+        SELECT topic, chapter, page_start, page_end, chunk_ids, source
+        FROM topics WHERE partition = ? AND topic_key = ?
+        """, (partition, key)).fetchall()
+        return [{"topic": row[0], "chapter": row[1], "page_start": row[2], "page_end": row[3],
+                 "chunk_ids": json.loads(row[4]), "source": row[5]} for row in rows]
+
+    def _best(self, entries: List[Dict]) -> Optional[Dict]:
+        """The entry of the most specific source, None if that is still ambiguous"""
+        if not entries:
+            return None
+        entries.sort(key=lambda entry: self.SOURCE_PRIORITY.get(entry["source"], 9))
+        if len(entries) > 1 and entries[0]["source"] == entries[1]["source"]:
+            return None
+        return entries[0]
+
+    def lookup(self, partition: str, query: str) -> Optional[Dict]:
+        """
+        Topic named by a short query, tried in order: exact key, synonym,
+        fuzzy match (typos), then the most specific topic containing all query
+        terms ("Magnets" -> "Fun with Magnets"). Returns topic, chapter, page range,
+        chunk_ids and match type, or None.
+        """
+        key = topic_key(query)
+        if not key or len(key.split()) > MAX_TOPIC_TERMS:
+            return None
+        candidates = [key] + ([self.synonyms[key]] if key in self.synonyms else [])
+
+        conn = self.get_connection()
+        try:
+            for candidate in candidates:
+                entry = self._best(self._entries(conn, partition, candidate))
+                if entry:
+                    return dict(entry, match="exact" if candidate == key else "synonym")
+
+            keys = [row[0] for row in conn.execute(
+                "SELECT DISTINCT topic_key FROM topics WHERE partition = ?", (partition,)
+            )]
+            for candidate in candidates:
+                close = difflib.get_close_matches(candidate, keys, n=1, cutoff=self.fuzzy_cutoff)
+                terms = set(candidate.split())
+                containing = [k for k in keys if terms <= set(k.split())]
+                for match, matched in (("fuzzy", close), ("partial", containing)):
+                    entry = self._best([e for k in matched for e in self._entries(conn, partition, k)])
+                    if entry:
+                        return dict(entry, match=match)
+        finally:
+            conn.close()
+        return None